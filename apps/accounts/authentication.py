@@ -0,0 +1,97 @@
+import copy
+
+from django.conf import settings
+from django.utils.crypto import salted_hmac
+from rest_framework.authentication import SessionAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from utils.lru import LRUCache
+
+TOKEN_VERSION_CLAIM = "ver"
+
+user_cache = LRUCache(settings.AUTH_USER_CACHE_SIZE, ttl=settings.AUTH_USER_CACHE_TTL)
+
+
+def token_version(user):
+    """
+    Changes whenever the user's password or active flag changes, so tokens
+    issued before either change stop matching.
+    """
+    return salted_hmac(
+        "token-version", f"{user.password}:{user.is_active}"
+    ).hexdigest()[:16]
+
+
+def invalidate_user(user_id):
+    user_cache.discard_keys(lambda key: key[0] == str(user_id))
+
+
+class VersionedTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[TOKEN_VERSION_CLAIM] = token_version(user)
+        return token
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that resolves users from a bounded per-process
+    cache keyed by ``(user id, token version)`` instead of loading the user
+    row on every request.
+
+    On a miss the user is loaded once and the token's version claim is
+    checked against it, so tokens issued before a password change or a
+    deactivation are rejected. Saving or deleting a user evicts it from
+    this process's cache (``apps.accounts.signals``); other processes see
+    the change once ``AUTH_USER_CACHE_TTL`` expires. Tokens without a
+    version claim are accepted as before.
+    """
+    def _cache_key(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            return None
+        return str(user_id), validated_token.get(TOKEN_VERSION_CLAIM)
+
+    def get_cached_user(self, validated_token):
+        key = self._cache_key(validated_token)
+        user = user_cache.get(key) if key else None
+        # Views may modify request.user; never hand out the shared instance.
+        return copy.copy(user) if user is not None else None
+
+    def remember_user(self, validated_token, user):
+        """
+        Check ``user`` (freshly loaded) against the token's version claim
+        and cache it.
+        """
+        key = self._cache_key(validated_token)
+        if key is None:
+            return user
+        if key[1] is not None and key[1] != token_version(user):
+            raise AuthenticationFailed("Token is no longer valid", code="token_not_valid")
+        user_cache.set(key, user)
+        return copy.copy(user)
+
+    def get_user(self, validated_token):
+        user = self.get_cached_user(validated_token)
+        if user is None:
+            user = self.remember_user(validated_token, super().get_user(validated_token))
+        return user
+
+
+class TokenAwareSessionAuthentication(SessionAuthentication):
+    """
+    With ``AUTH_SHORT_CIRCUIT_TOKENS`` requests that carry an
+    ``Authorization`` header are left to the header's own authenticator:
+    the session (and its CSRF check) is never consulted for them.
+    """
+    def authenticate(self, request):
+        if settings.AUTH_SHORT_CIRCUIT_TOKENS and request.META.get(
+            "HTTP_AUTHORIZATION"
+        ):
+            return None
+        return super().authenticate(request)
@@ -0,0 +1,117 @@
+import re
+import threading
+from functools import partial
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BigIntegerField, Max
+from django.db.models.functions import Cast, Substr
+
+from apps.accounts.models import Biller, CodeSequence, Supplier
+
+CODE_BLOCK_SIZE = 50
+
+
+class CodeAllocator:
+    """
+    Hands out codes ``<prefix><n>`` from a named ``CodeSequence`` row.
+
+    Numbers are reserved a block at a time: the row is locked and
+    incremented once per block, and codes are then served from memory, so
+    most creates cost no query and two processes can never receive the
+    same number. Codes are unique but not contiguous: whatever is left of
+    a block when the process exits (or when the transaction that reserved
+    it rolls back) is skipped.
+
+    ``seed`` is called once, when the sequence row does not exist yet, to
+    continue numbering from existing data.
+    """
+    def __init__(self, name, prefix="", block_size=CODE_BLOCK_SIZE, seed=None):
+        self.name = name
+        self.prefix = prefix
+        self.block_size = block_size
+        self.seed = seed
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def _reserve(self, count):
+        """
+        Advance the sequence by ``count`` and return the first number reserved.
+        """
+        with transaction.atomic():
+            sequences = CodeSequence.objects.select_for_update()
+            try:
+                sequence = sequences.get(name=self.name)
+            except CodeSequence.DoesNotExist:
+                CodeSequence.objects.bulk_create(
+                    [
+                        CodeSequence(
+                            name=self.name,
+                            next_value=self.seed() if self.seed else 0,
+                        )
+                    ],
+                    ignore_conflicts=True,
+                )
+                sequence = sequences.get(name=self.name)
+            start = sequence.next_value
+            sequence.next_value = start + count
+            sequence.save(update_fields=["next_value"])
+        return start
+
+    def _keep(self, start, end):
+        with self._lock:
+            self._next, self._end = start, end
+
+    def take(self, count):
+        """
+        Return ``count`` new codes, reserving a larger block from the
+        database when the current one runs out.
+        """
+        with self._lock:
+            numbers = list(range(self._next, min(self._end, self._next + count)))
+            self._next += len(numbers)
+            missing = count - len(numbers)
+            if missing:
+                reserved = missing + self.block_size
+                start = self._reserve(reserved)
+                numbers.extend(range(start, start + missing))
+                self._next = self._end = 0
+
+        if missing:
+            # Inside a transaction the reservation is only real once it
+            # commits; keep the spare numbers for later callers only then.
+            spare = (start + missing, start + reserved)
+            if connection.in_atomic_block:
+                transaction.on_commit(lambda: self._keep(*spare))
+            else:
+                self._keep(*spare)
+        return [f"{self.prefix}{number}" for number in numbers]
+
+    def next(self):
+        return self.take(1)[0]
+
+
+def next_code_number(model, field, prefix):
+    """
+    One past the highest ``<prefix><n>`` stored in ``model.field``. Unlike
+    a row count, this never falls back below an issued code after deletes.
+    """
+    highest = (
+        model.objects.filter(**{f"{field}__regex": rf"^{re.escape(prefix)}[0-9]+$"})
+        .annotate(number=Cast(Substr(field, len(prefix) + 1), BigIntegerField()))
+        .aggregate(highest=Max("number"))["highest"]
+    )
+    return 0 if highest is None else highest + 1
+
+
+supplier_codes = CodeAllocator(
+    "supplier",
+    prefix=settings.SUPPLIER_CODE,
+    seed=partial(next_code_number, Supplier, "supplier_code", settings.SUPPLIER_CODE),
+)
+biller_codes = CodeAllocator(
+    "biller",
+    prefix=settings.BILLER_CODE,
+    seed=partial(next_code_number, Biller, "biller_code", settings.BILLER_CODE),
+)
@@ -18,4 +18,9 @@ CUSTOMER_GROUP_CHOICES = [
     ("Walkin", "Walkin"),
     ("Local", "Local"),
     ("Foreign", "Foreign"),
-]
\ No newline at end of file
+]
+EMAIL_STATUS = [
+    ("Pending", "Pending"),
+    ("Sent", "Sent"),
+    ("Failed", "Failed"),
+]
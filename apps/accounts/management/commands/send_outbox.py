@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.accounts.outbox import OUTBOX_BATCH_SIZE, deliver_pending, queue_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued emails from the outbox. Runs once by default; use "
+        "--loop to keep polling as a dedicated sender process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument("--loop", action="store_true")
+        parser.add_argument(
+            "--interval", type=float, default=5.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+        parser.add_argument(
+            "--stats", action="store_true", help="Only print the queue depth."
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self.stdout.write(str(queue_stats()))
+            return
+
+        while True:
+            sent, unsent = deliver_pending(options["batch_size"])
+            if sent or unsent:
+                self.stdout.write(f"sent={sent} unsent={unsent} {queue_stats()}")
+            if not options["loop"]:
+                return
+            close_old_connections()
+            time.sleep(options["interval"])
@@ -1,6 +1,7 @@
 import uuid
 import pyotp
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
 
 from apps.accounts.managers import CustomUserManager
@@ -8,6 +9,7 @@ from apps.accounts.constant import (
     GENDER_CHOICES,
     ROLE_CHOICES,
     CUSTOMER_GROUP_CHOICES,
+    EMAIL_STATUS,
 )
 # from apps.products.models import Warehouse
 from utils.validation_for_phone_number import (
@@ -60,6 +62,11 @@ class Supplier(CommonInfo):
     company = models.CharField(max_length=100)
     supplier_code = models.CharField(max_length=50)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["supplier_code"], name="supplier_code_unique"),
+        ]
+
     def __str__(self):
         return self.user.full_name
 
@@ -84,10 +91,27 @@ class Biller(CommonInfo):
     # )
     biller_code = models.CharField(max_length=50)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["biller_code"], name="biller_code_unique"),
+        ]
+
     def __str__(self):
         return self.user.full_name
 
 
+class CodeSequence(models.Model):
+    """
+    Next free number of a named code series (supplier, biller, ...),
+    handed out in blocks by ``apps.accounts.codes.CodeAllocator``.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
 class OTP(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     secret_key = models.CharField(max_length=32)
@@ -106,3 +130,29 @@ class OTP(models.Model):
         otp_instance.save()
 
         return otp_code
+
+
+class OutboxEmail(CommonInfo):
+    """
+    A transactional email waiting to be delivered by
+    ``apps.accounts.outbox``. Requests only insert rows; a background
+    sender delivers them and reschedules failures through ``send_after``.
+    """
+    to = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(
+        choices=EMAIL_STATUS, max_length=10, default=EMAIL_STATUS[0][0]
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    send_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_on = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "send_after"], name="outbox_due"),
+        ]
+
+    def __str__(self):
+        return f"{self.to}: {self.subject}"
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models import Q
+
+from apps.accounts.codes import supplier_codes
+from apps.accounts.models import Supplier, User
+
+BULK_BATCH_SIZE = 1000
+UNIQUE_USER_FIELDS = ("email", "phone", "username")
+
+
+def _add_error(errors, index, field, message):
+    errors.setdefault(index, {}).setdefault("user", {}).setdefault(field, []).append(
+        message
+    )
+
+
+def onboard_suppliers(lines, user=None, atomic=False):
+    """
+    Create many suppliers and their user accounts at once.
+
+    ``lines`` is a list of ``(index, data)`` pairs validated by
+    ``BulkSupplierSerializer``. Email, phone and username are checked for
+    the whole batch with one query, codes come from ``supplier_codes`` in
+    a single reservation, and users and suppliers are written with
+    ``bulk_create``. Accounts without a password get an unusable one (and
+    skip the slow password hash); they can set one through forgot-password.
+
+    Returns ``(suppliers, errors)`` where ``errors`` maps a line index to
+    its error. With ``atomic`` a single bad line rejects the batch.
+    """
+    errors = {}
+    seen = {field: set() for field in UNIQUE_USER_FIELDS}
+    for index, data in lines:
+        for field in UNIQUE_USER_FIELDS:
+            value = data["user"][field]
+            if value in seen[field]:
+                _add_error(errors, index, field, f"Duplicate {field} in this batch.")
+            seen[field].add(value)
+
+    existing = {field: set() for field in UNIQUE_USER_FIELDS}
+    taken = User.objects.filter(
+        Q(email__in=seen["email"])
+        | Q(phone__in=seen["phone"])
+        | Q(username__in=seen["username"])
+    ).values_list(*UNIQUE_USER_FIELDS)
+    for row in taken:
+        for field, value in zip(UNIQUE_USER_FIELDS, row):
+            existing[field].add(value)
+    for index, data in lines:
+        for field in UNIQUE_USER_FIELDS:
+            if data["user"][field] in existing[field]:
+                _add_error(
+                    errors, index, field, f"user with this {field} already exists."
+                )
+
+    if errors and atomic:
+        return [], errors
+
+    valid = [(index, data) for index, data in lines if index not in errors]
+    users = []
+    suppliers = []
+    with transaction.atomic():
+        for (index, data), code in zip(valid, supplier_codes.take(len(valid))):
+            user_data = dict(data["user"])
+            user_data.pop("confirm_password", None)
+            password = user_data.pop("password", None)
+
+            account = User(role="Supplier", **user_data)
+            if password:
+                account.set_password(password)
+            else:
+                account.set_unusable_password()
+            users.append(account)
+            suppliers.append(
+                Supplier(
+                    user=account,
+                    company=data["company"],
+                    supplier_code=code,
+                    created_by=user,
+                )
+            )
+        User.objects.bulk_create(users, batch_size=BULK_BATCH_SIZE)
+        Supplier.objects.bulk_create(suppliers, batch_size=BULK_BATCH_SIZE)
+    return suppliers, errors
@@ -0,0 +1,132 @@
+import secrets
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import pyotp
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.module_loading import import_string
+
+from apps.accounts.models import OTP
+
+OTP_DIGITS = 6
+
+
+class BaseOTPBackend(ABC):
+    """
+    Issues one-time codes for password resets and verifies them.
+    """
+    @abstractmethod
+    def issue(self, user):
+        """
+        Return a new code for ``user``, replacing any earlier one.
+        """
+
+    @abstractmethod
+    def verify(self, user, code):
+        """
+        Return whether ``code`` is valid for ``user``, consuming it on
+        success so each code can be used at most once.
+        """
+
+
+class CacheOTPBackend(BaseOTPBackend):
+    """
+    Keeps codes in a cache, where the TTL takes care of expiry and nothing
+    is ever left behind. Only an HMAC of the code is stored.
+
+    Wrong guesses are counted per user, apart from the code: issuing a new
+    code does not reset the counter, which lives for
+    ``OTP_ATTEMPT_WINDOW`` from the first wrong guess. Once it reaches
+    ``OTP_MAX_ATTEMPTS`` the current code is dropped and every code is
+    refused until the window ends.
+
+    Verifying reads the digest and the counter with one ``get_many``. The
+    read is not what consumes a code: a match is consumed by ``delete``,
+    which returns ``True`` for only one caller, so two concurrent requests
+    cannot both use the same code. A wrong code increments the counter
+    atomically.
+
+    The cache must be shared by every process (Redis, Memcached) unless a
+    single process serves the API.
+    """
+    def __init__(self):
+        self.ttl = settings.OTP_TTL
+        self.max_attempts = settings.OTP_MAX_ATTEMPTS
+        self.attempt_window = settings.OTP_ATTEMPT_WINDOW
+
+    @property
+    def cache(self):
+        return caches[settings.OTP_CACHE_ALIAS]
+
+    def _keys(self, user):
+        return f"otp:{user.pk}", f"otp:{user.pk}:attempts"
+
+    def _digest(self, user, code):
+        return salted_hmac("otp", f"{user.pk}:{code}").hexdigest()
+
+    def issue(self, user):
+        code = f"{secrets.randbelow(10 ** OTP_DIGITS):0{OTP_DIGITS}d}"
+        code_key, _ = self._keys(user)
+        self.cache.set(code_key, self._digest(user, code), self.ttl)
+        return code
+
+    def verify(self, user, code):
+        code_key, attempts_key = self._keys(user)
+        stored = self.cache.get_many([code_key, attempts_key])
+        digest = stored.get(code_key)
+        if digest is None or stored.get(attempts_key, 0) >= self.max_attempts:
+            return False
+
+        if constant_time_compare(digest, self._digest(user, code)):
+            return self.cache.delete(code_key)
+
+        # ``add`` only starts the window; later failures just increment.
+        self.cache.add(attempts_key, 0, self.attempt_window)
+        try:
+            attempts = self.cache.incr(attempts_key)
+        except ValueError:
+            attempts = self.max_attempts
+        if attempts >= self.max_attempts:
+            self.cache.delete(code_key)
+        return False
+
+
+class DatabaseOTPBackend(BaseOTPBackend):
+    """
+    Fallback backend on the ``OTP`` table: a TOTP secret per user, valid
+    for a few time steps. A wrong code deletes the secret, so there is a
+    single attempt per issued code.
+    """
+    valid_window = 3
+
+    def issue(self, user):
+        secret_key = pyotp.random_base32()
+        otp_code = pyotp.TOTP(secret_key).now()
+        # One INSERT ... ON CONFLICT instead of get_or_create + save.
+        OTP.objects.bulk_create(
+            [OTP(user=user, secret_key=secret_key, otp_code=otp_code)],
+            update_conflicts=True,
+            unique_fields=["user"],
+            update_fields=["secret_key", "otp_code"],
+        )
+        return otp_code
+
+    def verify(self, user, code):
+        secret_key = (
+            OTP.objects.filter(user=user).values_list("secret_key", flat=True).first()
+        )
+        if secret_key is None:
+            return False
+        # Deleting the row that was read is the consume step: of two
+        # concurrent requests only one deletes it.
+        consumed = OTP.objects.filter(user=user, secret_key=secret_key).delete()[0]
+        return bool(consumed) and pyotp.TOTP(secret_key).verify(
+            code, valid_window=self.valid_window
+        )
+
+
+@lru_cache(maxsize=None)
+def get_otp_backend():
+    return import_string(settings.OTP_BACKEND)()
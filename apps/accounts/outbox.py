@@ -0,0 +1,177 @@
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from apps.accounts.models import OutboxEmail
+
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 6
+OUTBOX_RETRY_BASE = 30
+OUTBOX_RETRY_MAX = 60 * 60
+# Every SMTP command the sender issues gives up after this many seconds.
+OUTBOX_SMTP_TIMEOUT = getattr(settings, "EMAIL_TIMEOUT", None) or 30
+# Commands that may each wait out the timeout: connect, EHLO, STARTTLS,
+# EHLO and AUTH to open the connection, then MAIL, RCPT, DATA and the
+# message body for each message.
+OUTBOX_OPEN_COMMANDS = 5
+OUTBOX_MESSAGE_COMMANDS = 4
+
+# Errors that concern a single message rather than the connection.
+REJECTED = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+_sender = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+
+
+def queue_email(to, subject, body):
+    """
+    Store an email for background delivery. The sender is woken once the
+    surrounding transaction commits; nothing touches SMTP in the caller.
+    """
+    email = OutboxEmail.objects.create(to=to, subject=subject, body=body)
+    transaction.on_commit(lambda: _sender.submit(_deliver_in_background))
+    return email
+
+
+def _deliver_in_background():
+    try:
+        deliver_pending()
+    finally:
+        close_old_connections()
+
+
+def retry_delay(attempts):
+    seconds = OUTBOX_RETRY_BASE * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, OUTBOX_RETRY_MAX))
+
+
+def lease_duration(batch_size):
+    """
+    How long a claimed batch is hidden from other senders: the worst case
+    of ``send_batch`` with every command timing out, so a batch is never
+    claimed twice while its sender is still working through it. If the
+    sender dies, the rows are picked up again afterwards.
+    """
+    commands = OUTBOX_OPEN_COMMANDS + OUTBOX_MESSAGE_COMMANDS * batch_size
+    return timedelta(seconds=OUTBOX_SMTP_TIMEOUT * commands)
+
+
+def claim_batch(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Lease up to ``batch_size`` due messages for ``lease_duration``. Rows
+    locked by another sender are skipped, so any number of senders can
+    run side by side.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status="Pending", send_after__lte=now)
+            .order_by("send_after")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        OutboxEmail.objects.filter(id__in=ids).update(
+            attempts=F("attempts") + 1,
+            send_after=now + lease_duration(batch_size),
+        )
+    return list(OutboxEmail.objects.filter(id__in=ids).order_by("created_on"))
+
+
+def _reschedule(email, error):
+    email.last_error = f"{type(error).__name__}: {error}"
+    if email.attempts >= OUTBOX_MAX_ATTEMPTS:
+        email.status = "Failed"
+    else:
+        email.send_after = timezone.now() + retry_delay(email.attempts)
+
+
+def send_batch(emails, connection=None):
+    """
+    Deliver ``emails`` over a single SMTP connection. A message the server
+    rejects is rescheduled with exponential backoff (or marked failed once
+    it has used up its attempts) and the batch carries on; if the
+    connection itself fails, the rest of the batch is rescheduled too.
+    """
+    # The lease only holds if no command can wait longer than the timeout.
+    connection = connection or get_connection(timeout=OUTBOX_SMTP_TIMEOUT)
+    sent = 0
+    remaining = list(emails)
+    try:
+        while remaining:
+            email = remaining.pop(0)
+            message = EmailMessage(
+                email.subject,
+                email.body,
+                settings.DEFAULT_FROM_EMAIL,
+                [email.to],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except REJECTED as exc:
+                _reschedule(email, exc)
+            except Exception as exc:
+                for unsent in [email, *remaining]:
+                    _reschedule(unsent, exc)
+                break
+            else:
+                email.status = "Sent"
+                email.sent_on = timezone.now()
+                email.last_error = ""
+                sent += 1
+    finally:
+        connection.close()
+
+    now = timezone.now()
+    for email in emails:
+        email.modified_on = now
+    OutboxEmail.objects.bulk_update(
+        emails, ["status", "send_after", "last_error", "sent_on", "modified_on"]
+    )
+    return sent, len(emails) - sent
+
+
+def deliver_pending(batch_size=OUTBOX_BATCH_SIZE):
+    """
+    Send everything that is due, batch by batch. Returns ``(sent, unsent)``.
+    """
+    total_sent = total_unsent = 0
+    while True:
+        emails = claim_batch(batch_size)
+        if not emails:
+            return total_sent, total_unsent
+        sent, unsent = send_batch(emails)
+        total_sent += sent
+        total_unsent += unsent
+
+
+def queue_stats():
+    """
+    Queue depth per status, how many pending messages are due now, and
+    the age of the oldest due message in seconds.
+    """
+    now = timezone.now()
+    counts = dict(
+        OutboxEmail.objects.order_by().values_list("status").annotate(total=Count("id"))
+    )
+    due = OutboxEmail.objects.filter(status="Pending", send_after__lte=now).aggregate(
+        total=Count("id"), oldest=Min("created_on")
+    )
+    return {
+        "pending": counts.get("Pending", 0),
+        "sent": counts.get("Sent", 0),
+        "failed": counts.get("Failed", 0),
+        "due": due["total"],
+        "oldest_due_seconds": (
+            round((now - due["oldest"]).total_seconds(), 1) if due["oldest"] else None
+        ),
+    }
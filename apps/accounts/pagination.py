@@ -1,12 +1,165 @@
+import base64
+import json
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 from rest_framework import pagination
-# from rest_framework.response import Response
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
 
 class MyPagination(pagination.LimitOffsetPagination):
     default_limit = 2
     limit_query_param = "l"
     offset_query_param = "o"
     max_limit = 4
-    
+
+
+class UncountedLimitOffsetPagination(pagination.LimitOffsetPagination):
+    """
+    Limit/offset without the ``COUNT(*)``: one extra row is fetched to
+    tell whether a next page exists. Meant for ranked result sets, which
+    cannot be keyset-paginated and are rarely paged deeply.
+    """
+    default_limit = 20
+    max_limit = 100
+    limit_query_param = "l"
+    offset_query_param = "o"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        return rows[: self.limit]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param, self.offset + self.limit)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Cursor pagination over ``CommonInfo`` rows, newest first, keyed on
+    ``(created_on, id)``.
+
+    Each page is one indexed range scan: there is no ``COUNT(*)`` and no
+    ``OFFSET``, so page 10 000 costs the same as page 1. Cursors are opaque
+    and stay valid while rows are inserted. Viewsets can override the
+    default and maximum page size with ``page_size`` / ``max_page_size``.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "l"
+    page_size = 100
+    max_page_size = 5000
+    invalid_cursor_message = "Invalid cursor"
+
+    def get_page_size(self, request, view=None):
+        default = getattr(view, "page_size", self.page_size)
+        maximum = getattr(view, "max_page_size", self.max_page_size)
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return default
+        return max(1, min(size, maximum))
+
+    def encode_cursor(self, row, reverse):
+        payload = json.dumps([row.created_on.isoformat(), str(row.pk), reverse])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_on, pk, reverse = json.loads(base64.urlsafe_b64decode(encoded))
+            created_on = parse_datetime(created_on)
+            pk = uuid.UUID(pk)
+        except (AttributeError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_on is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_on, pk, bool(reverse)
+
+    def page_queryset(self, queryset, request, view=None):
+        """
+        Return the (lazy) queryset for the requested page. Split out from
+        ``paginate_queryset`` so async views can evaluate it themselves.
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request, view)
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor[2])
+
+        # The redundant ``created_on`` bound next to each OR gives Postgres
+        # an index range to start from instead of filtering every row.
+        if self.cursor is None:
+            queryset = queryset.order_by("-created_on", "-id")
+        elif self.reverse:
+            created_on, pk, _ = self.cursor
+            queryset = queryset.filter(
+                Q(created_on__gt=created_on) | Q(created_on=created_on, id__gt=pk),
+                created_on__gte=created_on,
+            ).order_by("created_on", "id")
+        else:
+            created_on, pk, _ = self.cursor
+            queryset = queryset.filter(
+                Q(created_on__lt=created_on) | Q(created_on=created_on, id__lt=pk),
+                created_on__lte=created_on,
+            ).order_by("-created_on", "-id")
+        # One extra row tells us whether there is another page.
+        return queryset[: self.page_size + 1]
+
+    def build_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = list(rows[: self.page_size])
+        if self.reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, self.cursor is not None
+
+        self.next_cursor = None
+        self.previous_cursor = None
+        if rows and has_next:
+            self.next_cursor = self.encode_cursor(rows[-1], reverse=False)
+        if rows and has_previous:
+            self.previous_cursor = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.build_page(list(self.page_queryset(queryset, request, view)))
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_link(self.next_cursor),
+                "previous": self.get_link(self.previous_cursor),
+                "results": data,
+            }
+        )
+
 # class CustomPagination(pagination.PageNumberPagination):
 #     def get_paginated_response(self, data):
 #         return Response({
@@ -5,7 +5,6 @@ from apps.accounts.views import (
     CustomerViewSet,
     SupplierViewSet,
     BillerViewSet,
-    WarehouseViewSet,
 )
 
 router = DefaultRouter()
@@ -13,6 +12,5 @@ router.register("users", UserViewSet, basename="users")
 router.register("customers", CustomerViewSet, basename="customers")
 router.register("suppliers", SupplierViewSet, basename="suppliers")
 router.register("billers", BillerViewSet, basename="billers")
-router.register("warehouse", WarehouseViewSet, basename="warehouse")
 
 urlpatterns = router.urls
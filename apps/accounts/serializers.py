@@ -1,15 +1,15 @@
-import pyotp
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
 from django.contrib.auth.password_validation import validate_password
 from apps.accounts.models import (
-    OTP,
     User,
     Customer,
     Biller,
     Supplier,
     # Warehouse,
 )
+from apps.accounts.otp import get_otp_backend
+from utils.validation_for_phone_number import validate_mobile_number
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -46,6 +46,28 @@ class SupplierSerializer(serializers.ModelSerializer):
         )
 
 
+class BulkUserSerializer(UserSerializer):
+    """
+    ``UserSerializer`` without the per-row uniqueness queries; bulk
+    onboarding checks email, phone and username for the whole batch.
+    """
+    class Meta(UserSerializer.Meta):
+        extra_kwargs = {
+            "password": {"write_only": True, "required": False},
+            "email": {"validators": []},
+            "username": {"validators": []},
+            "phone": {"validators": [validate_mobile_number]},
+        }
+
+
+class BulkSupplierSerializer(serializers.ModelSerializer):
+    user = BulkUserSerializer()
+
+    class Meta:
+        model = Supplier
+        fields = ("user", "company")
+
+
 class CustomerSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
@@ -177,23 +199,8 @@ class ForgotPasswordSerializer(serializers.ModelSerializer):
     def validate(self, data):
         if data.get("password") != data.get("confirm_password"):
             raise serializers.ValidationError({"message": "The two password fields do not match"})
-        return data
-
-    def validate_otp(self, value):
-        
-        user = self.context["request"].user
 
-        try:
-            otp_obj = OTP.objects.get(user=user)
-        except OTP.DoesNotExist:
-            raise serializers.ValidationError("OTP not found.")
-
-        secret_key = otp_obj.secret_key
-
-        otp_instance = pyotp.TOTP(secret_key)
-        
-        if otp_instance.verify(value, valid_window=3):
-            otp_obj.delete()
-        else:
-            otp_obj.delete()
-            raise serializers.ValidationError("Invalid OTP.")
+        # Checked last so a mismatched password does not burn the code.
+        if not get_otp_backend().verify(self.context["user"], data["otp"]):
+            raise serializers.ValidationError({"otp": "Invalid OTP."})
+        return data
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounts.authentication import invalidate_user
+from apps.accounts.models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Covers password changes/resets and deactivation, which all save the user.
+    invalidate_user(instance.pk)
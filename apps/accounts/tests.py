@@ -1,3 +1,393 @@
-from django.test import TestCase
+import base64
+import json
+import smtplib
+import uuid
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import caches
+from django.core.mail.backends.locmem import EmailBackend
+from django.db.models import Min
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+
+from apps.accounts.authentication import (
+    CachedJWTAuthentication,
+    VersionedTokenObtainPairSerializer,
+    user_cache,
+)
+from apps.accounts.codes import CodeAllocator, next_code_number
+from apps.accounts.models import OTP, CodeSequence, OutboxEmail, Supplier, User
+from apps.accounts.onboarding import onboard_suppliers
+from apps.accounts.otp import BaseOTPBackend, CacheOTPBackend, DatabaseOTPBackend
+from apps.accounts.outbox import (
+    OUTBOX_SMTP_TIMEOUT,
+    claim_batch,
+    deliver_pending,
+    lease_duration,
+    send_batch,
+)
+from apps.accounts.pagination import KeysetPagination
+from utils.send_otp_to_email import send_otp_email
+
+
+class StandInBackend(EmailBackend):
+    """
+    Local SMTP stand-in: records connection opens, refuses recipients on
+    ``rejected.example.com`` and can drop the connection after ``fail_after``
+    messages.
+    """
+    def __init__(self, fail_after=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_after = fail_after
+        self.opened = 0
+        self.connected = False
+
+    def open(self):
+        if self.connected:
+            return False
+        self.opened += 1
+        self.connected = True
+        return True
+
+    def close(self):
+        self.connected = False
+
+    def send_messages(self, messages):
+        self.open()
+        for message in messages:
+            if self.fail_after is not None and len(mail.outbox) >= self.fail_after:
+                raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+            if message.to[0].endswith("@rejected.example.com"):
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (550, b"No such user")})
+        return super().send_messages(messages)
+
+
+class OutboxTests(TestCase):
+    def queue(self, *recipients):
+        for to in recipients:
+            OutboxEmail.objects.create(to=to, subject="Subject", body="Body")
+
+    def test_otp_email_is_queued_not_sent(self):
+        send_otp_email("user@example.com", "123456")
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.to, "user@example.com")
+        self.assertEqual(email.status, "Pending")
+
+    def test_batch_is_sent_over_one_connection(self):
+        self.queue("a@example.com", "b@example.com", "c@example.com")
+        backend = StandInBackend()
+
+        sent, unsent = send_batch(claim_batch(), connection=backend)
+
+        self.assertEqual((sent, unsent), (3, 0))
+        self.assertEqual(backend.opened, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxEmail.objects.exclude(status="Sent").exists())
+
+    def test_rejected_message_is_retried_with_backoff(self):
+        self.queue("a@example.com", "x@rejected.example.com", "b@example.com")
+
+        sent, unsent = send_batch(claim_batch(), connection=StandInBackend())
+
+        self.assertEqual((sent, unsent), (2, 1))
+        rejected = OutboxEmail.objects.get(to="x@rejected.example.com")
+        self.assertEqual(rejected.status, "Pending")
+        self.assertEqual(rejected.attempts, 1)
+        self.assertIn("SMTPRecipientsRefused", rejected.last_error)
+        self.assertGreater(rejected.send_after, timezone.now())
+        # Not due yet, so a second pass does not pick it up.
+        self.assertEqual(deliver_pending(), (0, 0))
+
+    def test_connection_failure_reschedules_rest_of_batch(self):
+        self.queue("a@example.com", "b@example.com", "c@example.com")
+
+        sent, unsent = send_batch(claim_batch(), connection=StandInBackend(fail_after=1))
+
+        self.assertEqual((sent, unsent), (1, 2))
+        self.assertEqual(OutboxEmail.objects.filter(status="Pending").count(), 2)
+
+    def test_lease_outlasts_a_batch_of_timeouts(self):
+        self.queue("a@example.com", "b@example.com")
+        before = timezone.now()
+
+        claim_batch(batch_size=2)
+
+        leased_until = OutboxEmail.objects.aggregate(until=Min("send_after"))["until"]
+        self.assertGreaterEqual(leased_until - before, lease_duration(2))
+        self.assertGreaterEqual(
+            lease_duration(2).total_seconds(), (2 * 4 + 5) * OUTBOX_SMTP_TIMEOUT
+        )
+
+    def test_message_fails_after_max_attempts(self):
+        self.queue("x@rejected.example.com")
+        OutboxEmail.objects.update(attempts=5)
+
+        send_batch(claim_batch(), connection=StandInBackend())
+
+        self.assertEqual(OutboxEmail.objects.get().status, "Failed")
+
+
+class OTPBackendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com",
+            password="password",
+            full_name="User",
+            username="user",
+            phone="+9779800000001",
+        )
+
+    def setUp(self):
+        caches["otp"].clear()
+
+    def test_backends_must_implement_issue_and_verify(self):
+        class IssueOnly(BaseOTPBackend):
+            def issue(self, user):
+                return "000000"
+
+        with self.assertRaises(TypeError):
+            IssueOnly()
+
+    def test_cache_code_is_single_use(self):
+        backend = CacheOTPBackend()
+        code = backend.issue(self.user)
+
+        self.assertTrue(backend.verify(self.user, code))
+        self.assertFalse(backend.verify(self.user, code))
+
+    def test_cache_new_code_replaces_old_one(self):
+        backend = CacheOTPBackend()
+        old = backend.issue(self.user)
+        new = backend.issue(self.user)
+
+        if old != new:
+            self.assertFalse(backend.verify(self.user, old))
+        self.assertTrue(backend.verify(self.user, new))
+
+    def test_cache_code_is_dropped_after_max_attempts(self):
+        backend = CacheOTPBackend()
+        code = backend.issue(self.user)
+        wrong = f"{(int(code) + 1) % 10 ** 6:06d}"
+
+        for _ in range(backend.max_attempts):
+            self.assertFalse(backend.verify(self.user, wrong))
+        self.assertFalse(backend.verify(self.user, code))
+
+    def test_cache_reissue_does_not_reset_attempts(self):
+        backend = CacheOTPBackend()
+        for _ in range(backend.max_attempts):
+            code = backend.issue(self.user)
+            self.assertFalse(backend.verify(self.user, f"{(int(code) + 1) % 10 ** 6:06d}"))
+
+        code = backend.issue(self.user)
+        self.assertFalse(backend.verify(self.user, code))
+
+    def test_database_backend_upserts_one_row(self):
+        backend = DatabaseOTPBackend()
+        backend.issue(self.user)
+        code = backend.issue(self.user)
+
+        self.assertEqual(OTP.objects.filter(user=self.user).count(), 1)
+        self.assertTrue(backend.verify(self.user, code))
+        self.assertFalse(OTP.objects.filter(user=self.user).exists())
+
+
+class CodeAllocatorTests(TestCase):
+    def test_allocators_sharing_a_sequence_never_overlap(self):
+        # Two allocators stand in for two processes.
+        first = CodeAllocator("test", prefix="T", block_size=3)
+        second = CodeAllocator("test", prefix="T", block_size=3)
+
+        codes = first.take(2) + second.take(4) + first.take(5) + second.take(1)
+
+        self.assertEqual(len(codes), len(set(codes)))
+
+    def test_sequence_is_seeded_once(self):
+        allocator = CodeAllocator("seeded", prefix="S", block_size=0, seed=lambda: 7)
+
+        self.assertEqual(allocator.take(2), ["S7", "S8"])
+        self.assertEqual(CodeSequence.objects.get(name="seeded").next_value, 9)
+
+    def test_seed_continues_after_the_highest_code(self):
+        for number in (3, 12):
+            Supplier.objects.create(
+                user=User.objects.create_user(
+                    email=f"supplier{number}@example.com",
+                    password="password",
+                    full_name="Supplier",
+                    username=f"supplier{number}",
+                    phone=f"+97798000001{number:02d}",
+                ),
+                company="Company",
+                supplier_code=f"SUP{number}",
+            )
+        Supplier.objects.filter(supplier_code="SUP3").delete()
+
+        self.assertEqual(next_code_number(Supplier, "supplier_code", "SUP"), 13)
+
+    def test_block_is_reused_without_queries(self):
+        allocator = CodeAllocator("cached", block_size=10)
+        # The spare block is only kept once the reserving transaction commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            allocator.next()
+
+        with self.assertNumQueries(0):
+            allocator.take(5)
+
+    def test_onboard_suppliers_reports_duplicates(self):
+        User.objects.create_user(
+            email="taken@example.com",
+            password="password",
+            full_name="Taken",
+            username="taken",
+            phone="+9779800000002",
+        )
+        rows = [
+            ("a@example.com", "+9779800000003", "a"),
+            ("taken@example.com", "+9779800000004", "b"),
+            ("c@example.com", "+9779800000003", "c"),
+        ]
+        lines = [
+            (
+                index,
+                {
+                    "company": "Company",
+                    "user": {
+                        "email": email,
+                        "phone": phone,
+                        "username": username,
+                        "full_name": username,
+                    },
+                },
+            )
+            for index, (email, phone, username) in enumerate(rows)
+        ]
+
+        suppliers, errors = onboard_suppliers(lines)
+
+        self.assertEqual(len(suppliers), 1)
+        self.assertEqual(sorted(errors), [1, 2])
+        self.assertEqual(len({supplier.supplier_code for supplier in suppliers}), 1)
+        self.assertFalse(User.objects.get(email="a@example.com").has_usable_password())
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="cached@example.com",
+            password="password",
+            full_name="Cached",
+            username="cached",
+            phone="+9779800000005",
+        )
+
+    def setUp(self):
+        user_cache.clear()
+        self.user.refresh_from_db()
+        token = VersionedTokenObtainPairSerializer.get_token(self.user).access_token
+        self.request = APIRequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_user_is_loaded_once(self):
+        CachedJWTAuthentication().authenticate(self.request)
+
+        with self.assertNumQueries(0):
+            user, _ = CachedJWTAuthentication().authenticate(self.request)
+        self.assertEqual(user.pk, self.user.pk)
+
+    def test_password_change_rejects_earlier_tokens(self):
+        CachedJWTAuthentication().authenticate(self.request)
+
+        self.user.set_password("changed")
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            CachedJWTAuthentication().authenticate(self.request)
+
+    def test_deactivation_rejects_earlier_tokens(self):
+        CachedJWTAuthentication().authenticate(self.request)
+
+        self.user.is_active = False
+        self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            CachedJWTAuthentication().authenticate(self.request)
+
+
+class KeysetPaginationTests(SimpleTestCase):
+    def decode(self, *payload):
+        cursor = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        request = Request(APIRequestFactory().get("/", {"cursor": cursor}))
+        return KeysetPagination().decode_cursor(request)
+
+    def test_cursor_is_decoded(self):
+        pk = uuid.uuid4()
+        created_on, decoded, reverse = self.decode("2024-01-01T00:00:00+00:00", str(pk), True)
+
+        self.assertEqual((created_on.year, decoded, reverse), (2024, pk, True))
+
+    def test_cursor_with_malformed_pk_is_not_found(self):
+        for pk in ("not-a-uuid", 7, None):
+            with self.assertRaises(NotFound):
+                self.decode("2024-01-01T00:00:00+00:00", pk, False)
+
+
+class KeysetPagingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(7):
+            OutboxEmail.objects.create(to=f"user{i}@example.com", subject="Subject", body="Body")
+        # Three rows share a timestamp, so pages must break ties on id.
+        tied = timezone.now()
+        OutboxEmail.objects.filter(
+            pk__in=OutboxEmail.objects.order_by("id").values("pk")[:3]
+        ).update(created_on=tied)
+        cls.expected = list(
+            OutboxEmail.objects.order_by("-created_on", "-id").values_list("pk", flat=True)
+        )
+
+    def page(self, cursor=None):
+        params = {"l": 2}
+        if cursor:
+            params["cursor"] = cursor
+        paginator = KeysetPagination()
+        rows = paginator.paginate_queryset(
+            OutboxEmail.objects.all(), Request(APIRequestFactory().get("/", params))
+        )
+        return [row.pk for row in rows], paginator
+
+    def test_forward_pages_neither_overlap_nor_skip(self):
+        seen, cursor = [], None
+        while True:
+            rows, paginator = self.page(cursor)
+            seen.extend(rows)
+            cursor = paginator.next_cursor
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, self.expected)
+
+    def test_backward_pages_mirror_forward_pages(self):
+        forward, cursor = [], None
+        while True:
+            rows, paginator = self.page(cursor)
+            forward.append(rows)
+            if paginator.next_cursor is None:
+                break
+            cursor = paginator.next_cursor
+
+        backward = []
+        cursor = paginator.previous_cursor
+        while cursor is not None:
+            rows, paginator = self.page(cursor)
+            backward.insert(0, rows)
+            cursor = paginator.previous_cursor
+
+        self.assertEqual(backward, forward[:-1])
@@ -3,6 +3,7 @@ from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 from django.db import transaction
 from django.shortcuts import get_object_or_404
@@ -21,12 +22,12 @@ from apps.accounts.models import (
     Supplier,
     Biller,
     # Warehouse,
-    OTP,
 )
 from apps.accounts.serializers import (
     UserSerializer,
     SupplierSerializer,
     GetSupplierSerializer,
+    BulkSupplierSerializer,
     CustomerSerializer,
     GetCustomerSerializer,
     BillerSerializer,
@@ -36,12 +37,18 @@ from apps.accounts.serializers import (
     PasswordResetRequestSerializer,
     ForgotPasswordSerializer,
 )
+from apps.accounts.codes import biller_codes, supplier_codes
+from apps.accounts.onboarding import onboard_suppliers
+from apps.accounts.otp import get_otp_backend
+from apps.accounts.outbox import queue_stats
 from apps.accounts.pagination import MyPagination
 from utils.send_otp_to_email import send_otp_email
-from django.conf import settings
+from utils.bulk import BulkCreateMixin
+from utils.conditional import ConditionalGetMixin
+from utils.prefetch import RelatedQuerysetMixin
 
 
-class CommonModelViewset(ModelViewSet):
+class CommonModelViewset(ConditionalGetMixin, RelatedQuerysetMixin, ModelViewSet):
     pagination_class = MyPagination
 
 
@@ -123,7 +130,7 @@ class UserViewSet(CommonModelViewset):
         email = email_serializer.validated_data["email"]
         user = get_object_or_404(User, email=email)
 
-        otp = OTP.generate_otp(user=user)
+        otp = get_otp_backend().issue(user)
 
         send_otp_email(user.email, otp)
 
@@ -140,7 +147,7 @@ class UserViewSet(CommonModelViewset):
         user = self.get_object()
 
         forgot_password_serializer = ForgotPasswordSerializer(
-            data=request.data, context={"request": request}
+            data=request.data, context={"request": request, "user": user}
         )
 
         forgot_password_serializer.is_valid(raise_exception=True)
@@ -226,9 +233,11 @@ class CustomerViewSet(CommonModelViewset):
         return Response(response_data, status=status.HTTP_201_CREATED)
 
 
-class SupplierViewSet(CommonModelViewset):
+class SupplierViewSet(BulkCreateMixin, CommonModelViewset):
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
+    bulk_serializer_class = BulkSupplierSerializer
+    bulk_handler = staticmethod(onboard_suppliers)
 
     permission_classes_by_action = {
         "list": [IsAuthenticated],
@@ -253,6 +262,9 @@ class SupplierViewSet(CommonModelViewset):
         return super().get_serializer_class()
 
     def create(self, request):
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
+
         request.data["user"]["role"] = "Supplier"
 
         user_serializer = UserSerializer(data=request.data["user"])
@@ -263,10 +275,7 @@ class SupplierViewSet(CommonModelViewset):
 
         with transaction.atomic():
             user = user_serializer.save()
-            supplier_serializer.save(
-                user=user,
-                supplier_code=f"{settings.SUPPLIER_CODE}{Supplier.objects.count()}",
-            )
+            supplier_serializer.save(user=user, supplier_code=supplier_codes.next())
 
         response_data = {
             "message": "Supplier created successfully",
@@ -313,9 +322,7 @@ class BillerViewSet(CommonModelViewset):
 
         with transaction.atomic():
             user = user_serializer.save()
-            biller_serializer.save(
-                user=user, biller_code=f"{settings.BILLER_CODE}{Biller.objects.count()}"
-            )
+            biller_serializer.save(user=user, biller_code=biller_codes.next())
 
         response_data = {
             "message": "Biller created successfully",
@@ -323,3 +330,10 @@ class BillerViewSet(CommonModelViewset):
         }
 
         return Response(response_data, status=status.HTTP_201_CREATED)
+
+
+class OutboxStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(queue_stats())
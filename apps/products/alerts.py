@@ -0,0 +1,116 @@
+import contextvars
+from contextlib import contextmanager
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.products.models import LowStockAlert, StockBalance
+
+ALERT_BATCH_SIZE = 1000
+
+# Pairs collected by an enclosing ``batched()`` block, if any.
+_batch = contextvars.ContextVar("low_stock_batch", default=None)
+
+
+def _matching(pairs):
+    match = Q()
+    for product_id, warehouse_id in pairs:
+        match |= Q(product_id=product_id, warehouse_id=warehouse_id)
+    return match
+
+
+def touch(pairs):
+    """
+    Re-evaluate the given ``(product_id, warehouse_id)`` pairs once the
+    current transaction commits (straight away outside one). The pairs
+    travel in the commit callback itself, so they are evaluated on
+    whichever thread commits and are dropped with a rolled-back
+    transaction. Inside ``batched()`` they are only collected.
+    """
+    pairs = set(pairs)
+    batch = _batch.get()
+    if batch is not None:
+        batch.update(pairs)
+    elif pairs:
+        transaction.on_commit(partial(evaluate, pairs))
+
+
+@contextmanager
+def batched():
+    """
+    Collect the pairs touched inside the block and register them as one
+    evaluation when it exits cleanly; for loops of single movements.
+    """
+    pairs = set()
+    token = _batch.set(pairs)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+    touch(pairs)
+
+
+def touch_products(product_ids):
+    """
+    Re-evaluate every warehouse of the given products, e.g. after their
+    ``stock_alert`` changed.
+    """
+    touch(
+        StockBalance.objects.filter(product_id__in=product_ids).values_list(
+            "product_id", "warehouse_id"
+        )
+    )
+
+
+def evaluate(pairs):
+    """
+    Bring the alerts of ``pairs`` in line with their current balances: one
+    locked read of the balances, one upsert of the pairs at or below
+    threshold and one delete of the rest, per batch.
+
+    The balances stay locked until the alerts are written, so no movement
+    can commit in between and leave a stale alert behind; the movement's
+    own evaluation runs after it. Rows are locked in (product, warehouse)
+    order, the order movements take them in.
+    """
+    pairs = list(pairs)
+    for start in range(0, len(pairs), ALERT_BATCH_SIZE):
+        batch = pairs[start:start + ALERT_BATCH_SIZE]
+        with transaction.atomic():
+            balances = (
+                StockBalance.objects.filter(_matching(batch))
+                .select_for_update(no_key=True, of=("self",))
+                .order_by("product_id", "warehouse_id")
+                .values_list("product_id", "warehouse_id", "on_hand", "product__stock_alert")
+            )
+            now = timezone.now()
+            low = [
+                LowStockAlert(
+                    product_id=product_id,
+                    warehouse_id=warehouse_id,
+                    on_hand=on_hand,
+                    threshold=threshold,
+                    modified_on=now,
+                )
+                for product_id, warehouse_id, on_hand, threshold in balances
+                if on_hand <= threshold
+            ]
+            recovered = set(batch) - {(alert.product_id, alert.warehouse_id) for alert in low}
+
+            LowStockAlert.objects.bulk_create(
+                low,
+                update_conflicts=True,
+                unique_fields=["product", "warehouse"],
+                update_fields=["on_hand", "threshold", "modified_on"],
+            )
+            if recovered:
+                LowStockAlert.objects.filter(_matching(recovered)).delete()
+
+
+def rebuild_alerts():
+    """
+    Evaluate every stocked (product, warehouse); for backfills.
+    """
+    evaluate(StockBalance.objects.values_list("product_id", "warehouse_id"))
@@ -0,0 +1,273 @@
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from apps.accounts.authentication import CachedJWTAuthentication
+from apps.accounts.pagination import KeysetPagination, MyPagination
+from apps.products.models import (
+    Brand,
+    Category,
+    Product,
+    Unit,
+    Warehouse,
+)
+from apps.products.serializers import (
+    BrandSerializers,
+    CategorySerializer,
+    GetBrandSeralizer,
+    GetCategorySeralizer,
+    GETProductSerializer,
+    GetUnitSeralizer,
+    ProductSerializer,
+    UnitSerializer,
+    WarehouseSerializer,
+)
+from utils.prefetch import plan_related
+
+
+async def aprefetch_many(instances, field_name):
+    """
+    Async ``prefetch_related`` for one many-to-many field: two queries in
+    total, with the results stored in ``_prefetched_objects_cache`` exactly
+    where Django's own prefetch puts them, so serializers read them without
+    touching the database.
+    """
+    if not instances:
+        return
+    field = instances[0]._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+
+    links = [
+        link
+        async for link in through.objects.filter(
+            **{f"{source}_id__in": [instance.pk for instance in instances]}
+        ).values_list(f"{source}_id", f"{target}_id").aiterator()
+    ]
+    related = {
+        obj.pk: obj
+        async for obj in field.related_model.objects.filter(
+            pk__in={target_id for _, target_id in links}
+        ).aiterator()
+    }
+
+    by_source = defaultdict(list)
+    for source_id, target_id in links:
+        by_source[source_id].append(related[target_id])
+
+    for instance in instances:
+        queryset = getattr(instance, field_name).get_queryset()
+        queryset._result_cache = by_source[instance.pk]
+        queryset._prefetch_done = True
+        if not hasattr(instance, "_prefetched_objects_cache"):
+            instance._prefetched_objects_cache = {}
+        instance._prefetched_objects_cache[field.name] = queryset
+
+
+class AsyncReadView(View):
+    """
+    Native async list/retrieve for a model, for ASGI deployments.
+
+    Runs on the event loop end to end: JWT authentication and the row
+    queries use the async ORM (``aget``/``aiterator``), relations are
+    joined or prefetched up front with ``plan_related``, so serializing is
+    pure CPU work. Output, permissions, error bodies and each resource's
+    paginator (envelope and ordering) match the DRF viewsets; the sync
+    viewsets' filter and search parameters are not supported.
+    """
+    http_method_names = ["get"]
+    queryset = None
+    serializer_class = None
+    detail_serializer_class = None
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+    permission_classes_by_action = {}
+
+    def get_permissions(self):
+        try:
+            return [
+                permission()
+                for permission in self.permission_classes_by_action[self.action]
+            ]
+        except KeyError:
+            return [permission() for permission in self.permission_classes]
+
+    def get_serializer_class(self):
+        if self.action == "retrieve" and self.detail_serializer_class:
+            return self.detail_serializer_class
+        return self.serializer_class
+
+    def get_queryset(self):
+        select, _ = plan_related(self.get_serializer_class())
+        queryset = self.queryset.all()
+        if select:
+            queryset = queryset.select_related(*select)
+        return queryset
+
+    async def prefetch(self, instances):
+        _, prefetch = plan_related(self.get_serializer_class())
+        for field_name in prefetch:
+            await aprefetch_many(instances, field_name)
+
+    async def authenticate(self, request):
+        """
+        Bearer tokens are checked without leaving the event loop, with users
+        served from the ``CachedJWTAuthentication`` cache; any other
+        credentials go through the configured DRF authenticators.
+        """
+        authenticator = CachedJWTAuthentication()
+        header = authenticator.get_header(request)
+        raw_token = None if header is None else authenticator.get_raw_token(header)
+        if raw_token is None:
+            await sync_to_async(lambda: request.user)()
+            return
+        token = authenticator.get_validated_token(raw_token)
+        user = authenticator.get_cached_user(token)
+        if user is None:
+            try:
+                user_id = token[jwt_settings.USER_ID_CLAIM]
+            except KeyError:
+                raise exceptions.AuthenticationFailed(
+                    "Token contained no recognizable user identification"
+                )
+            user = await get_user_model().objects.filter(
+                **{jwt_settings.USER_ID_FIELD: user_id}
+            ).afirst()
+            if user is None:
+                raise exceptions.AuthenticationFailed("User not found")
+            if not user.is_active:
+                raise exceptions.AuthenticationFailed("User is inactive")
+            user = authenticator.remember_user(token, user)
+        request._authenticator = authenticator
+        request.user = user
+        request.auth = token
+
+    def check_permissions(self, request, obj=None):
+        for permission in self.get_permissions():
+            allowed = (
+                permission.has_permission(request, self)
+                if obj is None
+                else permission.has_object_permission(request, self, obj)
+            )
+            if not allowed:
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(
+                    getattr(permission, "message", None)
+                )
+
+    async def get(self, request, pk=None):
+        self.action = "list" if pk is None else "retrieve"
+        self.request = Request(request, authenticators=[
+            auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES
+        ])
+        try:
+            await self.authenticate(self.request)
+            self.check_permissions(self.request)
+            if pk is None:
+                data = await self.list(self.request)
+            else:
+                data = await self.retrieve(self.request, pk)
+        except exceptions.APIException as exc:
+            return self.handle_exception(exc)
+        return JsonResponse(data, encoder=JSONEncoder, safe=False)
+
+    async def list(self, request):
+        paginator = self.pagination_class()
+        queryset = self.get_queryset()
+        if isinstance(paginator, KeysetPagination):
+            page = paginator.page_queryset(queryset, request, view=self)
+            rows = paginator.build_page([row async for row in page.aiterator()])
+        else:
+            rows = await self.paginate_limit_offset(paginator, queryset, request)
+        await self.prefetch(rows)
+        serializer = self.get_serializer_class()(
+            rows, many=True, context={"request": request, "view": self}
+        )
+        return paginator.get_paginated_response(serializer.data).data
+
+    async def paginate_limit_offset(self, paginator, queryset, request):
+        """
+        ``LimitOffsetPagination.paginate_queryset`` on the async ORM.
+        """
+        paginator.request = request
+        paginator.limit = paginator.get_limit(request)
+        paginator.count = await queryset.acount()
+        paginator.offset = paginator.get_offset(request)
+        if paginator.count == 0 or paginator.offset > paginator.count:
+            return []
+        page = queryset[paginator.offset:paginator.offset + paginator.limit]
+        return [row async for row in page.aiterator()]
+
+    async def retrieve(self, request, pk):
+        try:
+            instance = await self.get_queryset().aget(pk=pk)
+        except (self.queryset.model.DoesNotExist, ValidationError, ValueError):
+            raise exceptions.NotFound()
+        self.check_permissions(request, instance)
+        await self.prefetch([instance])
+        serializer = self.get_serializer_class()(
+            instance, context={"request": request, "view": self}
+        )
+        return serializer.data
+
+    def handle_exception(self, exc):
+        if isinstance(exc.detail, (list, dict)):
+            data = exc.detail
+        else:
+            data = {"detail": exc.detail}
+        response = JsonResponse(data, encoder=JSONEncoder, status=exc.status_code, safe=False)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response["WWW-Authenticate"] = CachedJWTAuthentication().authenticate_header(
+                self.request
+            )
+            response.status_code = status.HTTP_401_UNAUTHORIZED
+        return response
+
+
+class AsyncProductView(AsyncReadView):
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    detail_serializer_class = GETProductSerializer
+    pagination_class = KeysetPagination
+    max_page_size = 5000
+    permission_classes_by_action = {
+        "list": [AllowAny],
+        "retrieve": [IsAuthenticated],
+    }
+
+
+class AsyncWarehouseView(AsyncReadView):
+    queryset = Warehouse.objects.all()
+    serializer_class = WarehouseSerializer
+
+
+class AsyncBrandView(AsyncReadView):
+    queryset = Brand.objects.all()
+    pagination_class = MyPagination
+    serializer_class = BrandSerializers
+    detail_serializer_class = GetBrandSeralizer
+
+
+class AsyncCategoryView(AsyncReadView):
+    queryset = Category.objects.all()
+    pagination_class = MyPagination
+    serializer_class = CategorySerializer
+    detail_serializer_class = GetCategorySeralizer
+
+
+class AsyncUnitView(AsyncReadView):
+    queryset = Unit.objects.all()
+    serializer_class = UnitSerializer
+    detail_serializer_class = GetUnitSeralizer
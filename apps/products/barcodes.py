@@ -0,0 +1,261 @@
+import hashlib
+import io
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from html import escape
+
+import barcode
+from barcode.writer import ImageWriter
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from apps.products.models import (
+    Barcode,
+    BarcodeJob,
+    Product,
+)
+from utils.context import submit_with_context
+
+BARCODE_DIRECTORY = "media/barcode-image/"
+BARCODE_RENDER_WORKERS = 4
+BARCODE_JOB_CHUNK_SIZE = 200
+
+# Writer options per BARCODE_PAPER_SIZE label width (module sizes in mm).
+PAPER_OPTIONS = {
+    "50": {"module_width": 0.3, "module_height": 15.0, "font_size": 10},
+    "40": {"module_width": 0.25, "module_height": 12.0, "font_size": 8},
+    "30": {"module_width": 0.2, "module_height": 9.0, "font_size": 6},
+}
+
+# Label (width, height) in mm per BARCODE_PAPER_SIZE, and the A4 sheet
+# they are laid out on.
+LABEL_SIZES = {
+    "50": (50, 25),
+    "40": (40, 20),
+    "30": (30, 15),
+}
+SHEET_SIZE = (210, 297)
+SHEET_MARGIN = 5
+LABEL_GAP = 2
+QUIET_ZONE = 2
+
+# Jobs run one at a time; each job fans its renders out to the render pool.
+_jobs = ThreadPoolExecutor(max_workers=1, thread_name_prefix="barcode-job")
+_renderers = ThreadPoolExecutor(
+    max_workers=BARCODE_RENDER_WORKERS, thread_name_prefix="barcode-render"
+)
+
+
+def barcode_name(product_code, papersize):
+    """
+    Storage name for a label. It only depends on the code and paper size,
+    so an unchanged product maps to the file that is already there.
+    """
+    digest = hashlib.sha1(f"{product_code}:{papersize}".encode()).hexdigest()[:20]
+    return f"{BARCODE_DIRECTORY}barcode_{digest}.png"
+
+
+def render_barcode(product_code, papersize):
+    """
+    Render a Code128 PNG for ``product_code`` and return its storage name,
+    reusing the stored file if this code and size were rendered before.
+    """
+    name = barcode_name(product_code, papersize)
+    if default_storage.exists(name):
+        return name
+
+    code = barcode.get_barcode_class("code128")(str(product_code), writer=ImageWriter())
+    buffer = io.BytesIO()
+    code.write(buffer, options=PAPER_OPTIONS.get(papersize))
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+@lru_cache(maxsize=4096)
+def barcode_modules(product_code):
+    """
+    Code128 module pattern for ``product_code``, ``"1"`` being a bar.
+    """
+    return barcode.get_barcode_class("code128")(str(product_code)).build()[0]
+
+
+def svg_label(product_code, x, y, width, height):
+    """
+    SVG fragment for one label at ``(x, y)``, all sizes in mm. Bars are
+    drawn straight from the module pattern as a single path, so no raster
+    image or font metrics are involved.
+    """
+    modules = barcode_modules(product_code)
+    module_width = (width - 2 * QUIET_ZONE) / len(modules)
+    bar_height = height * 0.7
+
+    bars = "".join(
+        f"M{QUIET_ZONE + run.start() * module_width:.3f} 1"
+        f"h{len(run.group()) * module_width:.3f}v{bar_height:.2f}"
+        f"h-{len(run.group()) * module_width:.3f}z"
+        for run in re.finditer("1+", modules)
+    )
+    return (
+        f'<g transform="translate({x} {y})">'
+        f'<path d="{bars}"/>'
+        f'<text x="{width / 2}" y="{height - 1.5}" font-size="{height * 0.15:.2f}" '
+        f'text-anchor="middle">{escape(str(product_code))}</text>'
+        f"</g>"
+    )
+
+
+def _svg(width, height, body):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}mm" height="{height}mm" '
+        f'viewBox="0 0 {width} {height}" font-family="monospace">{body}</svg>'
+    )
+
+
+def render_svg(product_code, papersize):
+    width, height = LABEL_SIZES[papersize]
+    return _svg(width, height, svg_label(product_code, 0, 0, width, height))
+
+
+def render_sheet(product_codes, papersize):
+    """
+    Lay labels out on A4 pages and return a single printable HTML
+    document with one inline SVG per page.
+    """
+    width, height = LABEL_SIZES[papersize]
+    sheet_width, sheet_height = SHEET_SIZE
+    columns = (sheet_width - 2 * SHEET_MARGIN + LABEL_GAP) // (width + LABEL_GAP)
+    rows = (sheet_height - 2 * SHEET_MARGIN + LABEL_GAP) // (height + LABEL_GAP)
+    per_page = columns * rows
+
+    pages = []
+    for start in range(0, len(product_codes), per_page):
+        labels = []
+        for position, product_code in enumerate(product_codes[start:start + per_page]):
+            row, column = divmod(position, columns)
+            labels.append(
+                svg_label(
+                    product_code,
+                    SHEET_MARGIN + column * (width + LABEL_GAP),
+                    SHEET_MARGIN + row * (height + LABEL_GAP),
+                    width,
+                    height,
+                )
+            )
+        pages.append(_svg(sheet_width, sheet_height, "".join(labels)))
+
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><style>"
+        "@page{size:A4;margin:0}body{margin:0}"
+        "svg{display:block;page-break-after:always}"
+        "</style></head><body>" + "".join(pages) + "</body></html>"
+    )
+
+
+def enqueue_barcode_job(product_ids, papersize, user=None):
+    # Each product has one Barcode row; a repeated id would be created twice.
+    product_ids = list(dict.fromkeys(str(product_id) for product_id in product_ids))
+    job = BarcodeJob.objects.create(
+        products=product_ids,
+        papersize=papersize,
+        total=len(product_ids),
+        created_by=user,
+    )
+    transaction.on_commit(lambda: submit_with_context(_jobs, run_barcode_job, job.pk))
+    return job
+
+
+def _render(product_code, papersize):
+    try:
+        return render_barcode(product_code, papersize), None
+    except Exception as exc:
+        return None, str(exc)
+
+
+def _run_chunk(job, product_ids):
+    product_ids = [uuid.UUID(str(product_id)) for product_id in product_ids]
+    products = dict(
+        Product.objects.filter(id__in=product_ids).values_list("id", "product_code")
+    )
+    existing = {
+        current.information_id: current
+        for current in Barcode.objects.filter(information_id__in=product_ids)
+    }
+
+    pending = []
+    for product_id in product_ids:
+        product_code = products.get(product_id)
+        if product_id not in products:
+            job.errors[str(product_id)] = "Product does not exist."
+        elif not product_code:
+            job.errors[str(product_id)] = "Product code is required."
+        else:
+            current = existing.get(product_id)
+            if (
+                current is not None
+                and current.barcode_image.name == barcode_name(product_code, job.papersize)
+            ):
+                job.skipped += 1
+            else:
+                pending.append((product_id, product_code))
+
+    rendered = _renderers.map(
+        lambda item: _render(item[1], job.papersize), pending
+    )
+
+    create = []
+    update = []
+    now = timezone.now()
+    for (product_id, _), (name, error) in zip(pending, rendered):
+        if error:
+            job.errors[str(product_id)] = error
+            continue
+        current = existing.get(product_id)
+        if current is None:
+            create.append(
+                Barcode(
+                    information_id=product_id,
+                    papersize=job.papersize,
+                    barcode_image=name,
+                    created_by_id=job.created_by_id,
+                )
+            )
+        else:
+            current.barcode_image = name
+            current.papersize = job.papersize
+            current.modified_on = now
+            update.append(current)
+
+    Barcode.objects.bulk_create(create)
+    Barcode.objects.bulk_update(update, ["barcode_image", "papersize", "modified_on"])
+    job.rendered += len(create) + len(update)
+    job.failed = len(job.errors)
+
+
+def run_barcode_job(job_id):
+    """
+    Render every product of a job, saving progress after each chunk so
+    the status endpoint can report it.
+    """
+    try:
+        job = BarcodeJob.objects.get(pk=job_id)
+        job.status = "Running"
+        job.save(update_fields=["status", "modified_on"])
+
+        try:
+            for start in range(0, len(job.products), BARCODE_JOB_CHUNK_SIZE):
+                _run_chunk(job, job.products[start:start + BARCODE_JOB_CHUNK_SIZE])
+                job.save(
+                    update_fields=["rendered", "skipped", "failed", "errors", "modified_on"]
+                )
+        except Exception as exc:
+            job.status = "Failed"
+            job.errors["job"] = str(exc)
+        else:
+            job.status = "Complete"
+        job.finished_on = timezone.now()
+        job.save()
+    finally:
+        close_old_connections()
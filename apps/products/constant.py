@@ -38,3 +38,14 @@ ADJUSTMENT_TYPE = [
     ('Addition', 'Addition'),
     ('Substraction', 'Substraction')
 ]
+MOVEMENT_TYPE = [
+    ('Adjustment', 'Adjustment'),
+    ('Purchase', 'Purchase'),
+    ('Sale', 'Sale'),
+]
+JOB_STATUS = [
+    ('Pending', 'Pending'),
+    ('Running', 'Running'),
+    ('Complete', 'Complete'),
+    ('Failed', 'Failed'),
+]
@@ -0,0 +1,301 @@
+import csv
+import json
+import time
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+
+from apps.products.models import (
+    Brand,
+    Category,
+    Product,
+    Unit,
+    Warehouse,
+)
+from apps.products.search import refresh_search_vectors
+from utils.context import get_current_user
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+WAREHOUSE_SEPARATOR = "|"
+
+PRODUCT_FIELDS = (
+    "product_name",
+    "product_type",
+    "product_code",
+    "barcode",
+    "product_price",
+    "expense",
+    "unit_price",
+    "product_tax",
+    "tax_method",
+    "discount",
+    "stock_alert",
+    "featured",
+    "price_difference_in_warehouse",
+    "has_expiry_date",
+    "add_promotional_sale",
+    "has_multi_variant",
+    "has_imie_code",
+)
+
+# Reference columns accept either a primary key or the natural name below.
+REFERENCE_FIELDS = {
+    "brand": (Brand, "brand_name"),
+    "category": (Category, "name"),
+    "product_unit": (Unit, "short_name"),
+    "warehouse": (Warehouse, "name"),
+}
+
+
+class ImportFileError(ValueError):
+    """
+    The upload cannot be read past ``line`` (a physical line of the file).
+    """
+    def __init__(self, line, reason):
+        self.line = line
+        super().__init__(f"Line {line}: {reason}")
+
+
+class _Lines:
+    """
+    The upload's lines, decoded one at a time so a bad byte is reported on
+    its own line. ``number`` is the last line read.
+    """
+    def __init__(self, fileobj):
+        self.lines = iter(fileobj)
+        self.number = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = next(self.lines)
+        self.number += 1
+        if isinstance(line, bytes):
+            try:
+                line = line.decode("utf-8")
+            except UnicodeDecodeError as exc:
+                raise ImportFileError(self.number, f"not valid UTF-8 ({exc.reason}).")
+        return line
+
+
+def split_warehouses(value):
+    """
+    A ``warehouse`` value as a list: text is split on ``|``, a list is kept
+    as is.
+    """
+    if value in (None, ""):
+        return []
+    if isinstance(value, str):
+        value = value.split(WAREHOUSE_SEPARATOR)
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def read_csv(fileobj):
+    """
+    Yield rows from a CSV file with a header line. Warehouses are given in
+    a single ``warehouse`` column separated by ``|``. Raises
+    ``ImportFileError`` on undecodable or malformed lines.
+    """
+    lines = _Lines(fileobj)
+    try:
+        for row in csv.DictReader(lines):
+            row["warehouse"] = split_warehouses(row.get("warehouse"))
+            yield row
+    except csv.Error as exc:
+        raise ImportFileError(lines.number, f"{exc}.")
+
+
+def read_ndjson(fileobj):
+    """
+    Yield one object per NDJSON line. Lines that fail to parse are yielded
+    as the ``ValueError`` so the importer can report them against the row.
+    ``warehouse`` may be a list or ``|``-separated text, as in CSV. Raises
+    ``ImportFileError`` on undecodable lines.
+    """
+    for line in _Lines(fileobj):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield exc
+            continue
+        if isinstance(row, dict):
+            row["warehouse"] = split_warehouses(row.get("warehouse"))
+        yield row
+
+
+def read_rows(fileobj, name):
+    if name.endswith(".csv"):
+        return read_csv(fileobj)
+    if name.endswith((".ndjson", ".jsonl")):
+        return read_ndjson(fileobj)
+    raise ValueError("Only .csv and .ndjson files can be imported.")
+
+
+class ProductImporter:
+    """
+    Streams product rows into the database in batches.
+
+    For every batch the brand/category/unit/warehouse references are
+    resolved with one query per reference type, then products and their
+    ``Product.warehouse`` through-rows are written with ``bulk_create`` in
+    one transaction. Rows that fail validation are skipped and reported.
+    An unreadable file stops the import at the bad line; the rows before
+    it are still imported and the report carries the file ``error``.
+    """
+
+    def __init__(self, user=None, batch_size=IMPORT_BATCH_SIZE):
+        self.user = user if user is not None else get_current_user()
+        self.batch_size = batch_size
+        self.processed = 0
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.error = None
+        self.started = None
+
+    def run(self, rows):
+        self.started = time.monotonic()
+        batch = []
+        try:
+            for number, row in enumerate(rows, start=1):
+                batch.append((number, row))
+                if len(batch) >= self.batch_size:
+                    self.import_batch(batch)
+                    batch = []
+        except ImportFileError as exc:
+            self.error = str(exc)
+        if batch:
+            self.import_batch(batch)
+        return self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started if self.started else 0
+        report = {
+            "processed": self.processed,
+            "created": self.created,
+            "failed": self.failed,
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(self.processed / elapsed, 1) if elapsed else None,
+            "errors": self.errors,
+        }
+        if self.error:
+            report["error"] = self.error
+        return report
+
+    def import_batch(self, batch):
+        lookups = self.resolve_references(
+            [row for _, row in batch if isinstance(row, dict)]
+        )
+        through = Product.warehouse.through
+
+        products = []
+        links = []
+        for number, row in batch:
+            self.processed += 1
+            if not isinstance(row, dict):
+                self.add_error(number, {"row": [str(row) or "Invalid row."]})
+                continue
+            try:
+                product, warehouse_ids = self.build_product(row, lookups)
+            except ValidationError as exc:
+                self.add_error(number, exc.message_dict)
+                continue
+            products.append(product)
+            links.extend(
+                through(product_id=product.id, warehouse_id=warehouse_id)
+                for warehouse_id in warehouse_ids
+            )
+
+        with transaction.atomic():
+            Product.objects.bulk_create(products)
+            through.objects.bulk_create(links, ignore_conflicts=True)
+            refresh_search_vectors(product_ids=[product.id for product in products])
+        self.created += len(products)
+
+    def resolve_references(self, rows):
+        """
+        Map every reference value used in ``rows`` (pk or name) to a pk,
+        with one query per reference type.
+        """
+        lookups = {}
+        for field, (model, name_field) in REFERENCE_FIELDS.items():
+            values = set()
+            for row in rows:
+                value = row.get(field)
+                if isinstance(value, (list, tuple)):
+                    values.update(str(item).strip() for item in value)
+                elif value not in (None, ""):
+                    values.add(str(value).strip())
+
+            pks = set()
+            for value in values:
+                try:
+                    pks.add(uuid.UUID(value))
+                except ValueError:
+                    pass
+
+            lookup = {}
+            if values:
+                matches = model.objects.filter(
+                    Q(pk__in=pks) | Q(**{f"{name_field}__in": values})
+                ).values_list("pk", name_field)
+                for pk, name in matches:
+                    lookup.setdefault(name, pk)
+                    lookup[str(pk)] = pk
+            lookups[field] = lookup
+        return lookups
+
+    def build_product(self, row, lookups):
+        values = {
+            field: row[field]
+            for field in PRODUCT_FIELDS
+            if row.get(field) not in (None, "")
+        }
+
+        errors = {}
+        for field in ("brand", "category", "product_unit"):
+            value = row.get(field)
+            if value in (None, ""):
+                errors[field] = ["This field is required."]
+                continue
+            pk = lookups[field].get(str(value).strip())
+            if pk is None:
+                errors[field] = [f'"{value}" does not exist.']
+            else:
+                values[f"{field}_id"] = pk
+
+        warehouse_ids = []
+        for value in row.get("warehouse") or []:
+            pk = lookups["warehouse"].get(str(value).strip())
+            if pk is None:
+                errors.setdefault("warehouse", []).append(f'"{value}" does not exist.')
+            else:
+                warehouse_ids.append(pk)
+
+        product = Product(user=self.user, created_by=self.user, **values)
+        try:
+            # References were resolved above; skip the per-row FK queries.
+            product.full_clean(
+                exclude=[*REFERENCE_FIELDS, "user", "created_by", "modified_by"],
+                validate_unique=False,
+            )
+        except ValidationError as exc:
+            errors.update(exc.message_dict)
+
+        if errors:
+            raise ValidationError(errors)
+        return product, warehouse_ids
+
+    def add_error(self, number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": number, "errors": errors})
@@ -0,0 +1,200 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from apps.products.models import (
+    PurchaseInvoice,
+    PurchaseItem,
+    SalesInvoice,
+    SalesItem,
+)
+from apps.products.pricing import money
+from utils.invoice_worker import (
+    HTML,
+    INVOICE_FORMATS,
+    render_and_store,
+    render_document,
+    setup_worker,
+)
+
+INVOICE_DIRECTORY = "invoices/"
+INVOICE_CHUNK_SIZE = 500
+
+
+def check_format(output):
+    if output not in INVOICE_FORMATS:
+        raise ValueError(f"Unknown invoice format {output!r}.")
+    if output == "pdf" and HTML is None:
+        raise ImproperlyConfigured("PDF invoices need WeasyPrint to be installed.")
+
+
+class InvoiceRenderer:
+    """
+    Renders the invoices of one order type, singly or in bulk.
+
+    Everything a document needs (order, lines, products, warehouse, party)
+    is loaded per chunk with one joined query and one prefetch, and turned
+    into plain, picklable contexts. Batch runs hand the contexts to a
+    process pool whose workers render and write to storage in parallel;
+    the parent records the stored names with one ``bulk_update`` per chunk.
+    """
+    def __init__(
+        self, model, item_model, order_field, party_field, party_label, discount_field, title
+    ):
+        self.model = model
+        self.item_model = item_model
+        self.order_field = order_field
+        self.party_field = party_field
+        self.party_label = party_label
+        self.discount_field = discount_field
+        self.title = title
+
+    def queryset(self):
+        order = self.order_field
+        return self.model.objects.select_related(
+            "warehouse",
+            f"{order}__warehouse",
+            f"{order}__{self.party_field}__user",
+        ).prefetch_related(
+            Prefetch(
+                f"{order}__items",
+                queryset=self.item_model.objects.select_related("product").order_by(
+                    "created_on", "id"
+                ),
+            )
+        )
+
+    def context(self, invoice):
+        """
+        Template context for ``invoice``, or ``None`` if it has no order.
+        """
+        order = getattr(invoice, self.order_field)
+        if order is None:
+            return None
+        warehouse = invoice.warehouse or order.warehouse
+        party = getattr(order, self.party_field)
+        return {
+            "storage_name": f"{INVOICE_DIRECTORY}{self.model._meta.model_name}/{invoice.pk}",
+            "title": self.title,
+            "number": str(invoice.pk).split("-")[0].upper(),
+            "date": order.created_on,
+            "status": order.sales_status,
+            "warehouse": {
+                "name": warehouse.name,
+                "address": warehouse.address,
+                "city": warehouse.city,
+                "country": warehouse.country,
+                "phone": str(warehouse.phone),
+                "email": warehouse.email,
+            },
+            "party_label": self.party_label,
+            "party": {
+                "name": party.user.full_name,
+                "company": getattr(party, "company", ""),
+                "phone": str(party.user.phone),
+                "email": party.user.email,
+            },
+            "lines": [
+                {
+                    "product": item.product.product_name,
+                    "code": item.product.product_code,
+                    "quantity": item.quantity,
+                    "unit_price": item.unit_price,
+                    "discount": item.discount,
+                    "tax": item.tax,
+                    "total": item.total,
+                }
+                for item in order.items.all()
+            ],
+            "subtotal": order.subtotal,
+            "item_tax": order.item_tax,
+            "discount": money(getattr(order, self.discount_field)),
+            "order_tax_amount": order.order_tax_amount,
+            "shipping": money(order.shipping),
+            "grand_total": order.grand_total,
+        }
+
+    def render(self, invoice_id, output="html"):
+        """
+        Render one invoice in-process; returns the document bytes, or
+        ``None`` if the invoice does not exist or has no order.
+        """
+        check_format(output)
+        invoice = self.queryset().filter(pk=invoice_id).first()
+        context = self.context(invoice) if invoice is not None else None
+        return render_document(context, output) if context is not None else None
+
+    def render_batch(self, invoices, output="html", workers=None, chunk_size=INVOICE_CHUNK_SIZE):
+        """
+        Render and store every invoice of the ``invoices`` queryset.
+        Returns ``(rendered, errors)``, errors keyed by invoice id.
+
+        Workers are spawned rather than forked, so they never share the
+        parent's database connections.
+        """
+        check_format(output)
+        invoice_ids = list(invoices.order_by("created_on", "id").values_list("id", flat=True))
+        rendered = 0
+        errors = {}
+        if not invoice_ids:
+            return rendered, errors
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=setup_worker,
+        ) as pool:
+            for start in range(0, len(invoice_ids), chunk_size):
+                pending = []
+                for invoice in self.queryset().filter(
+                    id__in=invoice_ids[start:start + chunk_size]
+                ):
+                    context = self.context(invoice)
+                    if context is None:
+                        errors[str(invoice.pk)] = "Invoice has no order."
+                    else:
+                        pending.append((invoice, context))
+
+                results = pool.map(
+                    partial(render_and_store, output),
+                    [context for _, context in pending],
+                    chunksize=8,
+                )
+                now = timezone.now()
+                stored = []
+                for (invoice, _), (name, error) in zip(pending, results):
+                    if error:
+                        errors[str(invoice.pk)] = error
+                        continue
+                    invoice.document = name
+                    invoice.rendered_on = now
+                    invoice.modified_on = now
+                    stored.append(invoice)
+                self.model.objects.bulk_update(
+                    stored, ["document", "rendered_on", "modified_on"]
+                )
+                rendered += len(stored)
+        return rendered, errors
+
+
+purchase_invoices = InvoiceRenderer(
+    PurchaseInvoice,
+    PurchaseItem,
+    order_field="purchases",
+    party_field="supplier",
+    party_label="Supplier",
+    discount_field="order_discount",
+    title="Purchase invoice",
+)
+sales_invoices = InvoiceRenderer(
+    SalesInvoice,
+    SalesItem,
+    order_field="sales",
+    party_field="customer",
+    party_label="Customer",
+    discount_field="discount",
+    title="Sales invoice",
+)
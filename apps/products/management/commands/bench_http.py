@@ -0,0 +1,111 @@
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get("content-length", 0)))
+    return status, headers.get("connection") != "close"
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test GET endpoints with many concurrent keep-alive connections "
+        "and report requests/sec and latency percentiles. Pass the WSGI and "
+        "ASGI URLs of the same resource to compare them, e.g. "
+        "--url http://127.0.0.1:8000/api/products/ "
+        "--url http://127.0.0.1:8001/api/async/products/"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", action="append", required=True)
+        parser.add_argument("--connections", type=int, default=1000)
+        parser.add_argument("--duration", type=float, default=30.0)
+        parser.add_argument(
+            "--header", action="append", default=[],
+            help='Extra request header, e.g. "Authorization: Bearer <token>".',
+        )
+
+    def handle(self, *args, **options):
+        for url in options["url"]:
+            latencies, errors, elapsed = asyncio.run(
+                self.run(url, options["connections"], options["duration"], options["header"])
+            )
+            if len(latencies) < 2:
+                raise CommandError(f"{url}: no successful responses ({errors} errors).")
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f"{url}: {len(latencies)} requests in {elapsed:.2f}s "
+                f"({len(latencies) / elapsed:.0f}/s), {errors} errors "
+                f"p50={quantiles[49] * 1000:.1f}ms "
+                f"p95={quantiles[94] * 1000:.1f}ms "
+                f"p99={quantiles[98] * 1000:.1f}ms"
+            )
+
+    async def run(self, url, connections, duration, headers):
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise CommandError("Only plain http:// URLs are supported.")
+        host = parts.hostname
+        port = parts.port or 80
+        target = parts.path + (f"?{parts.query}" if parts.query else "")
+        request = (
+            f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n"
+            + "".join(f"{header}\r\n" for header in headers)
+            + "\r\n"
+        ).encode("latin-1")
+
+        latencies = []
+        errors = 0
+        deadline = time.monotonic() + duration
+
+        async def client():
+            nonlocal errors
+            writer = None
+            while time.monotonic() < deadline:
+                try:
+                    if writer is None:
+                        reader, writer = await asyncio.open_connection(host, port)
+                    started = time.perf_counter()
+                    writer.write(request)
+                    status, keep_alive = await _read_response(reader)
+                    latency = time.perf_counter() - started
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    errors += 1
+                    if writer is not None:
+                        writer.close()
+                    writer = None
+                    await asyncio.sleep(0.01)
+                    continue
+                if status < 400:
+                    latencies.append(latency)
+                else:
+                    errors += 1
+                if not keep_alive:
+                    writer.close()
+                    writer = None
+            if writer is not None:
+                writer.close()
+
+        started = time.monotonic()
+        await asyncio.gather(*(client() for _ in range(connections)))
+        return sorted(latencies), errors, time.monotonic() - started
@@ -0,0 +1,54 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.products.constant import ORDER_TAX, PRODUCT_TAX, TAX_METHOD
+from apps.products.pricing import price_basket
+
+
+class Command(BaseCommand):
+    help = "Measure basket pricing throughput and latency (p50/p95/p99)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--baskets", type=int, default=2000)
+        parser.add_argument("--lines", type=int, default=50)
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        baskets = [
+            [
+                {
+                    "quantity": rng.randint(1, 20),
+                    "unit_price": Decimal(rng.randint(100, 100000)) / 100,
+                    "discount": Decimal(rng.randint(0, 500)) / 100,
+                    "product_tax": rng.choice(PRODUCT_TAX)[0],
+                    "tax_method": rng.choice(TAX_METHOD)[0],
+                }
+                for _ in range(options["lines"])
+            ]
+            for _ in range(options["baskets"])
+        ]
+        order_tax = ORDER_TAX[0][0]
+
+        latencies = []
+        started = time.perf_counter()
+        for lines in baskets:
+            basket_started = time.perf_counter()
+            price_basket(
+                lines, order_tax=order_tax, discount=Decimal("5"), shipping=Decimal("10")
+            )
+            latencies.append(time.perf_counter() - basket_started)
+        elapsed = time.perf_counter() - started
+
+        line_count = options["baskets"] * options["lines"]
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{options['baskets']} baskets of {options['lines']} lines in {elapsed:.2f}s "
+            f"({line_count / elapsed:.0f} lines/s) "
+            f"p50={quantiles[49] * 1000:.3f}ms "
+            f"p95={quantiles[94] * 1000:.3f}ms "
+            f"p99={quantiles[98] * 1000:.3f}ms"
+        )
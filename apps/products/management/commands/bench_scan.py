@@ -0,0 +1,59 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from apps.products.models import Product
+from apps.products.scan import ScanResolver
+
+
+class Command(BaseCommand):
+    help = "Measure scan-resolve latency (p50/p95/p99) under concurrent load."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000)
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--codes", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        codes = list(
+            Product.objects.values_list("barcode", flat=True)[: options["codes"]]
+        )
+        if not codes:
+            raise CommandError("No products to scan.")
+
+        resolver = ScanResolver()
+        lookups = [codes[i % len(codes)] for i in range(options["requests"])]
+        self.report("cold", resolver, lookups, options["threads"])
+        self.report("warm", resolver, lookups, options["threads"])
+
+    def report(self, label, resolver, lookups, threads):
+        def timed(code):
+            started = time.perf_counter()
+            resolver.resolve(code)
+            return time.perf_counter() - started
+
+        def worker(chunk):
+            try:
+                return [timed(code) for code in chunk]
+            finally:
+                close_old_connections()
+
+        chunks = [lookups[i::threads] for i in range(threads)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = sorted(
+                latency for result in pool.map(worker, chunks) for latency in result
+            )
+        elapsed = time.perf_counter() - started
+
+        quantiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{label}: {len(latencies)} scans in {elapsed:.2f}s "
+            f"({len(latencies) / elapsed:.0f}/s) "
+            f"p50={quantiles[49] * 1000:.3f}ms "
+            f"p95={quantiles[94] * 1000:.3f}ms "
+            f"p99={quantiles[98] * 1000:.3f}ms"
+        )
@@ -0,0 +1,43 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.importers import IMPORT_BATCH_SIZE, ProductImporter, read_rows
+from utils.context import acting_as
+
+
+class Command(BaseCommand):
+    help = "Bulk import products from a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to a .csv or .ndjson file.")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument(
+            "--user", help="Email of the user recorded as the products' creator."
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            try:
+                user = get_user_model().objects.get(email=options["user"])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user with email {options['user']}.")
+
+        with acting_as(user), open(
+            options["path"], encoding="utf-8", newline=""
+        ) as fileobj:
+            try:
+                rows = read_rows(fileobj, options["path"])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            report = ProductImporter(batch_size=options["batch_size"]).run(rows)
+
+        for error in report["errors"]:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {report['processed']} rows in {report['seconds']}s "
+                f"({report['rows_per_second']} rows/s): "
+                f"{report['created']} created, {report['failed']} failed."
+            )
+        )
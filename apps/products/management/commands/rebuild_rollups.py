@@ -0,0 +1,31 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales/purchase summaries from the orders."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Only rebuild days from this date (YYYY-MM-DD) onwards.",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("--since must be a date in YYYY-MM-DD format.")
+
+        started = time.perf_counter()
+        rebuild_rollups(since)
+        self.stdout.write(
+            f"Rebuilt summaries{f' since {since}' if since else ''} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from apps.products.alerts import rebuild_alerts
+from apps.products.models import LowStockAlert
+
+
+class Command(BaseCommand):
+    help = "Re-evaluate low-stock alerts for every stocked product and warehouse."
+
+    def handle(self, *args, **options):
+        rebuild_alerts()
+        self.stdout.write(f"{LowStockAlert.objects.count()} pairs at or below threshold")
@@ -0,0 +1,49 @@
+import time
+from datetime import date
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.invoices import INVOICE_FORMATS, purchase_invoices, sales_invoices
+
+RENDERERS = {"purchase": purchase_invoices, "sales": sales_invoices}
+
+
+class Command(BaseCommand):
+    help = "Render invoices to storage with a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(RENDERERS))
+        parser.add_argument("--month", help="Only invoices created in this month (YYYY-MM).")
+        parser.add_argument("--output", choices=sorted(INVOICE_FORMATS), default="html")
+        parser.add_argument("--workers", type=int, help="Worker processes (default: CPUs).")
+        parser.add_argument("--missing", action="store_true", help="Skip rendered invoices.")
+
+    def handle(self, *args, **options):
+        renderer = RENDERERS[options["kind"]]
+        invoices = renderer.model.objects.all()
+        if options["month"]:
+            try:
+                month = date.fromisoformat(f"{options['month']}-01")
+            except ValueError:
+                raise CommandError("--month must be in YYYY-MM format.")
+            invoices = invoices.filter(
+                created_on__year=month.year, created_on__month=month.month
+            )
+        if options["missing"]:
+            invoices = invoices.filter(rendered_on__isnull=True)
+
+        started = time.perf_counter()
+        try:
+            rendered, errors = renderer.render_batch(
+                invoices, output=options["output"], workers=options["workers"]
+            )
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+
+        for invoice_id, error in errors.items():
+            self.stderr.write(f"{invoice_id}: {error}")
+        self.stdout.write(
+            f"Rendered {rendered} invoices ({len(errors)} failed) "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
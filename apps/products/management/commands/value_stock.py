@@ -0,0 +1,65 @@
+import time
+import uuid
+from datetime import date
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.products.pricing import money
+from apps.products.valuation import load_movements, value_movements
+
+
+class Command(BaseCommand):
+    help = "Value stock with FIFO and weighted-average cost from the ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--as-of", help="Value stock at the end of this date (YYYY-MM-DD).")
+        parser.add_argument("--warehouse", type=uuid.UUID)
+        parser.add_argument("--product", type=uuid.UUID)
+        parser.add_argument(
+            "--synthetic",
+            type=int,
+            metavar="N",
+            help="Time the engine on N generated movements instead of the ledger.",
+        )
+
+    def handle(self, *args, **options):
+        if options["synthetic"]:
+            return self.benchmark(options["synthetic"])
+
+        as_of = None
+        if options["as_of"]:
+            try:
+                as_of = date.fromisoformat(options["as_of"])
+            except ValueError:
+                raise CommandError("--as-of must be a date in YYYY-MM-DD format.")
+
+        started = time.perf_counter()
+        pairs, groups, quantities, unit_costs = load_movements(
+            as_of, options["warehouse"], options["product"]
+        )
+        loaded = time.perf_counter()
+        values = value_movements(groups, quantities, unit_costs, len(pairs))
+        valued = time.perf_counter()
+
+        self.stdout.write(
+            f"{len(quantities)} movements, {len(pairs)} product/warehouse pairs: "
+            f"load {loaded - started:.2f}s, value {valued - loaded:.3f}s"
+        )
+        for name in ("fifo_value", "fifo_issued", "average_value", "average_issued"):
+            self.stdout.write(f"{name}: {money(float(values[name].sum()))}")
+
+    def benchmark(self, count, pairs=10000):
+        rng = np.random.default_rng(0)
+        groups = np.sort(rng.integers(0, pairs, count))
+        quantities = rng.integers(1, 50, count).astype(np.float64)
+        # Roughly one movement in three is an issue.
+        quantities[rng.random(count) < 0.35] *= -1
+        unit_costs = rng.uniform(1, 100, count)
+
+        started = time.perf_counter()
+        value_movements(groups, quantities, unit_costs, pairs)
+        self.stdout.write(
+            f"{count} movements, {pairs} pairs valued in "
+            f"{time.perf_counter() - started:.3f}s"
+        )
@@ -1,16 +1,20 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 from apps.products.constant import (
     ADJUSTMENT_TYPE,
+    MOVEMENT_TYPE,
     PRODUCT_TYPE_CHOICES,
     PRODUCT_TAX,
     TAX_METHOD,
     BARCODE_PAPER_SIZE,
+    JOB_STATUS,
     SALE_STATUS,
     ORDER_TAX,    
 )
 
-from utils.threads import get_request
+from utils.context import get_current_user
 from utils.models import (
     CommonInfo,
     Address,
@@ -23,7 +27,7 @@ from utils.validation_for_phone_number import (
 class Brand(CommonInfo):
     brand_name = models.CharField(max_length=30)
     brand_image = models.ImageField(
-        upload_to="profile/", blank=True, null=True)
+        upload_to="brands/", blank=True, null=True)
 
     def __str__(self):
         return self.brand_name
@@ -83,11 +87,11 @@ class Product(CommonInfo):
     category = models.ForeignKey(
         Category, on_delete=models.CASCADE, related_name="product_category"
     )
-    product_code = models.IntegerField()
+    product_code = models.IntegerField(db_index=True)
     brand = models.ForeignKey(
         Brand, on_delete=models.CASCADE, related_name="brand"
     )
-    barcode = models.CharField(max_length=100)
+    barcode = models.CharField(max_length=100, db_index=True)
     product_unit = models.ForeignKey(
         Unit, on_delete=models.CASCADE, related_name="product_unit"
     )
@@ -99,7 +103,7 @@ class Product(CommonInfo):
     discount = models.FloatField()
     stock_alert = models.IntegerField()
     product_image = models.ImageField(
-        upload_to="profile/", blank=True, null=True)
+        upload_to="products/", blank=True, null=True)
     featured = models.BooleanField(default=False)
     price_difference_in_warehouse = models.BooleanField(default=True)
     warehouse = models.ManyToManyField(Warehouse)
@@ -113,11 +117,27 @@ class Product(CommonInfo):
     add_promotional_sale = models.BooleanField(default=True)
     has_multi_variant = models.BooleanField(default=True)
     has_imie_code = models.BooleanField(default=True)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_on", "-id"]),
+            GinIndex(fields=["search_vector"], name="product_search_vector_gin"),
+            GinIndex(
+                fields=["product_name"],
+                name="product_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        current_user = get_request().user
-        self.user = current_user
-        self.created_by = current_user
+        current_user = get_current_user()
+        if current_user is not None:
+            self.user = current_user
+            if self._state.adding:
+                self.created_by = current_user
+            else:
+                self.modified_by = current_user
         super(Product, self).save(*args, **kwargs)
 
     def __str__(self) -> str:
@@ -132,8 +152,24 @@ class Barcode(CommonInfo):
     papersize = models.CharField(choices=BARCODE_PAPER_SIZE, max_length=20)
 
 
+class BarcodeJob(CommonInfo):
+    """
+    A batch of barcode labels rendered in the background by
+    ``apps.products.barcodes``.
+    """
+    products = models.JSONField(default=list)
+    papersize = models.CharField(choices=BARCODE_PAPER_SIZE, max_length=20)
+    status = models.CharField(choices=JOB_STATUS, max_length=15, default=JOB_STATUS[0][0])
+    total = models.PositiveIntegerField(default=0)
+    rendered = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=dict, blank=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+
+
 class Adjustment(CommonInfo):
-    warehouse = models.OneToOneField(
+    warehouse = models.ForeignKey(
         Warehouse, on_delete=models.SET_NULL, null=True, blank=True
     )
     product = models.ForeignKey(
@@ -143,7 +179,83 @@ class Adjustment(CommonInfo):
 
     def __str__(self) -> str:
         return self.warehouse
-    
+
+
+class StockMovement(CommonInfo):
+    """
+    Append-only stock ledger entry. ``quantity`` is signed: positive for
+    stock coming in, negative for stock going out.
+    """
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stock_movements"
+    )
+    warehouse = models.ForeignKey(
+        Warehouse, on_delete=models.CASCADE, related_name="stock_movements"
+    )
+    quantity = models.IntegerField()
+    movement_type = models.CharField(choices=MOVEMENT_TYPE, max_length=15)
+    reference = models.UUIDField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "warehouse", "created_on"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Stock movements are append-only.")
+        super(StockMovement, self).save(*args, **kwargs)
+
+
+class StockBalance(CommonInfo):
+    """
+    Materialized on-hand quantity per (product, warehouse), kept in step
+    with ``StockMovement`` by ``apps.products.stock``.
+    """
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stock_balances"
+    )
+    warehouse = models.ForeignKey(
+        Warehouse, on_delete=models.CASCADE, related_name="stock_balances"
+    )
+    on_hand = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "warehouse"], name="unique_stock_balance"
+            ),
+            models.CheckConstraint(
+                check=models.Q(on_hand__gte=0), name="stock_balance_non_negative"
+            ),
+        ]
+
+
+class LowStockAlert(CommonInfo):
+    """
+    A (product, warehouse) whose on-hand quantity is at or below the
+    product's ``stock_alert``. Rows exist only while that holds; they are
+    kept in step by ``apps.products.alerts``.
+    """
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="low_stock_alerts"
+    )
+    warehouse = models.ForeignKey(
+        Warehouse, on_delete=models.CASCADE, related_name="low_stock_alerts"
+    )
+    on_hand = models.IntegerField()
+    threshold = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "warehouse"], name="unique_low_stock_alert"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["-created_on", "-id"]),
+            models.Index(fields=["warehouse", "-created_on", "-id"]),
+        ]
 
 
 class Purchase(CommonInfo):
@@ -163,6 +275,19 @@ class Purchase(CommonInfo):
     shipping = models.FloatField()
     sales_status = models.CharField(choices=SALE_STATUS, max_length=15)
     purchase_note = models.TextField()
+    # Denormalized by apps.products.totals; never edited directly.
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    item_tax = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    order_tax_amount = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, editable=False
+    )
+    grand_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_on", "-id"]),
+        ]
 
     def __str__(self) -> str:
         return self.supplier.supplier_code
@@ -191,6 +316,115 @@ class Sales(CommonInfo):
     sales_image = models.ImageField(upload_to="sales/", blank=True, null=True)
     sales_note = models.TextField()
     staff_remark = models.TextField()
+    # Denormalized by apps.products.totals; never edited directly.
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    item_tax = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    order_tax_amount = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, editable=False
+    )
+    grand_total = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_on", "-id"]),
+        ]
+
+
+class LineItem(CommonInfo):
+    """
+    One product line of an order. Tax rate and method are copied from the
+    product when the line is written; the amounts are filled in by
+    ``apps.products.totals``.
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.PROTECT,
+        related_name="%(app_label)s_%(class)s_product",
+    )
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2)
+    discount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    tax_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    tax_method = models.CharField(choices=TAX_METHOD, max_length=20)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    tax = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class PurchaseItem(LineItem):
+    purchase = models.ForeignKey(Purchase, on_delete=models.CASCADE, related_name="items")
+
+
+class SalesItem(LineItem):
+    sales = models.ForeignKey(Sales, on_delete=models.CASCADE, related_name="items")
+
+
+class DailySummary(models.Model):
+    """
+    Base of the reporting rollups. Rows are only ever changed through
+    additive upserts in ``apps.products.rollups`` (or rebuilt from the
+    orders by ``rebuild_rollups``), so they carry no audit fields.
+    """
+    day = models.DateField()
+
+    class Meta:
+        abstract = True
+
+
+class ProductDailySummary(DailySummary):
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="+")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+")
+    sold_quantity = models.BigIntegerField(default=0)
+    sales_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    purchased_quantity = models.BigIntegerField(default=0)
+    purchase_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "warehouse", "product"], name="unique_product_daily_summary"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["product", "day"]),
+        ]
+
+
+class WarehouseDailySummary(DailySummary):
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name="+")
+    sales_count = models.IntegerField(default=0)
+    sales_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    purchase_count = models.IntegerField(default=0)
+    purchase_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "warehouse"], name="unique_warehouse_daily_summary"
+            ),
+        ]
+
+
+class SupplierDailySummary(DailySummary):
+    supplier = models.ForeignKey(
+        "accounts.Supplier", on_delete=models.CASCADE, related_name="+"
+    )
+    purchase_count = models.IntegerField(default=0)
+    purchase_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "supplier"], name="unique_supplier_daily_summary"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["supplier", "day"]),
+        ]
 
 
 class Invoice(CommonInfo):
@@ -208,6 +442,9 @@ class Invoice(CommonInfo):
         blank=True,
         related_name="%(app_label)s_%(class)s_supplier",
     )
+    # Last rendered document, written by apps.products.invoices.
+    document = models.FileField(upload_to="invoices/", blank=True, null=True)
+    rendered_on = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         abstract=True 
@@ -0,0 +1,119 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from apps.products.constant import ORDER_TAX, PRODUCT_TAX
+
+CENT = Decimal("0.01")
+HUNDRED = Decimal(100)
+ZERO = Decimal(0)
+EXCLUSIVE = "Exclusive"
+
+
+def money(value):
+    """
+    ``value`` as a Decimal rounded half-up to cents. Floats (prices are
+    still ``FloatField`` on products and orders) go through ``str`` so
+    0.1 stays 0.10 rather than 0.1000000000000000055...
+    """
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value or 0))
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class RateTable:
+    """
+    Tax choices compiled once into Decimal percentages, keyed by the stored
+    choice value. The rate is read from the label ("Vat @12%"), since the
+    values do not always match it.
+    """
+    def __init__(self, choices):
+        self.rates = {
+            value: Decimal(label.split("@")[1].rstrip("%")) for value, label in choices
+        }
+
+    def rate(self, value, default=ZERO):
+        return self.rates.get(value, default)
+
+    def items(self):
+        return self.rates.items()
+
+
+PRODUCT_RATES = RateTable(PRODUCT_TAX)
+ORDER_RATES = RateTable(ORDER_TAX)
+
+
+def price_amounts(quantity, unit_price, discount, rate, tax_method):
+    """
+    Return ``(subtotal, tax, total)`` of a line. Exclusive prices get tax
+    added on top; inclusive ("Non-Exclusive") prices already contain it,
+    so the tax is split out of the line amount.
+    """
+    amount = quantity * money(unit_price) - money(discount)
+    if tax_method == EXCLUSIVE:
+        subtotal = money(amount)
+        tax = money(amount * rate / HUNDRED)
+    else:
+        subtotal = money(amount * HUNDRED / (HUNDRED + rate))
+        tax = money(amount) - subtotal
+    return subtotal, tax, subtotal + tax
+
+
+def order_amounts(line_total, discount, rate, shipping):
+    """
+    Return ``(order_tax_amount, grand_total)`` of an order whose lines come
+    to ``line_total``: the order discount comes off the lines, order tax is
+    charged on the rest, then shipping is added.
+    """
+    taxable = line_total - money(discount)
+    order_tax_amount = money(taxable * rate / HUNDRED)
+    return order_tax_amount, taxable + order_tax_amount + money(shipping)
+
+
+def price_line(item):
+    """
+    Fill ``subtotal``, ``tax`` and ``total`` of a line item from its
+    quantity, price, discount, tax rate and method.
+    """
+    item.subtotal, item.tax, item.total = price_amounts(
+        item.quantity, item.unit_price, item.discount, item.tax_rate, item.tax_method
+    )
+    return item
+
+
+def price_basket(lines, order_tax=None, discount=ZERO, shipping=ZERO):
+    """
+    Price a whole basket or invoice in one call.
+
+    Each line is a mapping with ``quantity``, ``unit_price`` and
+    ``tax_method`` and optionally ``discount``; its rate is ``tax_rate``
+    if given, else the rate of its ``product_tax`` choice. ``order_tax`` is
+    an ``ORDER_TAX`` choice value. Returns the per-line ``(subtotal, tax,
+    total)`` and the header totals, computed exactly as the stored order
+    totals are.
+    """
+    priced = []
+    subtotal = item_tax = ZERO
+    for line in lines:
+        rate = line.get("tax_rate")
+        if rate is None:
+            rate = PRODUCT_RATES.rate(line.get("product_tax"))
+        amounts = price_amounts(
+            line["quantity"],
+            line["unit_price"],
+            line.get("discount", ZERO),
+            rate,
+            line["tax_method"],
+        )
+        priced.append(amounts)
+        subtotal += amounts[0]
+        item_tax += amounts[1]
+
+    order_tax_amount, grand_total = order_amounts(
+        subtotal + item_tax, discount, ORDER_RATES.rate(order_tax), shipping
+    )
+    return {
+        "lines": priced,
+        "subtotal": subtotal,
+        "item_tax": item_tax,
+        "order_tax_amount": order_tax_amount,
+        "grand_total": grand_total,
+    }
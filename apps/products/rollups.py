@@ -0,0 +1,197 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from apps.products.models import (
+    ProductDailySummary,
+    Purchase,
+    PurchaseItem,
+    Sales,
+    SalesItem,
+    SupplierDailySummary,
+    WarehouseDailySummary,
+)
+
+COMPLETE = "Complete"
+
+_UPSERT_SQL = """
+    INSERT INTO {table} ({columns})
+    SELECT (o.created_on AT TIME ZONE %s)::date, {select}
+    FROM {source}
+    WHERE o.sales_status = %s AND {where}
+    GROUP BY {group}
+    ON CONFLICT ({keys}) DO UPDATE SET {updates}
+"""
+
+
+class Rollup:
+    """
+    One summary table fed by one order type.
+
+    ``keys`` and ``measures`` map summary columns to SQL over the order
+    (alias ``o``) and, for line-level summaries, its lines (alias ``i``).
+    Orders are folded in with a single ``INSERT ... SELECT ... GROUP BY ...
+    ON CONFLICT DO UPDATE`` that adds to the existing rows (or subtracts,
+    with ``sign=-1``), so writers never read summary rows and only contend
+    on the keys they share. Measure columns this rollup does not feed are
+    inserted as 0 and left alone on conflict.
+
+    Only ``Complete`` orders are counted; days are taken from ``created_on``
+    in ``TIME_ZONE``.
+    """
+    def __init__(self, model, order_model, keys, measures, item_model=None, link=None):
+        self.model = model
+        self.order_model = order_model
+        self.keys = keys
+        self.measures = measures
+        self.item_model = item_model
+        self.link = link
+
+    def statement(self, where, sign):
+        key_columns = ["day", *self.keys]
+        measure_columns = [
+            field.column
+            for field in self.model._meta.concrete_fields
+            if not field.primary_key and field.column not in key_columns
+        ]
+        source = f"{self.order_model._meta.db_table} AS o"
+        if self.item_model is not None:
+            source = (
+                f"{self.item_model._meta.db_table} AS i "
+                f"JOIN {source} ON o.id = i.{self.link}_id"
+            )
+        table = self.model._meta.db_table
+        return _UPSERT_SQL.format(
+            table=table,
+            columns=", ".join(key_columns + measure_columns),
+            select=", ".join(
+                [
+                    *self.keys.values(),
+                    *(
+                        f"{int(sign)} * {self.measures[column]}"
+                        if column in self.measures
+                        else "0"
+                        for column in measure_columns
+                    ),
+                ]
+            ),
+            source=source,
+            where=where,
+            group=", ".join(str(position) for position in range(1, len(key_columns) + 1)),
+            keys=", ".join(key_columns),
+            updates=", ".join(
+                f"{column} = {table}.{column} + EXCLUDED.{column}"
+                for column in self.measures
+            ),
+        )
+
+    def execute(self, cursor, where, params, sign=1):
+        cursor.execute(
+            self.statement(where, sign), [settings.TIME_ZONE, COMPLETE, *params]
+        )
+
+
+class OrderRollups:
+    def __init__(self, order_model, rollups):
+        self.order_model = order_model
+        self.rollups = rollups
+
+    def apply(self, order_ids, sign=1):
+        """
+        Add the given orders to every summary, or take them out again with
+        ``sign=-1``. Orders that are not ``Complete`` are ignored, so this
+        must run before a completed order is changed (to remove it) and
+        after it is saved (to add it back).
+        """
+        order_ids = list(order_ids)
+        if not order_ids:
+            return
+        with connection.cursor() as cursor:
+            for rollup in self.rollups:
+                rollup.execute(cursor, "o.id = ANY(%s)", [order_ids], sign)
+
+    def backfill(self, cursor, since=None):
+        where, params = "TRUE", []
+        if since is not None:
+            where, params = "(o.created_on AT TIME ZONE %s)::date >= %s", [
+                settings.TIME_ZONE,
+                since,
+            ]
+        for rollup in self.rollups:
+            rollup.execute(cursor, where, params)
+
+
+sales_rollups = OrderRollups(
+    Sales,
+    [
+        Rollup(
+            ProductDailySummary,
+            Sales,
+            keys={"warehouse_id": "o.warehouse_id", "product_id": "i.product_id"},
+            measures={"sold_quantity": "SUM(i.quantity)", "sales_amount": "SUM(i.total)"},
+            item_model=SalesItem,
+            link="sales",
+        ),
+        Rollup(
+            WarehouseDailySummary,
+            Sales,
+            keys={"warehouse_id": "o.warehouse_id"},
+            measures={"sales_count": "COUNT(*)", "sales_amount": "SUM(o.grand_total)"},
+        ),
+    ],
+)
+purchase_rollups = OrderRollups(
+    Purchase,
+    [
+        Rollup(
+            ProductDailySummary,
+            Purchase,
+            keys={"warehouse_id": "o.warehouse_id", "product_id": "i.product_id"},
+            measures={
+                "purchased_quantity": "SUM(i.quantity)",
+                "purchase_amount": "SUM(i.total)",
+            },
+            item_model=PurchaseItem,
+            link="purchase",
+        ),
+        Rollup(
+            WarehouseDailySummary,
+            Purchase,
+            keys={"warehouse_id": "o.warehouse_id"},
+            measures={"purchase_count": "COUNT(*)", "purchase_amount": "SUM(o.grand_total)"},
+        ),
+        Rollup(
+            SupplierDailySummary,
+            Purchase,
+            keys={"supplier_id": "o.supplier_id"},
+            measures={"purchase_count": "COUNT(*)", "purchase_amount": "SUM(o.grand_total)"},
+        ),
+    ],
+)
+
+SUMMARY_MODELS = (ProductDailySummary, WarehouseDailySummary, SupplierDailySummary)
+
+
+def rebuild_rollups(since=None):
+    """
+    Recompute every summary row (from ``since``, a date, onwards) from the
+    orders, in one transaction.
+
+    The summary tables are locked against writers first, in the order
+    writers upsert into them: orders already folded in commit before the
+    rebuild reads, and later ones wait and fold in after it commits, so
+    each order is counted once. Reads are not blocked.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "LOCK TABLE {} IN SHARE ROW EXCLUSIVE MODE".format(
+                    ", ".join(model._meta.db_table for model in SUMMARY_MODELS)
+                )
+            )
+            for model in SUMMARY_MODELS:
+                rows = model.objects.all()
+                if since is not None:
+                    rows = rows.filter(day__gte=since)
+                rows.delete()
+            sales_rollups.backfill(cursor, since)
+            purchase_rollups.backfill(cursor, since)
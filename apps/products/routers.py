@@ -9,7 +9,11 @@ from apps.products.views import (
     PurchaseViewSet,
     SalesViewSet,
     PurchaseInvoiceViewSet,
+    SalesInvoiceViewSet,
     AdjustmentViewset,
+    WarehouseViewset,
+    LowStockAlertViewSet,
+    ReportViewSet,
 )
 
 router = DefaultRouter()
@@ -22,4 +26,8 @@ router.register("barcode", BarcodeViewSet)
 router.register("purchase", PurchaseViewSet)
 router.register("sales", SalesViewSet)
 router.register("purchase-invoice", PurchaseInvoiceViewSet)
+router.register("sales-invoice", SalesInvoiceViewSet)
 router.register("adjustment", AdjustmentViewset)
+router.register("warehouse", WarehouseViewset, basename="warehouse")
+router.register("low-stock-alerts", LowStockAlertViewSet)
+router.register("reports", ReportViewSet, basename="reports")
@@ -0,0 +1,110 @@
+import threading
+
+from django.db.models import Q
+
+from apps.products.models import Product
+from apps.products.pricing import PRODUCT_RATES
+from utils.lru import LRUCache
+
+SCAN_CACHE_SIZE = 10000
+# Other processes are not told about product writes, so they may serve a
+# stale price for at most this many seconds.
+SCAN_CACHE_TTL = 30
+
+# Payloads are JSON; keep the rate a plain number.
+TAX_RATES = {value: float(rate) for value, rate in PRODUCT_RATES.items()}
+
+_MISSING = object()
+
+
+class ScanResolver:
+    """
+    Resolves a scanned barcode or product code to a compact product payload.
+
+    Hits are served from an in-process LRU; misses are one indexed query.
+    Only found products are cached, so a product created after a failed
+    scan is picked up on the next one. ``invalidate`` is called from the
+    ``Product`` save/delete signals and drops a product's entries through a
+    reverse map of the codes it is cached under; entries written by other
+    processes expire after ``SCAN_CACHE_TTL``. Every ``invalidate`` bumps
+    a generation, and a payload loaded across one is not cached, since it
+    may predate the write.
+    """
+    def __init__(self, maxsize=SCAN_CACHE_SIZE, ttl=SCAN_CACHE_TTL):
+        self.cache = LRUCache(maxsize, ttl=ttl, on_expire=self.expired)
+        self.codes = {}
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def resolve(self, code):
+        code = code.strip()
+        payload = self.cache.get(code, _MISSING)
+        if payload is _MISSING:
+            generation = self.generation
+            payload = self.load(code)
+            if payload is not None:
+                self.remember(code, payload, generation)
+        return payload
+
+    def remember(self, code, payload, generation):
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.codes.setdefault(payload["id"], set()).add(code)
+            evicted = self.cache.set(code, payload)
+            if evicted is not None:
+                self.forget(*evicted)
+
+    def expired(self, code, payload):
+        with self.lock:
+            # Another scan may have cached the code again in the meantime.
+            if code not in self.cache:
+                self.forget(code, payload)
+
+    def forget(self, code, payload):
+        codes = self.codes.get(payload["id"])
+        if codes is not None:
+            codes.discard(code)
+            if not codes:
+                del self.codes[payload["id"]]
+
+    def load(self, code):
+        query = Q(barcode=code)
+        if code.isdigit() and int(code) < 2 ** 31:
+            query |= Q(product_code=int(code))
+
+        product = (
+            Product.objects.filter(query)
+            .values(
+                "id",
+                "product_name",
+                "product_code",
+                "barcode",
+                "unit_price",
+                "discount",
+                "product_tax",
+                "tax_method",
+            )
+            .first()
+        )
+        if product is None:
+            return None
+        return {
+            "id": str(product["id"]),
+            "name": product["product_name"],
+            "code": product["product_code"],
+            "barcode": product["barcode"],
+            "price": product["unit_price"],
+            "discount": product["discount"],
+            "tax_rate": TAX_RATES.get(product["product_tax"]),
+            "tax_method": product["tax_method"],
+        }
+
+    def invalidate(self, product_id):
+        with self.lock:
+            self.generation += 1
+            for code in self.codes.pop(str(product_id), ()):
+                self.cache.pop(code)
+
+
+scan_resolver = ScanResolver()
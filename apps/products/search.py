@@ -0,0 +1,86 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.functions import Coalesce
+
+from apps.products.models import (
+    Brand,
+    Category,
+    Product,
+)
+
+SEARCH_CONFIG = "simple"
+
+_REFRESH_SQL = """
+    UPDATE {product} AS p
+    SET search_vector =
+        setweight(to_tsvector('{config}', coalesce(p.product_name, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(p.barcode, '')), 'A') ||
+        setweight(to_tsvector('{config}', coalesce(b.brand_name, '')), 'B') ||
+        setweight(to_tsvector('{config}', coalesce(c.name, '')), 'C')
+    FROM {brand} AS b, {category} AS c
+    WHERE b.id = p.brand_id AND c.id = p.category_id AND p.{column} = ANY(%s)
+"""
+
+
+def refresh_search_vectors(product_ids=None, brand_ids=None, category_ids=None):
+    """
+    Rebuild ``Product.search_vector`` (name, barcode, brand and category
+    name) for the given products, or for every product of the given
+    brands/categories, in one set-based UPDATE each.
+    """
+    targets = (
+        ("id", product_ids),
+        ("brand_id", brand_ids),
+        ("category_id", category_ids),
+    )
+    with connection.cursor() as cursor:
+        for column, ids in targets:
+            if not ids:
+                continue
+            cursor.execute(
+                _REFRESH_SQL.format(
+                    product=Product._meta.db_table,
+                    brand=Brand._meta.db_table,
+                    category=Category._meta.db_table,
+                    config=SEARCH_CONFIG,
+                    column=column,
+                ),
+                [list(ids)],
+            )
+
+
+def search_products(queryset, text):
+    """
+    Rank ``queryset`` against ``text``.
+
+    Every word is matched as a prefix against the GIN-indexed
+    ``search_vector``; misspelt names still match through the ``pg_trgm``
+    index on ``product_name``, and barcode prefixes through the barcode
+    pattern index.
+    """
+    terms = re.findall(r"\w+", text.lower())
+    if not terms:
+        return queryset.none()
+
+    query = SearchQuery(
+        " & ".join(f"{term}:*" for term in terms),
+        search_type="raw",
+        config=SEARCH_CONFIG,
+    )
+    return (
+        queryset.filter(
+            Q(search_vector=query)
+            | Q(product_name__trigram_similar=text)
+            | Q(barcode__startswith=text)
+        )
+        .annotate(
+            rank=Coalesce(
+                SearchRank(F("search_vector"), query), Value(0.0), output_field=FloatField()
+            )
+            + TrigramSimilarity("product_name", text)
+        )
+        .order_by("-rank", "-created_on")
+    )
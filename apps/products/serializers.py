@@ -1,7 +1,10 @@
+from django.db import transaction
 from rest_framework import serializers
 from apps.products.models import (
     Purchase,
+    PurchaseItem,
     Sales,
+    SalesItem,
     Warehouse,
     Brand,
     Category,
@@ -9,10 +12,18 @@ from apps.products.models import (
     Product,
     Unit,
     Barcode,
+    BarcodeJob,
     PurchaseInvoice,
     SalesInvoice,
     Adjustment,
+    LowStockAlert,
 )
+from apps.products.constant import ADJUSTMENT_TYPE, BARCODE_PAPER_SIZE
+from apps.products.rollups import purchase_rollups, sales_rollups
+from apps.products.stock import InsufficientStock, record_movement
+from apps.products.totals import purchase_totals, sales_totals
+from utils.context import get_current_user
+from utils.images import ImageVariantsField
 from apps.accounts.serializers import SupplierSerializer, UserSerializer
 
 
@@ -28,12 +39,15 @@ class WarehouseSerializer(serializers.ModelSerializer):
 
 
 class BrandSerializers(serializers.ModelSerializer):
+    brand_image_variants = ImageVariantsField(source="brand_image")
+
     class Meta:
         model = Brand
         fields = (
             "id",
             "brand_name",
             "brand_image",
+            "brand_image_variants",
         )
 
 
@@ -64,6 +78,8 @@ class UnitSerializer(serializers.ModelSerializer):
 
 class ProductSerializer(serializers.ModelSerializer):
     # warehouse = WarehouseSerializer(many=True)
+    product_image_variants = ImageVariantsField(source="product_image")
+
     class Meta:
         model = Product
         fields = (
@@ -84,6 +100,7 @@ class ProductSerializer(serializers.ModelSerializer):
             "warehouse",
             "barcode",
             "product_image",
+            "product_image_variants",
             "featured",
             "price_difference_in_warehouse",
             "add_promotional_sale",
@@ -130,7 +147,7 @@ class GETProductSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = ("search_vector",)
 
 
 class GetCategorySeralizer(serializers.ModelSerializer):
@@ -182,28 +199,50 @@ class BarcodeSerializer(serializers.ModelSerializer):
 
 
 class AdjustmentSerializer(serializers.ModelSerializer):
-    quantity = serializers.IntegerField(write_only=True)
+    quantity = serializers.IntegerField(write_only=True, min_value=1)
 
     class Meta:
         model = Adjustment
         fields = ("id", "quantity", "warehouse", "product", "type")
+        extra_kwargs = {
+            "warehouse": {"required": True, "allow_null": False},
+            "product": {"required": True, "allow_null": False},
+        }
 
-    def validate(self, data):
-        product = data.get("product")
-        type = data.get("type")
-        quantity = data.get("quantity")
-        
-        if type == "Substraction" and product.stock_alert < quantity:
-            raise serializers.ValidationError(
-                {product.product_name: "Stock is less than quantity to be substracted."}
-            )
-        elif type == "Addition":
-            product.stock_alert += int(quantity)
-        else:
-            product.stock_alert -= int(quantity)
-        product.save()
+    def create(self, validated_data):
+        quantity = validated_data.pop("quantity")
+        if validated_data.get("type") == "Substraction":
+            quantity = -quantity
 
-        return data
+        with transaction.atomic():
+            adjustment = Adjustment.objects.create(**validated_data)
+            try:
+                record_movement(
+                    product=adjustment.product_id,
+                    warehouse=adjustment.warehouse_id,
+                    quantity=quantity,
+                    movement_type="Adjustment",
+                    reference=adjustment.id,
+                    user=adjustment.created_by,
+                )
+            except InsufficientStock:
+                raise serializers.ValidationError(
+                    {
+                        adjustment.product.product_name: "Stock is less than quantity to be substracted."
+                    }
+                )
+        return adjustment
+
+
+class BulkAdjustmentLineSerializer(serializers.Serializer):
+    """
+    Shape-only validation for one bulk adjustment line; references and
+    stock levels are checked set-wise by ``apply_bulk_adjustments``.
+    """
+    product = serializers.UUIDField()
+    warehouse = serializers.UUIDField()
+    type = serializers.ChoiceField(choices=ADJUSTMENT_TYPE, default=ADJUSTMENT_TYPE[0][0])
+    quantity = serializers.IntegerField(min_value=1)
 
 
 class GETProductSerializer(serializers.ModelSerializer):
@@ -214,10 +253,11 @@ class GETProductSerializer(serializers.ModelSerializer):
     modified_by = UserSerializer()
     user = UserSerializer()
     warehouse = WarehouseSerializer(many=True)
+    product_image_variants = ImageVariantsField(source="product_image")
 
     class Meta:
         model = Product
-        fields = "__all__"
+        exclude = ("search_vector",)
 
 
 class GetBarcodeSerializer(serializers.ModelSerializer):
@@ -228,6 +268,30 @@ class GetBarcodeSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class BarcodeJobRequestSerializer(serializers.Serializer):
+    products = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=50000
+    )
+    papersize = serializers.ChoiceField(choices=BARCODE_PAPER_SIZE)
+
+
+class BarcodeJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BarcodeJob
+        fields = (
+            "id",
+            "status",
+            "papersize",
+            "total",
+            "rendered",
+            "skipped",
+            "failed",
+            "errors",
+            "created_on",
+            "finished_on",
+        )
+
+
 class GetCategorySeralizer(serializers.ModelSerializer):
     created_by = UserSerializer()
     modified_by = UserSerializer()
@@ -254,6 +318,7 @@ class GetUnitSeralizer(serializers.ModelSerializer):
 class GetBrandSeralizer(serializers.ModelSerializer):
     created_by = UserSerializer()
     modified_by = UserSerializer()
+    brand_image_variants = ImageVariantsField(source="brand_image")
 
     class Meta:
         model = Brand
@@ -262,10 +327,114 @@ class GetBrandSeralizer(serializers.ModelSerializer):
             "modified_by",
             "brand_name",
             "brand_image",
+            "brand_image_variants",
         )
 
 
-class PurchaseSerializer(serializers.ModelSerializer):
+ORDER_TOTAL_FIELDS = (
+    "subtotal",
+    "item_tax",
+    "order_tax_amount",
+    "grand_total",
+    "item_count",
+)
+LINE_ITEM_FIELDS = (
+    "id",
+    "product",
+    "quantity",
+    "unit_price",
+    "discount",
+    "tax_rate",
+    "tax_method",
+    "subtotal",
+    "tax",
+    "total",
+)
+LINE_ITEM_READ_ONLY_FIELDS = ("tax_rate", "tax_method", "subtotal", "tax", "total")
+LINE_ITEM_EXTRA_KWARGS = {
+    "quantity": {"min_value": 1},
+    "unit_price": {"required": False, "min_value": 0},
+    "discount": {"required": False, "min_value": 0},
+}
+
+
+class PurchaseItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PurchaseItem
+        fields = LINE_ITEM_FIELDS
+        read_only_fields = LINE_ITEM_READ_ONLY_FIELDS
+        extra_kwargs = LINE_ITEM_EXTRA_KWARGS
+
+
+class SalesItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SalesItem
+        fields = LINE_ITEM_FIELDS
+        read_only_fields = LINE_ITEM_READ_ONLY_FIELDS
+        extra_kwargs = LINE_ITEM_EXTRA_KWARGS
+
+
+class OrderItemsMixin:
+    """
+    Writes the nested ``items`` of an order through the totals engine and
+    moves stock while the order is ``Complete``. Lines are fixed once the
+    order exists; header changes (discount, shipping, tax, status) are
+    re-totalled on update. Completed orders are kept in the reporting
+    summaries and in stock: an update takes the old order out and puts the
+    new one in, so a changed warehouse moves the stock along with it.
+    """
+    totals = None
+    rollups = None
+
+    def create(self, validated_data):
+        items = validated_data.pop("items", [])
+        with transaction.atomic():
+            order = super().create(validated_data)
+            if items:
+                self.totals.add_items(order, items, user=get_current_user())
+            else:
+                self.totals.recalculate([order.pk])
+            if order.sales_status == "Complete":
+                self.move_stock(order)
+                self.rollups.apply([order.pk])
+        return order
+
+    def update(self, instance, validated_data):
+        if "items" in validated_data:
+            raise serializers.ValidationError(
+                {"items": "Lines cannot be changed once the order is created."}
+            )
+        was_complete = instance.sales_status == "Complete"
+        old_warehouse = instance.warehouse_id
+        with transaction.atomic():
+            if was_complete:
+                self.rollups.apply([instance.pk], sign=-1)
+            order = super().update(instance, validated_data)
+            self.totals.recalculate([order.pk])
+            is_complete = order.sales_status == "Complete"
+            moved = order.warehouse_id != old_warehouse
+            if was_complete and (moved or not is_complete):
+                self.move_stock(order, reverse=True, warehouse=old_warehouse)
+            if is_complete and (moved or not was_complete):
+                self.move_stock(order)
+            if is_complete:
+                self.rollups.apply([order.pk])
+        return order
+
+    def move_stock(self, order, reverse=False, warehouse=None):
+        try:
+            self.totals.move_stock(
+                order, reverse=reverse, user=get_current_user(), warehouse=warehouse
+            )
+        except InsufficientStock as exc:
+            raise serializers.ValidationError({"items": str(exc)})
+
+
+class PurchaseSerializer(OrderItemsMixin, serializers.ModelSerializer):
+    items = PurchaseItemSerializer(many=True, write_only=True, required=False)
+    totals = purchase_totals
+    rollups = purchase_rollups
+
     class Meta:
         model = Purchase
         fields = [
@@ -273,32 +442,44 @@ class PurchaseSerializer(serializers.ModelSerializer):
             "warehouse",
             "supplier",
             "product",
+            "items",
             "order_tax",
             "order_discount",
             "shipping",
             "sales_status",
             "purchase_note",
+            *ORDER_TOTAL_FIELDS,
         ]
+        read_only_fields = ORDER_TOTAL_FIELDS
+        extra_kwargs = {"product": {"required": False}}
 
 
 class GetPurachseSerializer(serializers.ModelSerializer):
     warehouse = WarehouseSerializer()
     supplier = SupplierSerializer()
     product = ProductSerializer(many=True)
+    items = PurchaseItemSerializer(many=True)
 
     class Meta:
         model = Purchase
         fields = ("warehouse",
                   "supplier",
                   "product",
+                  "items",
                   "order_tax",
                   "order_discount",
                   "shipping",
                   "sales_status",
-                  "purchase_note")
+                  "purchase_note",
+                  *ORDER_TOTAL_FIELDS)
+
 
+class SalesSerializer(OrderItemsMixin, serializers.ModelSerializer):
+    items = SalesItemSerializer(many=True, write_only=True, required=False)
+    totals = sales_totals
+    rollups = sales_rollups
+    sales_image_variants = ImageVariantsField(source="sales_image")
 
-class SalesSerializer(serializers.ModelSerializer):
     class Meta:
         model = Sales
         fields = [
@@ -306,25 +487,84 @@ class SalesSerializer(serializers.ModelSerializer):
             "warehouse",
             "biller",
             "product",
+            "items",
             "sales_tax",
             "discount",
             "shipping",
             "sales_status",
             "payment_status",
             "sales_image",
+            "sales_image_variants",
             "sales_note",
             "staff_remark",
+            *ORDER_TOTAL_FIELDS,
         ]
+        read_only_fields = ORDER_TOTAL_FIELDS
+        extra_kwargs = {"product": {"required": False}}
+
+
+class GetSalesSerializer(serializers.ModelSerializer):
+    items = SalesItemSerializer(many=True)
+    sales_image_variants = ImageVariantsField(source="sales_image")
+
+    class Meta:
+        model = Sales
+        fields = (
+            "id",
+            "customer",
+            "warehouse",
+            "biller",
+            "items",
+            "sales_tax",
+            "discount",
+            "shipping",
+            "sales_status",
+            "payment_status",
+            "sales_image",
+            "sales_image_variants",
+            "sales_note",
+            "staff_remark",
+            *ORDER_TOTAL_FIELDS,
+        )
 
 
 class PurchaseInvoiceSerializer(serializers.ModelSerializer):
     class Meta:
         model = PurchaseInvoice
-        fields = ('warehouse', 'supplier', 'purchases')
+        fields = ('id', 'warehouse', 'supplier', 'purchases', 'document', 'rendered_on')
+        read_only_fields = ('document', 'rendered_on')
+
+
+class SalesInvoiceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SalesInvoice
+        fields = ('id', 'warehouse', 'supplier', 'sales', 'document', 'rendered_on')
+        read_only_fields = ('document', 'rendered_on')
 
 class GetAdjustmentSeralizer(serializers.ModelSerializer):
     product=ProductSerializer()
     warehouse=WarehouseSerializer()
     class Meta:
         model = Adjustment
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class LowStockAlertSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source="product.product_name", read_only=True)
+    barcode = serializers.CharField(source="product.barcode", read_only=True)
+    warehouse_name = serializers.CharField(source="warehouse.name", read_only=True)
+
+    class Meta:
+        model = LowStockAlert
+        fields = [
+            "id",
+            "product",
+            "product_name",
+            "barcode",
+            "warehouse",
+            "warehouse_name",
+            "on_hand",
+            "threshold",
+            "created_on",
+            "modified_on",
+        ]
@@ -0,0 +1,85 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from apps.products import alerts
+from apps.products.models import (
+    Brand,
+    Category,
+    Product,
+    Purchase,
+    Sales,
+    SubCategory,
+    Unit,
+    Warehouse,
+)
+from apps.products.rollups import purchase_rollups, sales_rollups
+from apps.products.scan import scan_resolver
+from apps.products.search import refresh_search_vectors
+from apps.products.totals import purchase_totals, sales_totals
+from utils.context import get_current_user
+from utils.images import queue_variants
+from utils.response_cache import register_versioned
+
+register_versioned(Brand, Category, SubCategory, Unit, Warehouse)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_scan_cache(sender, instance, **kwargs):
+    # Again on commit: until then other requests still load the old row.
+    scan_resolver.invalidate(instance.pk)
+    transaction.on_commit(partial(scan_resolver.invalidate, instance.pk))
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_search_vector(sender, instance, **kwargs):
+    refresh_search_vectors(product_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def reevaluate_low_stock(sender, instance, created, update_fields=None, **kwargs):
+    # New products have no stock yet; others may have a new stock_alert.
+    if not created and (update_fields is None or "stock_alert" in update_fields):
+        alerts.touch_products([instance.pk])
+
+
+@receiver(post_save, sender=Brand)
+def refresh_brand_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_vectors(brand_ids=[instance.pk])
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_search_vectors(sender, instance, created, **kwargs):
+    if not created:
+        refresh_search_vectors(category_ids=[instance.pk])
+
+
+@receiver(pre_delete, sender=Sales)
+def undo_completed_sales(sender, instance, **kwargs):
+    # Runs while the lines still exist; not-complete orders are a no-op.
+    # May raise InsufficientStock, which rolls the delete back.
+    if instance.sales_status == "Complete":
+        sales_rollups.apply([instance.pk], sign=-1)
+        sales_totals.move_stock(instance, reverse=True, user=get_current_user())
+
+
+@receiver(pre_delete, sender=Purchase)
+def undo_completed_purchase(sender, instance, **kwargs):
+    if instance.sales_status == "Complete":
+        purchase_rollups.apply([instance.pk], sign=-1)
+        purchase_totals.move_stock(instance, reverse=True, user=get_current_user())
+
+
+IMAGE_FIELDS = {Brand: "brand_image", Product: "product_image", Sales: "sales_image"}
+
+
+@receiver(post_save, sender=Brand)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Sales)
+def queue_image_variants(sender, instance, **kwargs):
+    # Variants that already exist are skipped, so re-saves cost a few
+    # existence checks at most.
+    queue_variants(getattr(instance, IMAGE_FIELDS[sender]).name)
@@ -0,0 +1,194 @@
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from apps.products import alerts
+from apps.products.models import (
+    Adjustment,
+    Product,
+    StockBalance,
+    StockMovement,
+    Warehouse,
+)
+
+BULK_BATCH_SIZE = 1000
+
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id, warehouse_id, quantity):
+        self.product_id = product_id
+        self.warehouse_id = warehouse_id
+        self.quantity = quantity
+        super().__init__(
+            f"Not enough stock of {product_id} in {warehouse_id} to remove {quantity}."
+        )
+
+
+def _pk(value):
+    return getattr(value, "pk", value)
+
+
+def _apply_delta(product_id, warehouse_id, quantity):
+    balances = StockBalance.objects.filter(
+        product_id=product_id, warehouse_id=warehouse_id
+    )
+    if quantity < 0:
+        balances = balances.filter(on_hand__gte=-quantity)
+    return balances.update(on_hand=F("on_hand") + quantity, modified_on=Now())
+
+
+def record_movement(
+    product, warehouse, quantity, movement_type, reference=None, user=None
+):
+    """
+    Append a ledger entry and apply it to the on-hand balance.
+
+    The balance is changed with one conditional ``UPDATE ... SET on_hand =
+    on_hand + n``, so concurrent writers on the same SKU never lose updates
+    and only hold the balance row lock for the tail of the transaction.
+    Raises ``InsufficientStock`` (and rolls back) if a removal would take
+    the balance below zero. The pair's low-stock alert is re-evaluated
+    after commit.
+    """
+    product_id = _pk(product)
+    warehouse_id = _pk(warehouse)
+
+    with transaction.atomic():
+        movement = StockMovement.objects.create(
+            product_id=product_id,
+            warehouse_id=warehouse_id,
+            quantity=quantity,
+            movement_type=movement_type,
+            reference=reference,
+            created_by=user,
+        )
+        alerts.touch([(product_id, warehouse_id)])
+        if _apply_delta(product_id, warehouse_id, quantity):
+            return movement
+        if quantity < 0:
+            raise InsufficientStock(product_id, warehouse_id, -quantity)
+
+        # First movement for this pair: create the row, tolerating a
+        # concurrent writer that got there first, then apply the delta.
+        StockBalance.objects.bulk_create(
+            [StockBalance(product_id=product_id, warehouse_id=warehouse_id)],
+            ignore_conflicts=True,
+        )
+        _apply_delta(product_id, warehouse_id, quantity)
+    return movement
+
+
+def on_hand(product, warehouse=None):
+    balances = StockBalance.objects.filter(product_id=_pk(product))
+    if warehouse is not None:
+        balances = balances.filter(warehouse_id=_pk(warehouse))
+    return balances.aggregate(total=Sum("on_hand"))["total"] or 0
+
+
+def _missing(pk):
+    return f'Invalid pk "{pk}" - object does not exist.'
+
+
+def apply_bulk_adjustments(lines, user=None, atomic=False):
+    """
+    Apply many adjustment lines in one transaction.
+
+    ``lines`` is a list of ``(index, data)`` pairs where ``data`` holds
+    ``product``, ``warehouse``, ``type`` and ``quantity``. References and
+    current balances are read with a handful of set-based queries, the
+    touched balance rows are locked once (in (product, warehouse) order,
+    like every other stock writer, so they cannot deadlock), every line is checked against the running
+    balance, and adjustments, movements and balances are written with bulk
+    statements.
+
+    Returns ``(adjustments, errors)`` where ``errors`` maps a line index to
+    its error. With ``atomic`` a single bad line rolls back the batch.
+    """
+    product_ids = {data["product"] for _, data in lines}
+    warehouse_ids = {data["warehouse"] for _, data in lines}
+    products = set(
+        Product.objects.filter(id__in=product_ids).values_list("id", flat=True)
+    )
+    warehouses = set(
+        Warehouse.objects.filter(id__in=warehouse_ids).values_list("id", flat=True)
+    )
+
+    errors = {}
+    pairs = set()
+    for index, data in lines:
+        if data["product"] not in products:
+            errors[index] = {"product": _missing(data["product"])}
+        elif data["warehouse"] not in warehouses:
+            errors[index] = {"warehouse": _missing(data["warehouse"])}
+        else:
+            pairs.add((data["product"], data["warehouse"]))
+
+    adjustments = []
+    movements = []
+    with transaction.atomic():
+        StockBalance.objects.bulk_create(
+            [StockBalance(product_id=p, warehouse_id=w) for p, w in pairs],
+            ignore_conflicts=True,
+            batch_size=BULK_BATCH_SIZE,
+        )
+        locked = StockBalance.objects.select_for_update().filter(
+            product_id__in={p for p, _ in pairs},
+            warehouse_id__in={w for _, w in pairs},
+        ).order_by("product_id", "warehouse_id")
+        balances = {
+            (balance.product_id, balance.warehouse_id): balance
+            for balance in locked
+            if (balance.product_id, balance.warehouse_id) in pairs
+        }
+
+        touched = set()
+        for index, data in lines:
+            if index in errors:
+                continue
+            pair = (data["product"], data["warehouse"])
+            balance = balances[pair]
+            quantity = data["quantity"]
+            if data["type"] == "Substraction":
+                quantity = -quantity
+            if balance.on_hand + quantity < 0:
+                errors[index] = {
+                    "quantity": "Stock is less than quantity to be substracted."
+                }
+                continue
+
+            balance.on_hand += quantity
+            touched.add(pair)
+            adjustment = Adjustment(
+                product_id=pair[0],
+                warehouse_id=pair[1],
+                type=data["type"],
+                created_by=user,
+            )
+            adjustments.append(adjustment)
+            movements.append(
+                StockMovement(
+                    product_id=pair[0],
+                    warehouse_id=pair[1],
+                    quantity=quantity,
+                    movement_type="Adjustment",
+                    reference=adjustment.id,
+                    created_by=user,
+                )
+            )
+
+        if errors and atomic:
+            transaction.set_rollback(True)
+            return [], errors
+
+        now = timezone.now()
+        changed = [balances[pair] for pair in touched]
+        for balance in changed:
+            balance.modified_on = now
+        Adjustment.objects.bulk_create(adjustments, batch_size=BULK_BATCH_SIZE)
+        StockMovement.objects.bulk_create(movements, batch_size=BULK_BATCH_SIZE)
+        StockBalance.objects.bulk_update(
+            changed, ["on_hand", "modified_on"], batch_size=BULK_BATCH_SIZE
+        )
+        alerts.touch(touched)
+    return adjustments, errors
@@ -1,3 +1,893 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from PIL import Image
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from apps.accounts.authentication import VersionedTokenObtainPairSerializer
+from apps.accounts.models import Supplier, User
+from apps.products import alerts
+from apps.products.models import (
+    Adjustment,
+    BarcodeJob,
+    Brand,
+    Category,
+    LowStockAlert,
+    Product,
+    ProductDailySummary,
+    Purchase,
+    PurchaseInvoice,
+    PurchaseItem,
+    StockBalance,
+    StockMovement,
+    SupplierDailySummary,
+    Unit,
+    Warehouse,
+)
+from apps.products.rollups import purchase_rollups, rebuild_rollups
+from apps.products.scan import ScanResolver, scan_resolver
+from apps.products.serializers import PurchaseSerializer
+from apps.products.stock import InsufficientStock, on_hand, record_movement
+from apps.products.barcodes import LABEL_SIZES
+from apps.products.constant import BARCODE_PAPER_SIZE
+from apps.products.importers import ProductImporter, read_ndjson
+from apps.products.invoices import purchase_invoices
+from apps.products.pricing import PRODUCT_RATES, price_basket, price_line
+from apps.products.totals import purchase_totals
+from apps.products.valuation import value_movements
+from apps.products.views import ProductViewSet
+from utils.images import ImageVariantView, ImageVariantsField, get_variant, variant_name
+from utils.response_cache import bump_version, check_response_cache
+from utils.testing import QueryBudgetMixin
+
+
+class EndpointQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    """
+    Query counts must not grow with the number of rows returned; a budget
+    failure here means an N+1 was reintroduced.
+    """
+    ROWS = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            full_name="Admin",
+            username="admin",
+            phone="+9779800000000",
+        )
+        brand = Brand.objects.create(brand_name="Brand", created_by=cls.user)
+        category = Category.objects.create(name="Category", created_by=cls.user)
+        unit = Unit.objects.create(unit_name="Piece", short_name="pc")
+        warehouses = [
+            Warehouse.objects.create(
+                name=f"Warehouse {i}",
+                phone=f"+97798000000{i:02d}",
+                email=f"warehouse{i}@example.com",
+            )
+            for i in range(2)
+        ]
+        supplier = Supplier.objects.create(
+            user=User.objects.create_user(
+                email="supplier@example.com",
+                password="password",
+                full_name="Supplier",
+                username="supplier",
+                phone="+9779800000001",
+            ),
+            company="Company",
+            supplier_code="SUP0",
+        )
+
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    product_name=f"Product {i}",
+                    product_type="Food",
+                    category=category,
+                    product_code=i,
+                    brand=brand,
+                    barcode=f"BAR{i}",
+                    product_unit=unit,
+                    product_price=10,
+                    expense=1,
+                    unit_price=10,
+                    product_tax="10",
+                    tax_method="Exclusive",
+                    discount=0,
+                    stock_alert=5,
+                    user=cls.user,
+                    created_by=cls.user,
+                    modified_by=cls.user,
+                )
+                for i in range(cls.ROWS)
+            ]
+        )
+        for product in products:
+            product.warehouse.set(warehouses)
+            Adjustment.objects.create(product=product, warehouse=warehouses[0])
+
+        for _ in range(cls.ROWS):
+            purchase = Purchase.objects.create(
+                warehouse=warehouses[0],
+                supplier=supplier,
+                order_tax="10",
+                order_discount=0,
+                shipping=0,
+                sales_status="Complete",
+                purchase_note="",
+            )
+            purchase.product.set(products)
+
+        cls.product = products[0]
+        cls.purchase = purchase
+        cls.adjustment = Adjustment.objects.first()
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_product_list(self):
+        self.assertQueryBudget(reverse("product-list"), 2)
+
+    def test_product_retrieve(self):
+        self.assertQueryBudget(reverse("product-detail", args=[self.product.pk]), 2)
+
+    def test_purchase_list(self):
+        self.assertQueryBudget(reverse("purchase-list"), 2)
+
+    def test_purchase_retrieve(self):
+        self.assertQueryBudget(reverse("purchase-detail", args=[self.purchase.pk]), 4)
+
+    def test_adjustment_list(self):
+        self.assertQueryBudget(reverse("adjustment-list"), 2)
+
+    def test_adjustment_retrieve(self):
+        self.assertQueryBudget(
+            reverse("adjustment-detail", args=[self.adjustment.pk]), 2
+        )
+
+    def test_brand_list(self):
+        self.assertQueryBudget(reverse("brand-list"), 2)
+
+
+class PriceLineTests(SimpleTestCase):
+    def line(self, tax_method):
+        return price_line(
+            PurchaseItem(
+                quantity=3,
+                unit_price=Decimal("10.00"),
+                discount=Decimal("2.00"),
+                tax_rate=Decimal("13"),
+                tax_method=tax_method,
+            )
+        )
+
+    def test_exclusive_adds_tax(self):
+        line = self.line("Exclusive")
+        self.assertEqual(
+            (line.subtotal, line.tax, line.total),
+            (Decimal("28.00"), Decimal("3.64"), Decimal("31.64")),
+        )
+
+    def test_inclusive_splits_tax_out(self):
+        line = self.line("Non-Exclusive")
+        self.assertEqual(
+            (line.subtotal, line.tax, line.total),
+            (Decimal("24.78"), Decimal("3.22"), Decimal("28.00")),
+        )
+
+    def test_rates_come_from_labels(self):
+        self.assertEqual(PRODUCT_RATES.rate("11"), Decimal("12"))
+
+    def test_basket_matches_stored_order_totals(self):
+        # Same lines and header as OrderTotalsTests.test_header_totals_are_stored.
+        basket = price_basket(
+            [
+                {"quantity": quantity, "unit_price": price, "product_tax": "10", "tax_method": "Exclusive"}
+                for quantity, price in ((2, 10), (1, Decimal("8")))
+            ],
+            order_tax="10",
+            discount=5,
+            shipping=7.5,
+        )
+
+        self.assertEqual(
+            basket["lines"],
+            [
+                (Decimal("20.00"), Decimal("2.00"), Decimal("22.00")),
+                (Decimal("8.00"), Decimal("0.80"), Decimal("8.80")),
+            ],
+        )
+        self.assertEqual(basket["order_tax_amount"], Decimal("2.58"))
+        self.assertEqual(basket["grand_total"], Decimal("35.88"))
+
+
+class ValuationTests(SimpleTestCase):
+    def setUp(self):
+        # Pair 0: +10 @ 1, +10 @ 2, -15.  Pair 1: +4 @ 3, -1, +2 @ 6.
+        self.values = value_movements(
+            groups=[0, 0, 0, 1, 1, 1],
+            quantities=[10, 10, -15, 4, -1, 2],
+            unit_costs=[1, 2, 0, 3, 0, 6],
+            group_count=2,
+        )
+
+    def assertColumn(self, name, expected):
+        for actual, value in zip(self.values[name], expected):
+            self.assertAlmostEqual(actual, value)
+
+    def test_fifo_issues_oldest_layers_first(self):
+        self.assertColumn("on_hand", [5, 5])
+        self.assertColumn("fifo_issued", [10 * 1 + 5 * 2, 1 * 3])
+        self.assertColumn("fifo_value", [5 * 2, 3 * 3 + 2 * 6])
+
+    def test_weighted_average_over_the_period(self):
+        self.assertColumn("average_cost", [1.5, 4])
+        self.assertColumn("average_value", [7.5, 20])
+        self.assertColumn("average_issued", [22.5, 4])
+
+
+class CatalogTestCase(APITestCase):
+    """
+    One product, warehouse and complete purchase to build on.
+    """
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="password",
+            full_name="Admin",
+            username="admin",
+            phone="+9779800000012",
+        )
+        brand = Brand.objects.create(brand_name="Brand")
+        category = Category.objects.create(name="Category")
+        unit = Unit.objects.create(unit_name="Piece", short_name="pc")
+        cls.warehouse = Warehouse.objects.create(
+            name="Warehouse", phone="+9779800000010", email="warehouse@example.com"
+        )
+        cls.supplier = supplier = Supplier.objects.create(
+            user=User.objects.create_user(
+                email="supplier@example.com",
+                password="password",
+                full_name="Supplier",
+                username="supplier",
+                phone="+9779800000011",
+            ),
+            company="Company",
+            supplier_code="SUP0",
+        )
+        cls.product = Product.objects.create(
+            product_name="Product",
+            product_type="Food",
+            category=category,
+            product_code=1,
+            brand=brand,
+            barcode="BAR1",
+            product_unit=unit,
+            product_price=12,
+            expense=0,
+            unit_price=10,
+            product_tax="10",
+            tax_method="Exclusive",
+            discount=0,
+            stock_alert=5,
+        )
+        cls.purchase = Purchase.objects.create(
+            warehouse=cls.warehouse,
+            supplier=supplier,
+            order_tax="10",
+            order_discount=5,
+            shipping=7.5,
+            sales_status="Complete",
+            purchase_note="",
+        )
+
+
+class ConditionalGetTests(CatalogTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+        adjustment = Adjustment.objects.create(product=self.product, warehouse=self.warehouse)
+        self.url = reverse("adjustment-detail", args=[adjustment.pk])
+
+    def test_unchanged_detail_is_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_embedded_row_change_invalidates_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        Product.objects.filter(pk=self.product.pk).update(
+            product_name="Renamed", modified_on=timezone.now() + timedelta(seconds=1)
+        )
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["product"]["product_name"], "Renamed")
+
+    def test_list_validators_come_from_the_page(self):
+        url = reverse("product-list")
+        with self.assertNumQueries(2):
+            etag = self.client.get(url)["ETag"]
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_product_detail_embedding_users_is_not_modified(self):
+        url = reverse("product-detail", args=[self.product.pk])
+        etag = self.client.get(url)["ETag"]
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_supplier_list_and_detail_are_not_modified(self):
+        for url in (
+            reverse("suppliers-list"),
+            reverse("suppliers-detail", args=[self.supplier.pk]),
+        ):
+            with self.subTest(url=url):
+                etag = self.client.get(url)["ETag"]
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+                self.assertEqual(response.status_code, 304)
+
+    def test_embedded_user_change_invalidates_etag(self):
+        url = reverse("suppliers-detail", args=[self.supplier.pk])
+        response = self.client.get(url)
+        self.assertNotIn("Last-Modified", response)
+        User.objects.filter(pk=self.supplier.user_id).update(full_name="Renamed")
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["user"]["full_name"], "Renamed")
+
+
+class ResponseCacheTests(CatalogTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+        # The cache outlives each test's transaction.
+        bump_version(Brand)
+
+    def test_write_invalidates_cached_list(self):
+        url = reverse("brand-list")
+        self.assertEqual(self.client.get(url)["X-Cache"], "MISS")
+        self.assertEqual(self.client.get(url)["X-Cache"], "HIT")
+
+        Brand.objects.create(brand_name="Other")
+        response = self.client.get(url)
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["count"], 2)
+
+    @override_settings(WEB_CONCURRENCY=2)
+    def test_local_memory_cache_needs_a_single_worker(self):
+        self.assertEqual(
+            [error.id for error in check_response_cache(None)], ["response_cache.E001"]
+        )
+
+
+class AsyncReadViewTests(CatalogTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Brand.objects.bulk_create([Brand(brand_name=f"Brand {i}") for i in range(3)])
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+        bump_version(Brand)
+        self.token = VersionedTokenObtainPairSerializer.get_token(self.admin).access_token
+
+    def assertSameList(self, sync_url, async_url):
+        expected = self.client.get(sync_url).json()
+        actual = async_to_sync(self.async_client.get)(
+            async_url, HTTP_AUTHORIZATION=f"Bearer {self.token}"
+        ).json()
+
+        self.assertEqual(set(actual), set(expected))
+        self.assertEqual(actual.get("count"), expected.get("count"))
+        self.assertEqual(actual["results"], expected["results"])
+        self.assertEqual(bool(actual["next"]), bool(expected["next"]))
+
+    def test_brand_list_matches_limit_offset_viewset(self):
+        self.assertSameList(
+            reverse("brand-list") + "?l=2&o=2", reverse("async-brand-list") + "?l=2&o=2"
+        )
+
+    def test_product_list_matches_keyset_viewset(self):
+        self.assertSameList(reverse("product-list"), reverse("async-product-list"))
+
+    def test_category_detail_matches_viewset(self):
+        pk = Category.objects.get().pk
+        expected = self.client.get(reverse("category-detail", args=[pk])).json()
+
+        actual = async_to_sync(self.async_client.get)(
+            reverse("async-category-detail", args=[pk]),
+            HTTP_AUTHORIZATION=f"Bearer {self.token}",
+        ).json()
+
+        self.assertEqual(actual, expected)
+
+
+class ScanResolverTests(CatalogTestCase):
+    def setUp(self):
+        scan_resolver.invalidate(self.product.pk)
+
+    def test_hits_are_served_from_cache(self):
+        scan_resolver.resolve("BAR1")
+
+        with self.assertNumQueries(0):
+            payload = scan_resolver.resolve(" BAR1 ")
+
+        self.assertEqual(payload["id"], str(self.product.pk))
+
+    def test_product_save_invalidates_every_code(self):
+        scan_resolver.resolve("BAR1")
+        scan_resolver.resolve("1")
+        self.product.unit_price = 15
+        self.product.save()
+
+        with self.assertNumQueries(2):
+            self.assertEqual(scan_resolver.resolve("BAR1")["price"], 15)
+            self.assertEqual(scan_resolver.resolve("1")["price"], 15)
+
+    def test_entries_expire(self):
+        resolver = ScanResolver(ttl=0)
+        resolver.resolve("BAR1")
+
+        with self.assertNumQueries(1):
+            resolver.resolve("BAR1")
+
+    def test_expired_entries_leave_the_reverse_map(self):
+        resolver = ScanResolver(ttl=0)
+        resolver.resolve("BAR1")
+
+        resolver.cache.get("BAR1")
+
+        self.assertEqual(resolver.codes, {})
+
+    def test_load_racing_an_invalidation_is_not_cached(self):
+        resolver = ScanResolver()
+        load = resolver.load
+
+        def load_then_write(code):
+            payload = load(code)
+            resolver.invalidate(self.product.pk)
+            return payload
+
+        resolver.load = load_then_write
+        resolver.resolve("BAR1")
+
+        self.assertNotIn("BAR1", resolver.cache)
+
+
+class StockLedgerTests(CatalogTestCase):
+    def test_first_movement_creates_balance(self):
+        record_movement(self.product, self.warehouse, 5, "Adjustment")
+
+        self.assertEqual(on_hand(self.product, self.warehouse), 5)
+        self.assertEqual(StockBalance.objects.count(), 1)
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+    def test_removal_beyond_balance_is_rejected(self):
+        record_movement(self.product, self.warehouse, 2, "Adjustment")
+
+        with self.assertRaises(InsufficientStock):
+            record_movement(self.product, self.warehouse, -3, "Adjustment")
+
+        self.assertEqual(on_hand(self.product, self.warehouse), 2)
+        self.assertEqual(StockMovement.objects.count(), 1)
+
+    def test_removal_without_balance_rolls_back(self):
+        with self.assertRaises(InsufficientStock):
+            record_movement(self.product, self.warehouse, -1, "Adjustment")
+
+        self.assertFalse(StockBalance.objects.exists())
+        self.assertFalse(StockMovement.objects.exists())
+
+    def test_removal_down_to_zero_is_allowed(self):
+        record_movement(self.product, self.warehouse, 4, "Adjustment")
+        record_movement(self.product, self.warehouse, -4, "Adjustment")
+
+        self.assertEqual(on_hand(self.product, self.warehouse), 0)
+
+
+class ProductImporterTests(CatalogTestCase):
+    def row(self, **values):
+        return {
+            "product_name": "Imported",
+            "product_type": "Food",
+            "product_code": 2,
+            "barcode": "BAR2",
+            "product_price": 12,
+            "expense": 0,
+            "unit_price": 10,
+            "product_tax": "10",
+            "tax_method": "Exclusive",
+            "discount": 0,
+            "stock_alert": 5,
+            "brand": "Brand",
+            "category": "Category",
+            "product_unit": "pc",
+            "warehouse": "Warehouse",
+            **values,
+        }
+
+    def run_import(self, *lines):
+        ndjson = "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines)
+        return ProductImporter(user=self.admin).run(read_ndjson(io.StringIO(ndjson)))
+
+    def test_ndjson_warehouse_text_is_split(self):
+        report = self.run_import(self.row())
+
+        self.assertEqual((report["created"], report["failed"]), (1, 0))
+        product = Product.objects.get(barcode="BAR2")
+        self.assertEqual(list(product.warehouse.all()), [self.warehouse])
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        report = self.run_import(
+            "not json",
+            self.row(warehouse="Warehouse|Missing"),
+            self.row(brand=""),
+            self.row(barcode="BAR3", product_code=3),
+        )
+
+        self.assertEqual((report["processed"], report["created"], report["failed"]), (4, 1, 3))
+        errors = {error["row"]: error["errors"] for error in report["errors"]}
+        self.assertEqual(set(errors), {1, 2, 3})
+        self.assertIn("row", errors[1])
+        self.assertEqual(errors[2], {"warehouse": ['"Missing" does not exist.']})
+        self.assertEqual(errors[3], {"brand": ["This field is required."]})
+
+    def upload(self, content, name):
+        self.client.force_authenticate(self.admin)
+        return self.client.post(
+            reverse("product-import-products"),
+            {"file": SimpleUploadedFile(name, content)},
+            format="multipart",
+        )
+
+    def test_undecodable_line_is_rejected(self):
+        content = b"\n".join([json.dumps(self.row()).encode(), b'{"product_name": "\xff"}'])
+
+        response = self.upload(content, "products.ndjson")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data["error"].startswith("Line 2:"))
+        self.assertEqual(response.data["created"], 1)
+
+    def test_malformed_csv_is_rejected(self):
+        # One field over the csv module's size limit.
+        field = b"a" * (csv.field_size_limit() + 1)
+        response = self.upload(b'product_name,barcode\n"' + field + b'",BAR2\n', "products.csv")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(response.data["error"].startswith("Line 2:"))
+
+
+class BulkAdjustmentTests(CatalogTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def post(self, lines, query=""):
+        return self.client.post(reverse("adjustment-list") + query, lines, format="json")
+
+    def line(self, **values):
+        return {
+            "product": str(self.product.pk),
+            "warehouse": str(self.warehouse.pk),
+            "type": "Addition",
+            "quantity": 3,
+            **values,
+        }
+
+    def test_bad_lines_are_reported_by_index(self):
+        response = self.post([self.line(), self.line(quantity=0)])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+        self.assertEqual([error["line"] for error in response.data["errors"]], [1])
+        self.assertEqual(on_hand(self.product, self.warehouse), 3)
+
+    def test_atomic_batch_is_rejected_as_a_whole(self):
+        response = self.post([self.line(), self.line(quantity=0)], "?atomic=true")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["created"], 0)
+        self.assertFalse(Adjustment.objects.exists())
+
+
+class BarcodeEndpointTests(CatalogTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def test_malformed_job_id_is_not_found(self):
+        response = self.client.get(reverse("barcode-job-status", args=["not-a-uuid"]))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_job_products_are_deduplicated(self):
+        response = self.client.post(
+            reverse("barcode-create-job"),
+            {
+                "products": [str(self.product.pk), str(self.product.pk).upper()],
+                "papersize": BARCODE_PAPER_SIZE[0][0],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["total"], 1)
+        self.assertEqual(BarcodeJob.objects.get().products, [str(self.product.pk)])
+
+    def test_malformed_sheet_ids_are_rejected(self):
+        response = self.client.get(
+            reverse("barcode-sheet"), {"papersize": next(iter(LABEL_SIZES)), "ids": "1,2"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ExportTests(CatalogTestCase):
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def export(self, output):
+        response = self.client.get(reverse("product-export"), {"output": output})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content).decode()
+
+    def test_csv_starts_with_header_line(self):
+        lines = self.export("csv").splitlines()
+
+        self.assertEqual(lines[0].split(","), list(ProductViewSet.export_fields))
+        self.assertEqual(len(lines), 2)
+
+    def test_ndjson_has_one_object_per_row(self):
+        rows = [json.loads(line) for line in self.export("ndjson").splitlines()]
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["product_name"], "Product")
+        self.assertEqual(rows[0]["brand__brand_name"], "Brand")
+
+    def test_unknown_output_is_rejected(self):
+        response = self.client.get(reverse("product-export"), {"output": "xml"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class LowStockAlertTests(CatalogTestCase):
+    def test_low_stock_alert_follows_balance(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_movement(self.product, self.warehouse, 3, "Adjustment")
+        alert = LowStockAlert.objects.get(product=self.product, warehouse=self.warehouse)
+        self.assertEqual((alert.on_hand, alert.threshold), (3, 5))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_movement(self.product, self.warehouse, 10, "Adjustment")
+        self.assertFalse(LowStockAlert.objects.exists())
+
+    def test_rolled_back_movement_is_not_evaluated(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(InsufficientStock):
+                record_movement(self.product, self.warehouse, -1, "Adjustment")
+
+        self.assertEqual(callbacks, [])
+
+    def test_batched_touches_are_evaluated_once(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with alerts.batched():
+                record_movement(self.product, self.warehouse, 3, "Adjustment")
+                record_movement(self.product, self.warehouse, 1, "Adjustment")
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(LowStockAlert.objects.get().on_hand, 4)
+
+
+class InvoiceRenderTests(CatalogTestCase):
+    def test_invoice_is_rendered_from_two_queries(self):
+        purchase_totals.add_items(self.purchase, [{"product": self.product, "quantity": 2}])
+        invoice = PurchaseInvoice.objects.create(purchases=self.purchase)
+        self.purchase.refresh_from_db()
+
+        with self.assertNumQueries(2):
+            html = purchase_invoices.render(invoice.pk).decode()
+
+        self.assertIn("Purchase invoice", html)
+        self.assertIn(self.product.product_name, html)
+        self.assertIn(str(self.purchase.grand_total), html)
+
+    def test_batch_is_rendered_in_worker_processes(self):
+        purchase_totals.add_items(self.purchase, [{"product": self.product, "quantity": 2}])
+        invoice = PurchaseInvoice.objects.create(purchases=self.purchase)
+
+        rendered, errors = purchase_invoices.render_batch(
+            PurchaseInvoice.objects.all(), workers=1
+        )
+
+        self.assertEqual((rendered, errors), (1, {}))
+        invoice.refresh_from_db()
+        self.addCleanup(default_storage.delete, invoice.document.name)
+        self.assertIsNotNone(invoice.rendered_on)
+        with default_storage.open(invoice.document.name) as document:
+            self.assertIn(self.product.product_name, document.read().decode())
+
+
+class OrderTotalsTests(CatalogTestCase):
+    def test_header_totals_are_stored(self):
+        purchase_totals.add_items(
+            self.purchase,
+            [
+                {"product": self.product, "quantity": 2},
+                {"product": self.product, "quantity": 1, "unit_price": Decimal("8")},
+            ],
+        )
+        self.purchase.refresh_from_db()
+
+        # Lines: 20 + 2 tax, 8 + 0.80 tax; order tax 10% of (30.80 - 5).
+        self.assertEqual(self.purchase.subtotal, Decimal("28.00"))
+        self.assertEqual(self.purchase.item_tax, Decimal("2.80"))
+        self.assertEqual(self.purchase.order_tax_amount, Decimal("2.58"))
+        self.assertEqual(self.purchase.grand_total, Decimal("35.88"))
+        self.assertEqual(self.purchase.item_count, 2)
+        self.assertEqual(list(self.purchase.product.all()), [self.product])
+
+    def test_completed_purchase_moves_stock(self):
+        purchase_totals.add_items(self.purchase, [{"product": self.product, "quantity": 4}])
+        purchase_totals.move_stock(self.purchase)
+
+        self.assertEqual(on_hand(self.product, self.warehouse), 4)
+
+    def complete_with_stock(self, quantity):
+        purchase_totals.add_items(self.purchase, [{"product": self.product, "quantity": quantity}])
+        purchase_totals.move_stock(self.purchase)
+
+    def test_deleting_completed_purchase_reverses_stock(self):
+        self.complete_with_stock(4)
+
+        self.purchase.delete()
+
+        self.assertEqual(on_hand(self.product), 0)
+
+    def test_warehouse_change_moves_stock(self):
+        self.complete_with_stock(4)
+        other = Warehouse.objects.create(
+            name="Other", phone="+9779800000013", email="other@example.com"
+        )
+        serializer = PurchaseSerializer(self.purchase, data={"warehouse": other.pk}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.assertEqual(on_hand(self.product, self.warehouse), 0)
+        self.assertEqual(on_hand(self.product, other), 4)
+
+    def test_uncompleting_with_new_warehouse_reverses_old_one(self):
+        self.complete_with_stock(4)
+        other = Warehouse.objects.create(
+            name="Other", phone="+9779800000013", email="other@example.com"
+        )
+        serializer = PurchaseSerializer(
+            self.purchase, data={"warehouse": other.pk, "sales_status": "Drafts"}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.assertEqual(on_hand(self.product, self.warehouse), 0)
+        self.assertEqual(on_hand(self.product, other), 0)
+
+    def summaries(self):
+        product = ProductDailySummary.objects.values_list(
+            "purchased_quantity", "purchase_amount"
+        ).get(product=self.product, warehouse=self.warehouse)
+        supplier = SupplierDailySummary.objects.values_list(
+            "purchase_count", "purchase_amount"
+        ).get(supplier=self.purchase.supplier)
+        return product, supplier
+
+    def test_completed_purchase_is_summarized(self):
+        purchase_totals.add_items(self.purchase, [{"product": self.product, "quantity": 2}])
+        purchase_rollups.apply([self.purchase.pk])
+        purchase_rollups.apply([self.purchase.pk])
+        self.purchase.refresh_from_db()
+
+        self.assertEqual(
+            self.summaries(),
+            ((4, Decimal("44.00")), (2, 2 * self.purchase.grand_total)),
+        )
+
+        purchase_rollups.apply([self.purchase.pk], sign=-1)
+        self.assertEqual(
+            self.summaries(), ((2, Decimal("22.00")), (1, self.purchase.grand_total))
+        )
+
+    def test_incomplete_purchase_is_not_summarized(self):
+        Purchase.objects.filter(pk=self.purchase.pk).update(sales_status="Drafts")
+        purchase_totals.add_items(self.purchase, [{"product": self.product, "quantity": 2}])
+        purchase_rollups.apply([self.purchase.pk])
+
+        self.assertFalse(ProductDailySummary.objects.exists())
+
+    def test_rebuild_matches_incremental_rows(self):
+        purchase_totals.add_items(self.purchase, [{"product": self.product, "quantity": 3}])
+        purchase_rollups.apply([self.purchase.pk])
+        incremental = self.summaries()
+        ProductDailySummary.objects.update(purchased_quantity=0)
+
+        rebuild_rollups()
+
+        self.assertEqual(self.summaries(), incremental)
+
+
+@override_settings(
+    STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.InMemoryStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+)
+class ImageVariantTests(SimpleTestCase):
+    def setUp(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 400), "red").save(buffer, "PNG")
+        self.name = default_storage.save("brands/brand.png", ContentFile(buffer.getvalue()))
+
+    def test_variant_is_scaled_webp_and_reused(self):
+        name = get_variant(self.name, "thumb")
+
+        self.assertEqual(name, variant_name(self.name, "thumb"))
+        with default_storage.open(name) as stored:
+            image = Image.open(stored)
+            self.assertEqual((image.format, image.size), ("WEBP", (160, 80)))
+        self.assertEqual(get_variant(self.name, "thumb"), name)
+
+    def test_field_links_every_variant(self):
+        urls = ImageVariantsField().to_representation(Brand(brand_image=self.name).brand_image)
+
+        self.assertEqual(
+            urls["thumb"],
+            reverse("image-variant", kwargs={"variant": "thumb", "name": self.name}),
+        )
+        self.assertEqual(set(urls), {"thumb", "small", "medium"})
+
+    def fetch(self, name, user=None):
+        url = reverse("image-variant", kwargs={"variant": "thumb", "name": name})
+        request = APIRequestFactory().get(url)
+        if user is not None:
+            force_authenticate(request, user=user)
+        return ImageVariantView.as_view()(request, variant="thumb", name=name)
+
+    def test_view_needs_authentication(self):
+        self.assertEqual(self.fetch(self.name).status_code, 401)
+        self.assertEqual(self.fetch(self.name, user=User()).status_code, 200)
+
+    def test_replaced_original_gets_new_variants(self):
+        old = variant_name(self.name, "thumb")
+        default_storage.delete(self.name)
+        default_storage.save(self.name, ContentFile(b"new upload"))
+
+        self.assertNotEqual(variant_name(self.name, "thumb"), old)
+
+    def test_undecodable_original_is_not_found(self):
+        name = default_storage.save("brands/broken.png", ContentFile(b"not an image"))
+
+        self.assertEqual(self.fetch(name, user=User()).status_code, 404)
+
+    def test_view_only_serves_image_sources(self):
+        name = default_storage.save("profile/user.png", ContentFile(b""))
+
+        self.assertEqual(self.fetch(name, user=User()).status_code, 404)
+        self.assertIsNone(
+            ImageVariantsField().to_representation(User(profile_image=name).profile_image)
+        )
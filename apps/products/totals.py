@@ -0,0 +1,178 @@
+from collections import Counter
+
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from apps.products import alerts
+from apps.products.models import Purchase, PurchaseItem, Sales, SalesItem
+from apps.products.pricing import (
+    ORDER_RATES,
+    PRODUCT_RATES,
+    ZERO,
+    money,
+    order_amounts,
+    price_line,
+)
+from apps.products.stock import BULK_BATCH_SIZE, record_movement
+
+
+class OrderTotals:
+    """
+    Line writing, header totals and stock movements for one order type.
+
+    Header totals are::
+
+        subtotal         = sum of line subtotals (after line discounts, before tax)
+        item_tax         = sum of line taxes
+        order_tax_amount = (sum of line totals - order discount) * order tax rate
+        grand_total      = sum of line totals - order discount
+                           + order_tax_amount + shipping
+
+    and are stored on the header, so nothing downstream recomputes them.
+    """
+    TOTAL_FIELDS = [
+        "subtotal",
+        "item_tax",
+        "order_tax_amount",
+        "grand_total",
+        "item_count",
+        "modified_on",
+    ]
+
+    def __init__(
+        self,
+        model,
+        item_model,
+        link,
+        tax_field,
+        discount_field,
+        price_field,
+        sign,
+        movement_type,
+    ):
+        self.model = model
+        self.item_model = item_model
+        self.link = link
+        self.tax_field = tax_field
+        self.discount_field = discount_field
+        self.price_field = price_field
+        self.sign = sign
+        self.movement_type = movement_type
+
+    def add_items(self, order, lines, user=None):
+        """
+        Price and insert validated ``lines`` (``product``, ``quantity`` and
+        optional ``unit_price``/``discount``) for ``order`` in one statement,
+        then refresh its totals.
+        """
+        items = [
+            price_line(
+                self.item_model(
+                    **{self.link: order},
+                    product=line["product"],
+                    quantity=line["quantity"],
+                    unit_price=money(
+                        line.get("unit_price", getattr(line["product"], self.price_field))
+                    ),
+                    discount=money(line.get("discount", ZERO)),
+                    tax_rate=PRODUCT_RATES.rate(line["product"].product_tax),
+                    tax_method=line["product"].tax_method,
+                    created_by=user,
+                )
+            )
+            for line in lines
+        ]
+        self.item_model.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+        # Keep the legacy product list in step with the lines.
+        order.product.add(*{item.product_id for item in items})
+        self.recalculate([order.pk])
+        return items
+
+    def recalculate(self, order_ids):
+        """
+        Recompute and store the totals of a batch of orders with one grouped
+        aggregate over their lines, one read of the headers and one
+        ``bulk_update``.
+        """
+        order_field = f"{self.link}_id"
+        sums = {
+            row[order_field]: row
+            for row in self.item_model.objects.filter(**{f"{order_field}__in": order_ids})
+            .values(order_field)
+            .annotate(
+                subtotal=Sum("subtotal"),
+                tax=Sum("tax"),
+                total=Sum("total"),
+                count=Count("id"),
+            )
+            .order_by()
+        }
+        orders = list(
+            self.model.objects.filter(id__in=order_ids).only(
+                "id", self.tax_field, self.discount_field, "shipping"
+            )
+        )
+
+        now = timezone.now()
+        for order in orders:
+            lines = sums.get(order.pk, {})
+            order.subtotal = lines.get("subtotal") or ZERO
+            order.item_tax = lines.get("tax") or ZERO
+            order.order_tax_amount, order.grand_total = order_amounts(
+                lines.get("total") or ZERO,
+                getattr(order, self.discount_field),
+                ORDER_RATES.rate(getattr(order, self.tax_field)),
+                order.shipping,
+            )
+            order.item_count = lines.get("count", 0)
+            order.modified_on = now
+
+        self.model.objects.bulk_update(orders, self.TOTAL_FIELDS, batch_size=BULK_BATCH_SIZE)
+        return orders
+
+    def move_stock(self, order, reverse=False, user=None, warehouse=None):
+        """
+        Record the stock movements of a completed order (or undo them with
+        ``reverse``), one per product, in ``warehouse`` (the order's own by
+        default). Raises ``InsufficientStock``.
+        """
+        quantities = Counter()
+        for product_id, quantity in self.item_model.objects.filter(
+            **{self.link: order}
+        ).values_list("product_id", "quantity"):
+            quantities[product_id] += quantity
+
+        sign = -self.sign if reverse else self.sign
+        warehouse = order.warehouse_id if warehouse is None else warehouse
+        with alerts.batched():
+            for product_id in sorted(quantities):
+                record_movement(
+                    product=product_id,
+                    warehouse=warehouse,
+                    quantity=sign * quantities[product_id],
+                    movement_type=self.movement_type,
+                    reference=order.pk,
+                    user=user,
+                )
+
+
+sales_totals = OrderTotals(
+    Sales,
+    SalesItem,
+    link="sales",
+    tax_field="sales_tax",
+    discount_field="discount",
+    price_field="product_price",
+    sign=-1,
+    movement_type="Sale",
+)
+purchase_totals = OrderTotals(
+    Purchase,
+    PurchaseItem,
+    link="purchase",
+    tax_field="order_tax",
+    discount_field="order_discount",
+    price_field="unit_price",
+    sign=1,
+    movement_type="Purchase",
+)
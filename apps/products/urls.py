@@ -0,0 +1,23 @@
+from django.urls import path
+
+from apps.products.async_views import (
+    AsyncBrandView,
+    AsyncCategoryView,
+    AsyncProductView,
+    AsyncUnitView,
+    AsyncWarehouseView,
+)
+
+# Native async read endpoints; they only help when served through ASGI.
+urlpatterns = [
+    path("products/", AsyncProductView.as_view(), name="async-product-list"),
+    path("products/<uuid:pk>/", AsyncProductView.as_view(), name="async-product-detail"),
+    path("warehouse/", AsyncWarehouseView.as_view(), name="async-warehouse-list"),
+    path("warehouse/<uuid:pk>/", AsyncWarehouseView.as_view(), name="async-warehouse-detail"),
+    path("brand/", AsyncBrandView.as_view(), name="async-brand-list"),
+    path("brand/<uuid:pk>/", AsyncBrandView.as_view(), name="async-brand-detail"),
+    path("category/", AsyncCategoryView.as_view(), name="async-category-list"),
+    path("category/<uuid:pk>/", AsyncCategoryView.as_view(), name="async-category-detail"),
+    path("unit/", AsyncUnitView.as_view(), name="async-unit-list"),
+    path("unit/<uuid:pk>/", AsyncUnitView.as_view(), name="async-unit-detail"),
+]
@@ -0,0 +1,160 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db import connection
+from django.utils import timezone
+
+from apps.products.models import Product, PurchaseItem, StockMovement
+from apps.products.pricing import money
+
+FETCH_SIZE = 50000
+
+_MOVEMENTS_SQL = """
+    SELECT
+        CASE WHEN ROW_NUMBER() OVER pair = 1 THEN m.product_id END,
+        CASE WHEN ROW_NUMBER() OVER pair = 1 THEN m.warehouse_id END,
+        m.quantity,
+        COALESCE(c.unit_cost::float8, p.unit_price, 0)
+    FROM {movement} AS m
+    JOIN {product} AS p ON p.id = m.product_id
+    LEFT JOIN (
+        SELECT purchase_id, product_id, SUM(subtotal) / NULLIF(SUM(quantity), 0) AS unit_cost
+        FROM {item}
+        GROUP BY purchase_id, product_id
+    ) AS c
+        ON m.movement_type = 'Purchase'
+        AND c.purchase_id = m.reference
+        AND c.product_id = m.product_id
+    WHERE {where}
+    WINDOW pair AS (PARTITION BY m.product_id, m.warehouse_id ORDER BY m.created_on, m.id)
+    ORDER BY m.product_id, m.warehouse_id, m.created_on, m.id
+"""
+
+
+def value_movements(groups, quantities, unit_costs, group_count):
+    """
+    Value the stock ledger of ``group_count`` (product, warehouse) pairs.
+
+    ``groups`` holds the pair of each movement, grouped and in time order
+    within a pair; ``quantities`` are signed, and ``unit_costs`` are read
+    for incoming rows only. Returns arrays, one entry per pair, of on-hand
+    quantity, FIFO value and cost of issues, and the periodic weighted
+    average cost with the value and cost of issues it gives.
+
+    Nothing loops per row. Because stock never goes negative, FIFO always
+    issues the first ``issued`` units a pair received, whatever the
+    interleaving, so the cost of issues is read off the cumulative
+    (quantity, cost) curve of all incoming layers, pairs laid end to end,
+    with two ``np.interp`` calls. Per-pair sums are ``np.bincount``.
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    quantities = np.asarray(quantities, dtype=np.float64)
+    unit_costs = np.asarray(unit_costs, dtype=np.float64)
+
+    incoming = quantities > 0
+    layer_quantity = quantities[incoming]
+    layer_cost = layer_quantity * unit_costs[incoming]
+
+    received = np.bincount(groups[incoming], weights=layer_quantity, minlength=group_count)
+    received_cost = np.bincount(groups[incoming], weights=layer_cost, minlength=group_count)
+    issued = np.bincount(groups[~incoming], weights=-quantities[~incoming], minlength=group_count)
+    issued = np.minimum(issued, received)
+    on_hand = received - issued
+
+    cumulative_quantity = np.concatenate(([0.0], np.cumsum(layer_quantity)))
+    cumulative_cost = np.concatenate(([0.0], np.cumsum(layer_cost)))
+    first_layer = np.concatenate(([0.0], np.cumsum(received)[:-1]))
+    fifo_issued = np.interp(
+        first_layer + issued, cumulative_quantity, cumulative_cost
+    ) - np.interp(first_layer, cumulative_quantity, cumulative_cost)
+
+    average_cost = np.divide(
+        received_cost, received, out=np.zeros(group_count), where=received > 0
+    )
+    return {
+        "on_hand": on_hand,
+        "fifo_value": received_cost - fifo_issued,
+        "fifo_issued": fifo_issued,
+        "average_cost": average_cost,
+        "average_value": on_hand * average_cost,
+        "average_issued": issued * average_cost,
+    }
+
+
+def load_movements(as_of=None, warehouse=None, product=None):
+    """
+    Read the ledger (up to the end of day ``as_of``) as arrays, with the
+    unit cost of every movement: the net line cost of its purchase for
+    purchase receipts, otherwise the product's ``unit_price``.
+
+    Returns ``(pairs, groups, quantities, unit_costs)``.
+    """
+    where, params = ["TRUE"], []
+    if as_of is not None:
+        where.append("m.created_on < %s")
+        params.append(
+            timezone.make_aware(datetime.combine(as_of + timedelta(days=1), time.min))
+        )
+    if warehouse is not None:
+        where.append("m.warehouse_id = %s")
+        params.append(warehouse)
+    if product is not None:
+        where.append("m.product_id = %s")
+        params.append(product)
+
+    sql = _MOVEMENTS_SQL.format(
+        movement=StockMovement._meta.db_table,
+        product=Product._meta.db_table,
+        item=PurchaseItem._meta.db_table,
+        where=" AND ".join(where),
+    )
+    pairs, starts, quantities, unit_costs = [], [], [], []
+    with connection.chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            product_ids, warehouse_ids, chunk_quantities, chunk_costs = zip(*rows)
+            # Only the first movement of each pair carries its ids.
+            starts.append(
+                np.fromiter((pk is not None for pk in product_ids), bool, len(rows))
+            )
+            pairs.extend(
+                (product_id, warehouse_id)
+                for product_id, warehouse_id in zip(product_ids, warehouse_ids)
+                if product_id is not None
+            )
+            quantities.append(np.asarray(chunk_quantities, dtype=np.float64))
+            unit_costs.append(np.asarray(chunk_costs, dtype=np.float64))
+
+    if not pairs:
+        return [], np.zeros(0, np.int64), np.zeros(0), np.zeros(0)
+    groups = np.cumsum(np.concatenate(starts)) - 1
+    return pairs, groups, np.concatenate(quantities), np.concatenate(unit_costs)
+
+
+def value_stock(as_of=None, warehouse=None, product=None):
+    """
+    FIFO and weighted-average valuation per (product, warehouse), with
+    totals. The cost of issues covers every outgoing movement: sales and
+    stock written off by adjustments.
+    """
+    pairs, groups, quantities, unit_costs = load_movements(as_of, warehouse, product)
+    values = value_movements(groups, quantities, unit_costs, len(pairs))
+
+    rows = [
+        {
+            "product": product_id,
+            "warehouse": warehouse_id,
+            "on_hand": int(values["on_hand"][index]),
+            **{
+                name: money(float(column[index]))
+                for name, column in values.items()
+                if name != "on_hand"
+            },
+        }
+        for index, (product_id, warehouse_id) in enumerate(pairs)
+    ]
+    totals = {
+        name: money(float(values[name].sum()))
+        for name in ("fifo_value", "fifo_issued", "average_value", "average_issued")
+    }
+    return rows, totals
@@ -1,9 +1,17 @@
-import os
 import uuid
-import barcode
-from barcode.writer import ImageWriter
-from rest_framework.viewsets import ModelViewSet
+from datetime import date, timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from django.shortcuts import get_object_or_404
+from rest_framework.decorators import action
+from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet, ViewSet
 from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 from rest_framework import status
 
@@ -15,23 +23,34 @@ from apps.products.models import (
     Unit,
     Warehouse,
     Barcode,
+    BarcodeJob,
     Purchase,
     Sales,
     PurchaseInvoice,
-    # SalesInvoice,
+    SalesInvoice,
     Adjustment,
+    LowStockAlert,
+    ProductDailySummary,
+    SupplierDailySummary,
+    WarehouseDailySummary,
 )
 from apps.products.serializers import (
     AdjustmentSerializer,
+    BarcodeJobRequestSerializer,
+    BarcodeJobSerializer,
     BarcodeSerializer,
     BrandSerializers,
+    BulkAdjustmentLineSerializer,
     CategorySerializer,
     GetAdjustmentSeralizer,
     GetBarcodeSerializer,
     GetPurachseSerializer,
+    GetSalesSerializer,
+    LowStockAlertSerializer,
     ProductSerializer,
     GETProductSerializer,
     PurchaseInvoiceSerializer,
+    SalesInvoiceSerializer,
     PurchaseSerializer,
     SalesSerializer,
     UnitSerializer,
@@ -41,7 +60,30 @@ from apps.products.serializers import (
     WarehouseSerializer,
     SubCategorySerializer,
 )
-from apps.accounts.pagination import MyPagination
+from apps.products.barcodes import (
+    LABEL_SIZES,
+    enqueue_barcode_job,
+    render_barcode,
+    render_sheet,
+    render_svg,
+)
+from apps.products.exports import ExportMixin
+from apps.products.importers import ProductImporter, read_rows
+from apps.products.invoices import INVOICE_FORMATS, purchase_invoices, sales_invoices
+from apps.products.scan import scan_resolver
+from apps.products.search import search_products
+from apps.products.stock import InsufficientStock, apply_bulk_adjustments
+from apps.products.valuation import value_stock
+from apps.accounts.pagination import (
+    KeysetPagination,
+    MyPagination,
+    UncountedLimitOffsetPagination,
+)
+from utils.bulk import BulkCreateMixin
+from utils.parsers import NDJSONParser
+from utils.conditional import ConditionalGetMixin
+from utils.prefetch import RelatedQuerysetMixin
+from utils.response_cache import VersionedCacheMixin
 
 from rest_framework.permissions import (
     AllowAny,
@@ -50,11 +92,11 @@ from rest_framework.permissions import (
 )
 
 
-class CommonModelViewSet(ModelViewSet):
+class CommonModelViewSet(ConditionalGetMixin, RelatedQuerysetMixin, ModelViewSet):
     pagination_class = MyPagination
 
 
-class BrandViewSet(CommonModelViewSet):
+class BrandViewSet(VersionedCacheMixin, CommonModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializers
     http_method_names = ["get", "post", "put", "delete"]
@@ -78,12 +120,12 @@ class BrandViewSet(CommonModelViewSet):
         return super().get_serializer_class()
 
 
-class SubCategoryViewSet(CommonModelViewSet):
+class SubCategoryViewSet(VersionedCacheMixin, CommonModelViewSet):
     queryset = SubCategory.objects.all()
     serializer_class = SubCategorySerializer
 
 
-class CategoryViewSet(CommonModelViewSet):
+class CategoryViewSet(VersionedCacheMixin, CommonModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
@@ -99,7 +141,9 @@ class CategoryViewSet(CommonModelViewSet):
         return super().get_serializer_class()
 
 
-class UnitViewSet(ModelViewSet):
+class UnitViewSet(
+    VersionedCacheMixin, ConditionalGetMixin, RelatedQuerysetMixin, ModelViewSet
+):
     queryset = Unit.objects.all()
     serializer_class = UnitSerializer
     http_method_names = ["get", "post", "put", "patch", "delete"]
@@ -119,9 +163,13 @@ class UnitViewSet(ModelViewSet):
         return super().get_serializer_class()
 
 
-class ProductViewSet(ModelViewSet):
+class ProductViewSet(
+    ExportMixin, ConditionalGetMixin, RelatedQuerysetMixin, ModelViewSet
+):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = KeysetPagination
+    max_page_size = 5000
     http_method_names = ["get", "post", "put", "patch", "delete"]
     filterset_fields = ["created_by"]
     permission_classes_by_action = {
@@ -129,7 +177,31 @@ class ProductViewSet(ModelViewSet):
         "retrieve": [IsAuthenticated],
         "create": [IsAdminUser],
         "update": [IsAuthenticated],
+        "import_products": [IsAdminUser],
+        "export": [IsAdminUser],
+        "scan": [IsAuthenticated],
+        "search": [AllowAny],
     }
+    export_fields = (
+        "id",
+        "product_name",
+        "product_type",
+        "product_code",
+        "barcode",
+        "category__name",
+        "brand__brand_name",
+        "product_unit__short_name",
+        "product_price",
+        "expense",
+        "unit_price",
+        "product_tax",
+        "tax_method",
+        "discount",
+        "stock_alert",
+        "featured",
+        "created_on",
+        "modified_on",
+    )
 
     def get_permissions(self):
         try:
@@ -145,14 +217,74 @@ class ProductViewSet(ModelViewSet):
             return GETProductSerializer
         return super().get_serializer_class()
 
+    @action(methods=["get"], detail=False, url_path="search")
+    def search(self, request):
+        """
+        Ranked prefix/fuzzy search over name, barcode, brand and category:
+        ``?q=<text>&l=<limit>&o=<offset>``.
+        """
+        text = request.query_params.get("q", "").strip()
+        if not text:
+            return Response(
+                {"error": "q is required."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        paginator = UncountedLimitOffsetPagination()
+        page = paginator.paginate_queryset(
+            search_products(self.get_queryset(), text), request, view=self
+        )
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(methods=["get"], detail=False, url_path="scan")
+    def scan(self, request):
+        """
+        Resolve ``?code=`` (barcode or product code) to a compact POS payload.
+        """
+        code = request.query_params.get("code", "").strip()
+        if not code:
+            return Response(
+                {"error": "code is required."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        product = scan_resolver.resolve(code)
+        if product is None:
+            return Response(
+                {"error": "No product with this code."}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(product)
+
+    @action(
+        methods=["post"],
+        detail=False,
+        url_path="import",
+        parser_classes=[MultiPartParser],
+    )
+    def import_products(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"error": "A CSV or NDJSON file is required."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            rows = read_rows(upload.file, upload.name)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-class WarehouseViewset(ModelViewSet):
+        report = ProductImporter(user=request.user).run(rows)
+        if report["created"] and "error" not in report:
+            return Response(report, status=status.HTTP_201_CREATED)
+        return Response(report, status=status.HTTP_400_BAD_REQUEST)
+
+
+class WarehouseViewset(
+    VersionedCacheMixin, ConditionalGetMixin, RelatedQuerysetMixin, ModelViewSet
+):
     queryset = Warehouse.objects.all()
     serializer_class = WarehouseSerializer
     http_method_names = ['get', 'post', 'put', 'delete']
 
 
-class BarcodeViewSet(ModelViewSet):
+class BarcodeViewSet(ConditionalGetMixin, RelatedQuerysetMixin, ModelViewSet):
     queryset = Barcode.objects.all()
     serializer_class = BarcodeSerializer
 
@@ -167,18 +299,11 @@ class BarcodeViewSet(ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        barcode_class = barcode.get_barcode_class("code128")
-        code = barcode_class(get_current_product_code, writer=ImageWriter())
-
-        unique_filename = f"barcode_{uuid.uuid4()}"
-
-        directory_path = "media/barcode-image/"
-        if not os.path.exists(directory_path):
-            os.makedirs(directory_path)
-        barcode_image = code.save(f"barcode-image/{unique_filename}")
-
         serializer = BarcodeSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        barcode_image = render_barcode(
+            get_current_product_code, serializer.validated_data["papersize"]
+        )
         serializer.save(barcode_image=barcode_image)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -187,10 +312,114 @@ class BarcodeViewSet(ModelViewSet):
             return GetBarcodeSerializer
         return super().get_serializer_class()
 
+    @action(methods=["post"], detail=False, url_path="jobs")
+    def create_job(self, request):
+        """
+        Queue labels for many products. Rendering happens in a background
+        pool; poll ``jobs/<id>/`` for progress and results.
+        """
+        serializer = BarcodeJobRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = enqueue_barcode_job(
+            serializer.validated_data["products"],
+            serializer.validated_data["papersize"],
+            user=request.user,
+        )
+        return Response(BarcodeJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(methods=["get"], detail=False, url_path=r"jobs/(?P<job_id>[^/.]+)")
+    def job_status(self, request, job_id=None):
+        try:
+            job_id = uuid.UUID(job_id)
+        except ValueError:
+            return Response({"error": "Job not found."}, status=status.HTTP_404_NOT_FOUND)
+        job = get_object_or_404(BarcodeJob, pk=job_id)
+        data = BarcodeJobSerializer(job).data
+        if job.status == "Complete":
+            data["results"] = BarcodeSerializer(
+                Barcode.objects.filter(information_id__in=job.products), many=True
+            ).data
+        return Response(data)
+
+    @action(methods=["get"], detail=True, url_path="svg")
+    def svg(self, request, pk=None):
+        barcode = self.get_object()
+        return HttpResponse(
+            render_svg(barcode.information.product_code, barcode.papersize),
+            content_type="image/svg+xml",
+        )
+
+    @action(methods=["get"], detail=False, url_path="sheet")
+    def sheet(self, request):
+        """
+        Printable A4 sheet of every barcode of ``?papersize=`` (optionally
+        only ``?ids=<id>,<id>``) rendered as vector labels.
+        """
+        papersize = request.query_params.get("papersize")
+        if papersize not in LABEL_SIZES:
+            return Response(
+                {"error": f"papersize must be one of {', '.join(LABEL_SIZES)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
-class PurchaseViewSet(ModelViewSet):
+        queryset = Barcode.objects.filter(papersize=papersize)
+        ids = request.query_params.get("ids")
+        if ids:
+            try:
+                ids = [uuid.UUID(value) for value in ids.split(",")]
+            except ValueError:
+                return Response(
+                    {"error": "ids must be comma-separated barcode ids."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            queryset = queryset.filter(id__in=ids)
+        product_codes = list(
+            queryset.order_by("created_on").values_list(
+                "information__product_code", flat=True
+            )
+        )
+        return HttpResponse(
+            render_sheet(product_codes, papersize), content_type="text/html"
+        )
+
+
+class CompletedOrderMixin:
+    """
+    Deleting a completed order takes its stock back out; answer 400 when
+    that stock has already been used instead of failing the request.
+    """
+    def perform_destroy(self, instance):
+        try:
+            super().perform_destroy(instance)
+        except InsufficientStock as exc:
+            raise ValidationError({"error": str(exc)})
+
+
+class PurchaseViewSet(
+    CompletedOrderMixin,
+    ExportMixin,
+    ConditionalGetMixin,
+    RelatedQuerysetMixin,
+    ModelViewSet,
+):
     queryset = Purchase.objects.all()
     serializer_class = PurchaseSerializer
+    pagination_class = KeysetPagination
+    max_page_size = 5000
+    export_fields = (
+        "id",
+        "warehouse__name",
+        "supplier__supplier_code",
+        "supplier__company",
+        "order_tax",
+        "order_discount",
+        "shipping",
+        "sales_status",
+        "purchase_note",
+        "grand_total",
+        "created_on",
+        "modified_on",
+    )
 
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -198,28 +427,212 @@ class PurchaseViewSet(ModelViewSet):
         return super().get_serializer_class()
 
 
-class SalesViewSet(ModelViewSet):
+class SalesViewSet(
+    CompletedOrderMixin,
+    ExportMixin,
+    ConditionalGetMixin,
+    RelatedQuerysetMixin,
+    ModelViewSet,
+):
     queryset = Sales.objects.all()
     serializer_class = SalesSerializer
+    pagination_class = KeysetPagination
+    max_page_size = 5000
+    export_fields = (
+        "id",
+        "customer__user__full_name",
+        "warehouse__name",
+        "biller__biller_code",
+        "sales_tax",
+        "discount",
+        "shipping",
+        "sales_status",
+        "payment_status",
+        "sales_note",
+        "staff_remark",
+        "grand_total",
+        "created_on",
+        "modified_on",
+    )
+
+    def get_serializer_class(self):
+        if self.action == "retrieve":
+            return GetSalesSerializer
+        return super().get_serializer_class()
+
+
+class InvoiceDocumentMixin:
+    invoice_renderer = None
+
+    @action(detail=True, methods=["get"])
+    def document(self, request, pk=None):
+        """
+        The invoice rendered on the fly, as ``?output=html`` (default) or
+        ``?output=pdf`` when WeasyPrint is installed.
+        """
+        output = request.query_params.get("output", "html")
+        try:
+            content = self.invoice_renderer.render(self.get_object().pk, output)
+        except (ValueError, ImproperlyConfigured) as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if content is None:
+            return Response(
+                {"error": "Invoice has no order."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return HttpResponse(content, content_type=INVOICE_FORMATS[output][0])
 
 
-class PurchaseInvoiceViewSet(ModelViewSet):
+class PurchaseInvoiceViewSet(
+    InvoiceDocumentMixin, ConditionalGetMixin, RelatedQuerysetMixin, ModelViewSet
+):
     queryset = PurchaseInvoice.objects.all()
     serializer_class = PurchaseInvoiceSerializer
+    invoice_renderer = purchase_invoices
 
-class AdjustmentViewset(ModelViewSet):
+
+class SalesInvoiceViewSet(
+    InvoiceDocumentMixin, ConditionalGetMixin, RelatedQuerysetMixin, ModelViewSet
+):
+    queryset = SalesInvoice.objects.all()
+    serializer_class = SalesInvoiceSerializer
+    invoice_renderer = sales_invoices
+
+class AdjustmentViewset(
+    BulkCreateMixin, ConditionalGetMixin, RelatedQuerysetMixin, ModelViewSet
+):
     queryset = Adjustment.objects.all()
     serializer_class = AdjustmentSerializer
+    parser_classes = [JSONParser, NDJSONParser, FormParser, MultiPartParser]
+    bulk_serializer_class = BulkAdjustmentLineSerializer
+    bulk_handler = staticmethod(apply_bulk_adjustments)
 
     def create(self, request):
-        serializer = AdjustmentSerializer(data = request.data)
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
+
+        serializer = AdjustmentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.validated_data.pop('quantity')
-        adjustment = Adjustment.objects.create(**serializer.validated_data)
-        serializer = AdjustmentSerializer(adjustment)
-        return Response({"data" : serializer.data}) 
-    
+        serializer.save(created_by=request.user)
+        return Response({"data": serializer.data})
+
     def get_serializer_class(self):
         if self.action == "retrieve":
             return GetAdjustmentSeralizer
         return super().get_serializer_class()
+
+
+class LowStockAlertViewSet(ReadOnlyModelViewSet):
+    """
+    Pairs currently at or below their product's ``stock_alert``, newest
+    first; ``?warehouse=<id>`` narrows to one warehouse. Pages are keyset
+    scans of the alert index, so their cost does not depend on how many
+    products exist.
+    """
+    queryset = LowStockAlert.objects.select_related("product", "warehouse")
+    serializer_class = LowStockAlertSerializer
+    pagination_class = KeysetPagination
+    filterset_fields = ["warehouse", "product"]
+    filter_backends = [DjangoFilterBackend]
+
+class ReportViewSet(ViewSet):
+    """
+    Sales and purchase reports, read only from the daily summaries kept by
+    ``apps.products.rollups``, never from the orders themselves, and stock
+    valuation replayed from the ledger.
+
+    The summary reports take ``from`` and ``to`` (ISO dates, inclusive; the
+    last 30 days by default) and ``interval=day`` to break the totals down
+    per day instead of over the whole range.
+    """
+    permission_classes = [IsAdminUser]
+    default_days = 30
+
+    def date_range(self, request):
+        try:
+            end = date.fromisoformat(request.query_params.get("to") or timezone.localdate().isoformat())
+            start = date.fromisoformat(
+                request.query_params.get("from")
+                or (end - timedelta(days=self.default_days - 1)).isoformat()
+            )
+        except ValueError:
+            raise ValidationError({"error": "Dates must be in YYYY-MM-DD format."})
+        if start > end:
+            raise ValidationError({"error": "'from' must not be after 'to'."})
+        return start, end
+
+    def id_filter(self, request, name):
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            raise ValidationError({"error": f"Invalid {name} id."})
+
+    def summarize(self, request, model, group, measures, filters=()):
+        start, end = self.date_range(request)
+        queryset = model.objects.filter(day__range=(start, end))
+        for name in filters:
+            value = self.id_filter(request, name)
+            if value is not None:
+                queryset = queryset.filter(**{f"{name}_id": value})
+
+        fields = list(group)
+        if request.query_params.get("interval") == "day":
+            fields.insert(0, "day")
+        rows = (
+            queryset.values(*fields)
+            .annotate(**{measure: Sum(measure) for measure in measures})
+            .order_by(*fields)
+        )
+        return Response({"from": start, "to": end, "results": list(rows)})
+
+    @action(detail=False, methods=["get"])
+    def products(self, request):
+        return self.summarize(
+            request,
+            ProductDailySummary,
+            group=("product", "product__product_name"),
+            measures=("sold_quantity", "sales_amount", "purchased_quantity", "purchase_amount"),
+            filters=("warehouse", "product"),
+        )
+
+    @action(detail=False, methods=["get"])
+    def warehouses(self, request):
+        return self.summarize(
+            request,
+            WarehouseDailySummary,
+            group=("warehouse", "warehouse__name"),
+            measures=("sales_count", "sales_amount", "purchase_count", "purchase_amount"),
+            filters=("warehouse",),
+        )
+
+    @action(detail=False, methods=["get"])
+    def suppliers(self, request):
+        return self.summarize(
+            request,
+            SupplierDailySummary,
+            group=("supplier", "supplier__company"),
+            measures=("purchase_count", "purchase_amount"),
+            filters=("supplier",),
+        )
+
+    @action(detail=False, methods=["get"])
+    def valuation(self, request):
+        """
+        FIFO and weighted-average stock value per (product, warehouse) as
+        of the end of ``as_of`` (default today), replayed from the ledger.
+        """
+        try:
+            as_of = date.fromisoformat(
+                request.query_params.get("as_of") or timezone.localdate().isoformat()
+            )
+        except ValueError:
+            raise ValidationError({"error": "Dates must be in YYYY-MM-DD format."})
+        rows, totals = value_stock(
+            as_of=as_of,
+            warehouse=self.id_filter(request, "warehouse"),
+            product=self.id_filter(request, "product"),
+        )
+        return Response({"as_of": as_of, "totals": totals, "results": rows})
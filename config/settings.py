@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     # Third Party Apps
     "rest_framework",
@@ -61,14 +62,14 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "apps.accounts.middlewares.CustomMiddleware",
-    "utils.threads.RequestMiddleware",
+    "utils.context.RequestContextMiddleware",
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
+        'apps.accounts.authentication.TokenAwareSessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
 
@@ -143,8 +144,18 @@ AUTH_PASSWORD_VALIDATORS = [
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=10),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": (
+        "apps.accounts.authentication.VersionedTokenObtainPairSerializer"
+    ),
 }
 
+# Authenticated users are cached per process by CachedJWTAuthentication;
+# the TTL bounds how long another process can serve a changed user.
+AUTH_USER_CACHE_SIZE = config("AUTH_USER_CACHE_SIZE", default=10000, cast=int)
+AUTH_USER_CACHE_TTL = config("AUTH_USER_CACHE_TTL", default=60, cast=int)
+# Never fall back to the session for requests with an Authorization header.
+AUTH_SHORT_CIRCUIT_TOKENS = config("AUTH_SHORT_CIRCUIT_TOKENS", default=True, cast=bool)
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -162,19 +173,67 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The response cache backend is pluggable: LocMemCache, FileBasedCache
+# (LOCATION is a directory) or RedisCache (LOCATION is a redis:// URL).
+# Version counters live in it, so it must be shared (Redis) whenever
+# more than one process serves the API; a system check enforces this.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "responses": {
+        "BACKEND": config(
+            "RESPONSE_CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": config("RESPONSE_CACHE_LOCATION", default="responses"),
+    },
+    "otp": {
+        "BACKEND": config(
+            "OTP_CACHE_BACKEND",
+            default="django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": config("OTP_CACHE_LOCATION", default="otp"),
+    },
+}
+RESPONSE_CACHE_ALIAS = "responses"
+
+# Worker processes serving the API (gunicorn reads the same variable).
+WEB_CONCURRENCY = config("WEB_CONCURRENCY", default=1, cast=int)
+
+# Password reset codes. CacheOTPBackend needs a cache shared by all
+# processes (e.g. Redis) when more than one serves the API;
+# DatabaseOTPBackend stores them in the OTP table instead.
+OTP_BACKEND = config("OTP_BACKEND", default="apps.accounts.otp.CacheOTPBackend")
+OTP_CACHE_ALIAS = "otp"
+OTP_TTL = config("OTP_TTL", default=5 * 60, cast=int)
+OTP_MAX_ATTEMPTS = config("OTP_MAX_ATTEMPTS", default=5, cast=int)
+# Wrong guesses are counted per user over this window, across re-issues.
+OTP_ATTEMPT_WINDOW = config("OTP_ATTEMPT_WINDOW", default=60 * 60, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Email Backend Configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
-EMAIL_HOST = 'smtp.gmail.com'
+EMAIL_BACKEND = config(
+    'EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend'
+)
+
+# Point EMAIL_HOST/EMAIL_PORT at a local stand-in (for example
+# ``python -m aiosmtpd -n -l localhost:1025`` with EMAIL_USE_TLS=False) to
+# exercise the outbox sender without a real mail server.
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
+EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
+DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
 # code names for supplier and biller
 SUPPLIER_CODE = config("BILLER_CODE")
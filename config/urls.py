@@ -24,7 +24,10 @@ from rest_framework_simplejwt.views import (
 )
 
 from apps.accounts.routers import router as account_router
+from apps.accounts.views import OutboxStatsView
 from apps.products.routers import router as product_router
+from utils.images import ImageVariantView
+from utils.response_cache import ResponseCacheStatsView
 
 router = DefaultRouter()
 
@@ -41,5 +44,13 @@ urlpatterns = [
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/token/verify/", TokenVerifyView.as_view(), name="token_verify"),
     # Local App urls
+    path("api/async/", include("apps.products.urls")),
+    path("api/outbox-stats/", OutboxStatsView.as_view(), name="outbox_stats"),
+    path("api/cache-stats/", ResponseCacheStatsView.as_view(), name="cache_stats"),
+    path(
+        "media/variants/<str:variant>/<path:name>",
+        ImageVariantView.as_view(),
+        name="image-variant",
+    ),
     path("api/", include(router.urls)),
 ]
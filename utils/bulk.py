@@ -0,0 +1,46 @@
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+class BulkCreateMixin:
+    """
+    Creates many rows from a JSON array (or NDJSON) body in one call.
+
+    Each row is validated with ``bulk_serializer_class``; the valid ones go
+    to ``bulk_handler(lines, user=..., atomic=...)``, which returns
+    ``(created, errors)`` with errors keyed by row index. Bad rows are
+    reported by index and skipped, unless ``?atomic=true`` is passed, in
+    which case any bad row rejects the whole batch.
+    """
+    bulk_serializer_class = None
+    bulk_handler = None
+
+    def bulk_create(self, request):
+        atomic = request.query_params.get("atomic", "").lower() in ("1", "true")
+
+        row_serializer = self.bulk_serializer_class()
+        lines = []
+        errors = {}
+        for index, item in enumerate(request.data):
+            try:
+                lines.append((index, row_serializer.run_validation(item)))
+            except ValidationError as exc:
+                errors[index] = exc.detail
+
+        created = []
+        if lines and not (errors and atomic):
+            created, line_errors = self.bulk_handler(
+                lines, user=request.user, atomic=atomic
+            )
+            errors.update(line_errors)
+
+        return Response(
+            {
+                "created": len(created),
+                "errors": [
+                    {"line": index, "errors": errors[index]} for index in sorted(errors)
+                ],
+            },
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
@@ -0,0 +1,149 @@
+import hashlib
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from utils.prefetch import plan_related
+
+
+def _etag(*parts):
+    return quote_etag(hashlib.md5(":".join(map(str, parts)).encode()).hexdigest())
+
+
+@lru_cache(maxsize=None)
+def _has_modified_on(model):
+    try:
+        model._meta.get_field("modified_on")
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+@lru_cache(maxsize=None)
+def version_paths(serializer_class):
+    """
+    Relation paths of every row ``serializer_class`` embeds, split into
+    parts, or ``None`` when the serializer's own model has no
+    ``modified_on`` to build validators from.
+    """
+    if not issubclass(serializer_class, serializers.ModelSerializer):
+        return None
+    model = serializer_class.Meta.model
+    if not _has_modified_on(model):
+        return None
+
+    select, prefetch = plan_related(serializer_class)
+    return tuple(tuple(path.split("__")) for path in select + prefetch)
+
+
+def _related_rows(obj, parts):
+    if obj is None:
+        return
+    if not parts:
+        yield obj
+        return
+    # Relations are already joined or prefetched, so this runs no queries.
+    value = getattr(obj, parts[0], None)
+    if hasattr(value, "all"):
+        for related in value.all():
+            yield from _related_rows(related, parts[1:])
+    else:
+        yield from _related_rows(value, parts[1:])
+
+
+def _version(row):
+    """
+    ``modified_on`` of ``row``, or a digest of its field values for models
+    without one (such as ``User``).
+    """
+    if _has_modified_on(type(row)):
+        return row.modified_on
+    values = [field.value_from_object(row) for field in row._meta.concrete_fields]
+    return hashlib.md5(repr(values).encode()).hexdigest()
+
+
+def row_versions(rows, paths):
+    """
+    Return ``(last_modified, versions)`` of ``rows`` and everything they
+    embed along ``paths``. ``last_modified`` is ``None`` when a row is
+    versioned by digest, since no timestamp would move when it changes.
+    """
+    versions = []
+    for row in rows:
+        versions.append((row._meta.label_lower, row.pk, _version(row)))
+        for parts in paths:
+            versions.extend(
+                (related._meta.label_lower, related.pk, _version(related))
+                for related in _related_rows(row, parts)
+            )
+    if any(isinstance(version, str) for *_, version in versions):
+        return None, versions
+    last_modified = max((version for *_, version in versions), default=None)
+    return last_modified, versions
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for models carrying ``modified_on``.
+
+    Validators are built from the rows actually returned: the ``modified_on``
+    of each row and of every row it embeds, plus the pagination envelope for
+    lists. A matching ``If-None-Match`` / ``If-Modified-Since`` answers
+    ``304 Not Modified`` before anything is serialized. Lists only get an
+    ETag, since a deleted row does not move ``Last-Modified``. Embedded
+    rows without ``modified_on`` are versioned by a digest of their fields.
+    """
+    def conditional_response(self, request, etag, last_modified, handler):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is not None:
+            return response
+
+        response = handler()
+        if response.status_code == 200:
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        paths = version_paths(self.get_serializer_class())
+        if paths is None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        _, versions = row_versions(rows, paths)
+        # Counts and links change with rows outside the page.
+        envelope = self.get_paginated_response([]).data if page is not None else None
+        etag = _etag(self.action, request.get_full_path(), envelope, *versions)
+
+        def handler():
+            data = self.get_serializer(rows, many=True).data
+            if page is not None:
+                return self.get_paginated_response(data)
+            return Response(data)
+
+        return self.conditional_response(request, etag, None, handler)
+
+    def retrieve(self, request, *args, **kwargs):
+        paths = version_paths(self.get_serializer_class())
+        if paths is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        instance = self.get_object()
+        last_modified, versions = row_versions([instance], paths)
+        etag = _etag(self.action, *versions)
+        return self.conditional_response(
+            request,
+            etag,
+            last_modified,
+            lambda: Response(self.get_serializer(instance).data),
+        )
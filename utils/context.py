@@ -0,0 +1,79 @@
+import contextvars
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+_request = contextvars.ContextVar("request", default=None)
+_actor = contextvars.ContextVar("actor", default=None)
+
+
+def get_request():
+    return _request.get()
+
+
+def get_current_user():
+    """
+    The user writes should be attributed to: the actor set with
+    ``acting_as`` if any, otherwise the authenticated user of the current
+    request, otherwise ``None`` (scripts, workers, anonymous requests).
+    """
+    actor = _actor.get()
+    if actor is not None:
+        return actor
+    user = getattr(_request.get(), "user", None)
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+@contextmanager
+def acting_as(user):
+    """
+    Attribute model writes made inside the block to ``user``; for batch
+    jobs and workers running outside a request.
+    """
+    token = _actor.set(user)
+    try:
+        yield user
+    finally:
+        _actor.reset(token)
+
+
+def submit_with_context(executor, fn, *args, **kwargs):
+    """
+    ``executor.submit`` that runs ``fn`` in a copy of the caller's context,
+    so the request and actor follow work handed to a thread pool.
+    """
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+class RequestContextMiddleware:
+    """
+    Exposes the current request through a ``ContextVar``. Unlike a
+    thread-local it is isolated per asyncio task, propagates through
+    ``sync_to_async``/``async_to_sync``, and is reset once the response is
+    returned.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _request.reset(token)
+
+    async def __acall__(self, request):
+        token = _request.set(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            _request.reset(token)
@@ -0,0 +1,160 @@
+import hashlib
+import io
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, Http404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework import serializers
+from rest_framework.views import APIView
+
+# Variant name -> longest edge in pixels. Images are only ever scaled down.
+IMAGE_VARIANTS = getattr(
+    settings, "IMAGE_VARIANTS", {"thumb": 160, "small": 480, "medium": 1024}
+)
+IMAGE_VARIANT_DIRECTORY = "derivatives/"
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+# Clients revalidate after this long; the ETag changes with the original.
+IMAGE_VARIANT_MAX_AGE = 60 * 60
+
+# Upload directories variants may be made from. Anything else in storage
+# (user profile photos, barcodes, invoices) is never served through here.
+IMAGE_SOURCES = ("brands/", "products/", "sales/")
+
+_workers = ThreadPoolExecutor(
+    max_workers=IMAGE_VARIANT_WORKERS, thread_name_prefix="image-variants"
+)
+_locks = [threading.Lock() for _ in range(64)]
+
+
+def is_image_source(name):
+    """
+    Whether variants of ``name`` may be made and served.
+    """
+    return ".." not in name.split("/") and name.startswith(IMAGE_SOURCES)
+
+
+def _source_version(name):
+    try:
+        return default_storage.get_modified_time(name).isoformat()
+    except NotImplementedError:
+        return ""
+
+
+def variant_name(name, variant):
+    """
+    Storage name of ``variant`` of the original ``name``. The digest covers
+    the original's modification time as well as its name, so a new upload
+    that reuses a deleted original's name gets variants of its own.
+    """
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    digest = hashlib.sha1(f"{name}:{_source_version(name)}".encode()).hexdigest()[:10]
+    return f"{IMAGE_VARIANT_DIRECTORY}{variant}/{stem}-{digest}.webp"
+
+
+def render_variant(name, variant, target):
+    """
+    Scale the original down to the variant's size, re-encode it as WebP
+    and store it as ``target``. Returns the stored name.
+    """
+    size = IMAGE_VARIANTS[variant]
+    with default_storage.open(name) as source:
+        image = Image.open(source)
+        # Lets JPEG decode straight at a fraction of full resolution.
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        transparent = image.mode in ("RGBA", "LA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        image = image.convert("RGBA" if transparent else "RGB")
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, "WEBP", quality=IMAGE_VARIANT_QUALITY, method=4)
+    return default_storage.save(target, ContentFile(buffer.getvalue()))
+
+
+def get_variant(name, variant):
+    """
+    Stored name of ``variant`` of ``name``, rendering it on first use.
+    Concurrent requests for the same variant in one process render it once.
+    """
+    target = variant_name(name, variant)
+    if default_storage.exists(target):
+        return target
+    with _locks[hash(target) % len(_locks)]:
+        if default_storage.exists(target):
+            return target
+        return render_variant(name, variant, target)
+
+
+def generate_variants(name):
+    for variant in IMAGE_VARIANTS:
+        try:
+            get_variant(name, variant)
+        except Exception:
+            # Not fatal: the variant view renders it on first request.
+            pass
+
+
+def queue_variants(name):
+    """
+    Render every variant of a new upload in the background once the
+    transaction that stored it commits.
+    """
+    if name and is_image_source(name):
+        transaction.on_commit(lambda: _workers.submit(generate_variants, name))
+
+
+class ImageVariantsField(serializers.Field):
+    """
+    Read-only ``{variant: url}`` for an image field, pointing at
+    ``ImageVariantView``; ``None`` when no image is set or it was stored
+    outside ``IMAGE_SOURCES``.
+    """
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if not value or not is_image_source(value.name):
+            return None
+        request = self.context.get("request")
+        urls = {}
+        for variant in IMAGE_VARIANTS:
+            url = reverse("image-variant", kwargs={"variant": variant, "name": value.name})
+            urls[variant] = request.build_absolute_uri(url) if request else url
+        return urls
+
+
+class ImageVariantView(APIView):
+    """
+    Serves a variant, rendering and storing it on the first request. The
+    URL only names the original, which may be replaced under the same name,
+    so responses carry the variant's name as ETag and are revalidated
+    after ``IMAGE_VARIANT_MAX_AGE``. Missing and undecodable originals are
+    404s.
+    """
+    def get(self, request, variant, name):
+        if variant not in IMAGE_VARIANTS or not is_image_source(name):
+            raise Http404
+        try:
+            target = get_variant(name, variant)
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            raise Http404
+
+        etag = quote_etag(target)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = FileResponse(default_storage.open(target), content_type="image/webp")
+        response["ETag"] = etag
+        response["Cache-Control"] = f"private, max-age={IMAGE_VARIANT_MAX_AGE}"
+        return response
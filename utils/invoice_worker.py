@@ -0,0 +1,53 @@
+from functools import lru_cache
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template.loader import get_template
+
+try:
+    from weasyprint import HTML
+except ImportError:  # PDF output is optional.
+    HTML = None
+
+INVOICE_TEMPLATE = "products/invoice.html"
+
+# Output format -> (content type, file extension).
+INVOICE_FORMATS = {
+    "html": ("text/html", "html"),
+    "pdf": ("application/pdf", "pdf"),
+}
+
+
+@lru_cache(maxsize=None)
+def _template():
+    # Compiled once per process, pool workers included.
+    return get_template(INVOICE_TEMPLATE)
+
+
+def render_document(context, output="html"):
+    html = _template().render(context)
+    if output == "pdf":
+        return HTML(string=html).write_pdf()
+    return html.encode()
+
+
+# Pool workers are spawned and import this module before Django is set up,
+# so nothing here may import models at load time.
+def setup_worker():
+    import django
+
+    django.setup()
+
+
+def render_and_store(output, context):
+    """
+    Pool worker: render one invoice and write it to storage. Returns
+    ``(storage name, error)``; workers never touch the database.
+    """
+    try:
+        name = f"{context['storage_name']}.{INVOICE_FORMATS[output][1]}"
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        return default_storage.save(name, ContentFile(render_document(context, output))), None
+    except Exception as exc:
+        return None, str(exc)
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Small thread-safe bounded mapping that evicts the least recently used
+    entry once ``maxsize`` is reached. With ``ttl`` (seconds) entries also
+    expire that long after they were set; ``on_expire(key, value)`` is
+    then called, outside the lock, for each entry dropped that way.
+    """
+    def __init__(self, maxsize, ttl=None, on_expire=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_expire = on_expire
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                self.data.move_to_end(key)
+            except KeyError:
+                return default
+            value, expires = self.data[key]
+            if expires is None or expires > time.monotonic():
+                return value
+            del self.data[key]
+        if self.on_expire is not None:
+            self.on_expire(key, value)
+        return default
+
+    def set(self, key, value):
+        """
+        Store ``value``; returns the evicted ``(key, value)``, if any.
+        """
+        expires = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self.lock:
+            self.data[key] = (value, expires)
+            self.data.move_to_end(key)
+            if len(self.data) > self.maxsize:
+                evicted, (value, _) = self.data.popitem(last=False)
+                return evicted, value
+        return None
+
+    def pop(self, key, default=None):
+        with self.lock:
+            entry = self.data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def discard_keys(self, predicate):
+        with self.lock:
+            for key in [key for key in self.data if predicate(key)]:
+                del self.data[key]
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.data
+
+    def __len__(self):
+        return len(self.data)
@@ -0,0 +1,67 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def _walk(serializer, prefix, in_prefetch, select, prefetch):
+    model = serializer.Meta.model
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*" or "." in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        path = f"{prefix}{field.source}"
+        if isinstance(field, serializers.ListSerializer):
+            prefetch.append(path)
+            if isinstance(field.child, serializers.ModelSerializer):
+                _walk(field.child, f"{path}__", True, select, prefetch)
+        elif isinstance(field, serializers.ManyRelatedField):
+            prefetch.append(path)
+        elif isinstance(field, serializers.ModelSerializer):
+            (prefetch if in_prefetch else select).append(path)
+            _walk(field, f"{path}__", in_prefetch, select, prefetch)
+        elif isinstance(field, serializers.RelatedField) and not isinstance(
+            field, serializers.PrimaryKeyRelatedField
+        ):
+            # Slug/string related fields need the related row; plain pk
+            # fields read the local ``*_id`` column and need nothing.
+            (prefetch if in_prefetch else select).append(path)
+
+
+@lru_cache(maxsize=None)
+def plan_related(serializer_class):
+    """
+    Work out the ``select_related`` and ``prefetch_related`` lookups needed
+    to render ``serializer_class`` without per-row queries.
+
+    Nested single objects are joined, nested lists and pk lists are
+    prefetched, and anything below a prefetched relation is prefetched as
+    well. Plans are cached per serializer class.
+    """
+    select = []
+    prefetch = []
+    if issubclass(serializer_class, serializers.ModelSerializer):
+        _walk(serializer_class(), "", False, select, prefetch)
+    return tuple(select), tuple(prefetch)
+
+
+class RelatedQuerysetMixin:
+    """
+    Applies the ``plan_related`` lookups for the serializer of the current
+    action to ``get_queryset()``.
+    """
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        select, prefetch = plan_related(self.get_serializer_class())
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
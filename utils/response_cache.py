@@ -0,0 +1,169 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+RESPONSE_CACHE_ALIAS = getattr(settings, "RESPONSE_CACHE_ALIAS", "default")
+
+# Validators set by ConditionalGetMixin are cached with the data, so a
+# cache hit can still answer 304.
+CACHED_HEADERS = ("ETag", "Last-Modified")
+
+
+class CacheStats:
+    """
+    Per-process hit/miss counters, keyed by model label.
+    """
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, label, hit):
+        with self.lock:
+            (self.hits if hit else self.misses)[label] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                label: {"hits": self.hits[label], "misses": self.misses[label]}
+                for label in sorted(set(self.hits) | set(self.misses))
+            }
+
+
+stats = CacheStats()
+
+
+def _cache():
+    return caches[RESPONSE_CACHE_ALIAS]
+
+
+@checks.register(checks.Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    """
+    Version counters only invalidate what shares their cache: a per-process
+    backend behind several workers would serve stale responses.
+    """
+    backend = settings.CACHES[RESPONSE_CACHE_ALIAS]["BACKEND"]
+    workers = getattr(settings, "WEB_CONCURRENCY", 1)
+    if backend.endswith("LocMemCache") and workers > 1:
+        return [
+            checks.Error(
+                f"The {RESPONSE_CACHE_ALIAS!r} cache is local to each process, "
+                f"but WEB_CONCURRENCY is {workers}.",
+                hint="Set RESPONSE_CACHE_BACKEND to a shared cache such as RedisCache.",
+                id="response_cache.E001",
+            )
+        ]
+    return []
+
+
+def _version_key(model):
+    return f"version:{model._meta.label_lower}"
+
+
+def get_version(model):
+    """
+    Current data version of ``model``. A missing counter is seeded from the
+    clock rather than 1, so an evicted counter never brings back a version
+    whose cached responses are still around.
+    """
+    cache = _cache()
+    key = _version_key(model)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(model):
+    cache = _cache()
+    key = _version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def _bump_on_write(sender, **kwargs):
+    # Bump now so nothing read during the transaction is cached under the
+    # version readers will use afterwards, and again on commit so responses
+    # cached while the write was still invisible are dropped too.
+    bump_version(sender)
+    transaction.on_commit(lambda: bump_version(sender))
+
+
+def register_versioned(*models):
+    """
+    Bump the model's version on every save and delete.
+    """
+    for model in models:
+        post_save.connect(_bump_on_write, sender=model, weak=False)
+        post_delete.connect(_bump_on_write, sender=model, weak=False)
+
+
+class VersionedCacheMixin:
+    """
+    Caches ``list``/``retrieve`` response data under the model's current
+    version, so a write invalidates every cached response of that model
+    with one counter increment. Permissions still run before the cache is
+    consulted. Models must be passed to ``register_versioned``.
+    """
+    cache_timeout = 60 * 60
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def response_cache_key(self, request):
+        model = self.get_queryset().model
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        return f"response:{model._meta.label_lower}:{get_version(model)}:{self.action}:{path}"
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        cache = _cache()
+        label = self.get_queryset().model._meta.label_lower
+        key = self.response_cache_key(request)
+
+        cached = cache.get(key)
+        if cached is not None:
+            stats.record(label, hit=True)
+            data, headers = cached
+            response = get_conditional_response(
+                request,
+                etag=headers.get("ETag"),
+                last_modified=parse_http_date_safe(headers.get("Last-Modified")),
+            ) or Response(data, headers=headers)
+            response["X-Cache"] = "HIT"
+            return response
+
+        stats.record(label, hit=False)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {
+                header: response[header] for header in CACHED_HEADERS if header in response
+            }
+            cache.set(key, (response.data, headers), self.cache_timeout)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class ResponseCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(stats.snapshot())
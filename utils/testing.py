@@ -0,0 +1,20 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Test case mixin for pinning how many queries an endpoint may run.
+    """
+    def assertQueryBudget(self, url, budget, status_code=200):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status_code, response.content)
+        self.assertLessEqual(
+            len(context),
+            budget,
+            f"{url} ran {len(context)} queries, budget is {budget}:\n"
+            + "\n".join(query["sql"] for query in context.captured_queries),
+        )
+        return response